@@ -0,0 +1,219 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of the OSM element classification behind CitySummaryProcessor.
+
+Compares the per-category RawDataProcessor passes against the single pass
+OSMElementClassifier, on a loaded element list and streamed from the saved
+Overpass response, and checks that all of them produce the same counts.
+
+Save the Overpass response of a city (run from this directory):
+    python benchmark_osm_classifier.py --record Houston TX --output houston.json
+
+Run the benchmark over saved responses:
+    python benchmark_osm_classifier.py houston.json
+
+Without saved responses, a synthetic response with the tag mix of a large
+city is generated.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from ev_agent.api_handler.api_01_NeighborhoodSummary import (
+    OSM_CATEGORY_DATACLASSES,
+    LocationAPI,
+    OSMElementClassifier,
+    OverpassAPI,
+    RawDataProcessor,
+)
+
+RAW_PROCESSORS = {
+    "healthcare": RawDataProcessor.process_healthcare,
+    "education": RawDataProcessor.process_education,
+    "transport": RawDataProcessor.process_transport,
+    "roads": RawDataProcessor.process_roads,
+    "retail": RawDataProcessor.process_retail,
+    "food": RawDataProcessor.process_food_drink,
+    "leisure": RawDataProcessor.process_leisure,
+    "buildings": RawDataProcessor.process_buildings,
+    "parking": RawDataProcessor.process_parking,
+    "emergency": RawDataProcessor.process_emergency,
+    "entertainment": RawDataProcessor.process_entertainment,
+    "automotive": RawDataProcessor.process_automotive,
+    "amenities": RawDataProcessor.process_amenities,
+}
+
+SYNTHETIC_LOCATION = {"bbox": ["29.52", "30.11", "-95.91", "-95.01"]}
+
+# Tags of tagged elements, most of a response are untagged skeleton nodes
+SYNTHETIC_TAGS = [
+    ("node", {"amenity": value})
+    for value in [
+        "restaurant", "cafe", "fast_food", "bench", "parking", "school",
+        "pharmacy", "bank", "atm", "fuel", "charging_station", "toilets",
+        "police", "cinema", "place_of_worship", "bicycle_parking",
+    ]
+] + [
+    ("node", {"highway": "bus_stop", "public_transport": "platform"}),
+    ("node", {"shop": "convenience"}),
+    ("node", {"shop": "supermarket"}),
+    ("node", {"shop": "car_repair"}),
+    ("node", {"leisure": "playground"}),
+    ("node", {"railway": "station", "public_transport": "station"}),
+    ("way", {"highway": "residential"}),
+    ("way", {"highway": "service"}),
+    ("way", {"highway": "footway"}),
+    ("way", {"highway": "primary", "bridge": "yes"}),
+    ("way", {"building": "house"}),
+    ("way", {"building": "apartments"}),
+    ("way", {"building": "retail"}),
+    ("way", {"amenity": "parking", "parking": "surface"}),
+    ("way", {"amenity": "parking", "disabled": "yes"}),
+    ("way", {"leisure": "park"}),
+    ("way", {"landuse": "residential"}),
+    ("way", {"landuse": "grass"}),
+    ("way", {"natural": "water"}),
+]  # fmt: skip
+
+
+def record_response(city: str, state: str, output: str) -> None:
+    """Download the Overpass response of a city and save a copy of it."""
+    location = LocationAPI.get_city_coordinates(city, state, debug=True)
+    if not location:
+        raise SystemExit(f"Location not found: {city}, {state}")
+    city_data = OverpassAPI.get_city_data(
+        city, location["bbox"], debug=True, stream=True
+    )
+    if not city_data:
+        raise SystemExit(f"No Overpass data for {city}, {state}")
+    shutil.copyfile(city_data["elements_path"], output)
+    with open(f"{output}.location.json", "w", encoding="utf-8") as f:
+        json.dump(location, f)
+    print(f"Saved the response of {city}, {state} to {output}")
+
+
+def synthetic_response(path: str, num_elements: int, seed: int = 0) -> None:
+    """Write a synthetic Overpass response with num_elements elements."""
+    rng = random.Random(seed)
+    elements = []
+    for i in range(num_elements):
+        if rng.random() < 0.6:
+            elements.append({"type": "node", "id": i, "lat": 29.7, "lon": -95.4})
+            continue
+        element_type, tags = rng.choice(SYNTHETIC_TAGS)
+        tags = dict(tags, name=f"Feature {i}")
+        if rng.random() < 0.3:
+            tags["addr:street"] = "Main Street"
+        element = {"type": element_type, "id": i, "tags": tags}
+        if element_type == "way":
+            element["nodes"] = list(range(i, i + 8))
+        elements.append(element)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": 0.6, "generator": "synthetic", "elements": elements}, f)
+
+
+def per_category_passes(path: str, location: dict) -> dict:
+    """Load the response and run every RawDataProcessor method over it."""
+    elements = OverpassAPI.load_elements(path)
+    results = {name: process(elements) for name, process in RAW_PROCESSORS.items()}
+    results["area_metrics"] = RawDataProcessor.process_area_metrics(location, elements)
+    return results
+
+
+def classify(elements, location: dict) -> dict:
+    classifier = OSMElementClassifier().update(elements)
+    results = {name: classifier.summarize(name) for name in OSM_CATEGORY_DATACLASSES}
+    results["area_metrics"] = classifier.summarize_area_metrics(location)
+    return results
+
+
+def measure(fn, *args) -> tuple:
+    """Return the result, seconds and peak traced memory in MB of a call."""
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+    # Tracing slows allocations down, memory is measured in a separate run
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main() -> None:
+    """Run the benchmark, or save a response with --record."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("responses", nargs="*", help="Saved Overpass responses")
+    parser.add_argument("--record", nargs=2, metavar=("CITY", "STATE"))
+    parser.add_argument("--output", default="overpass_response.json")
+    parser.add_argument("--num-elements", type=int, default=500_000)
+    args = parser.parse_args()
+
+    if args.record:
+        record_response(*args.record, args.output)
+        return
+
+    responses = {}
+    for path in args.responses:
+        location_path = f"{path}.location.json"
+        location = SYNTHETIC_LOCATION
+        if os.path.exists(location_path):
+            with open(location_path, encoding="utf-8") as f:
+                location = json.load(f)
+        responses[path] = location
+
+    tmp_dir = None
+    if not responses:
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, "synthetic.json")
+        synthetic_response(path, args.num_elements)
+        responses[path] = SYNTHETIC_LOCATION
+
+    try:
+        for path, location in responses.items():
+            size_mb = os.path.getsize(path) / 2**20
+            print(f"{path}: {size_mb:.1f} MB")
+            expected, seconds, peak = measure(per_category_passes, path, location)
+            print(f"  load + per-category passes: {seconds:.2f}s, peak {peak:.1f} MB")
+
+            def load_and_classify():
+                return classify(OverpassAPI.load_elements(path), location)
+
+            def stream_and_classify():
+                return classify(OverpassAPI.iter_elements(path), location)
+
+            for name, fn in [
+                ("load + single pass", load_and_classify),
+                ("stream + single pass", stream_and_classify),
+            ]:
+                result, fn_seconds, fn_peak = measure(fn)
+                assert result == expected, f"{name} counts differ"
+                print(
+                    f"  {name}: {fn_seconds:.2f}s ({seconds / fn_seconds:.1f}x), "
+                    f"peak {fn_peak:.1f} MB"
+                )
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
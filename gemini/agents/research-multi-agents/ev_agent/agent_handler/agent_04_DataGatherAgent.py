@@ -95,10 +95,17 @@ class DataGatherAgentOutput:
 
 
 class DataGatherAgent:
-    def __init__(self, api_key: str, radius_miles: float = 100.0, debug: bool = False):
+    def __init__(
+        self,
+        api_key: str,
+        radius_miles: float = 100.0,
+        max_total_stations: int = DEFAULT_MAX_TOTAL_STATIONS,
+        debug: bool = False,
+    ):
         """Initialize the agent with API configuration."""
         self.api_key = api_key
         self.radius_miles = radius_miles
+        self.max_total_stations = max_total_stations
         self.debug = debug
         self.processor = CitySummaryProcessor()
         self.printer = ColorPrinter()
@@ -126,10 +133,9 @@ class DataGatherAgent:
             )
 
         try:
-            # Add small delay between cities to prevent rate limiting
-            await asyncio.sleep(1)
-
-            # Create tasks for both API calls
+            # Both API calls share one HTTP client across all cities, which
+            # rate limits every API host, geocodes each city once and caches
+            # responses on disk
             summary_task = asyncio.create_task(self._get_city_summary(city, state))
             ev_task = asyncio.create_task(self._get_ev_data(city, state))
 
@@ -169,9 +175,7 @@ class DataGatherAgent:
         }
 
         try:
-            summary = await asyncio.to_thread(
-                self.processor.create_city_summary, payload
-            )
+            summary = await self.processor.acreate_city_summary(payload)
 
             if self.debug:
                 self.printer.print_message(
@@ -196,12 +200,12 @@ class DataGatherAgent:
             "state": state,
             "api_key": self.api_key,
             "radius_miles": self.radius_miles,
+            "max_total_stations": self.max_total_stations,
             "debug": self.debug,
         }
 
         try:
-            # Convert synchronous call to async using asyncio
-            result = await asyncio.to_thread(get_charging_stations, payload)
+            result = await aget_charging_stations(payload)
 
             if self.debug:
                 self.printer.print_message(f"Received EV data for {city}", "success")
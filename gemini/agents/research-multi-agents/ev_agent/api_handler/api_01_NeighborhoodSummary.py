@@ -259,91 +259,73 @@ class NeighborhoodSummary:
         }
 
 
+import asyncio
+from collections import Counter
 from datetime import datetime
+import json
+import os
+import re
 import time
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import quote
 
-import requests
+from ev_agent.api_handler.http_client import geocode_city, get_http_client, run_sync
 
 
 class APIConfig:
     """API configuration and constants"""
 
-    NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
     OVERPASS_URL = "https://overpass-api.de/api/interpreter"
-    USER_AGENT = "EV-Planning-Tool/1.0"
-    MAX_RETRIES = 3
-    RETRY_DELAY = 2  # seconds
     TIMEOUT = 180  # seconds
+    OVERPASS_CACHE_TTL = 7 * 24 * 3600  # seconds
+
+
+# Start of the elements array in an Overpass JSON response
+OVERPASS_ELEMENTS_START = re.compile(r'"elements"\s*:\s*\[')
+# End of an Overpass JSON response: the elements array closed, followed by
+# the runtime error (e.g. timeout or out of memory) Overpass appends when
+# the result is incomplete despite a 200 status
+OVERPASS_RESPONSE_END = re.compile(
+    r'\]\s*(?:,\s*"remark"\s*:\s*("(?:[^"\\]|\\.)*")\s*)?\}\s*$'
+)
+# Bytes read from each end of a saved response to validate it
+OVERPASS_VALIDATE_BYTES = 1 << 16
 
 
 class LocationAPI:
     """Handles Nominatim API interactions"""
 
     @staticmethod
-    def get_city_coordinates(
+    async def aget_city_coordinates(
         city: str, state: str, debug: bool = False
     ) -> Optional[Dict[str, Any]]:
         """Get city coordinates and boundary information"""
         try:
-            headers = {"User-Agent": APIConfig.USER_AGENT}
-            params = {
-                "city": city,
-                "state": state,
-                "country": "USA",
-                "format": "json",
-                "limit": 1,
-            }
-
-            if debug:
-                print(f"\nDebug: Querying Nominatim API for {city}, {state}")
-                print(f"Debug: Parameters: {params}")
-
-            for attempt in range(APIConfig.MAX_RETRIES):
-                try:
-                    response = requests.get(
-                        APIConfig.NOMINATIM_URL,
-                        params=params,
-                        headers=headers,
-                        timeout=APIConfig.TIMEOUT,
-                    )
-
-                    if debug:
-                        print(
-                            f"Debug: Attempt {attempt + 1} - Status: {response.status_code}"
-                        )
-
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data:
-                            return {
-                                "bbox": data[0]["boundingbox"],
-                                "osm_id": data[0].get("osm_id"),
-                                "lat": data[0]["lat"],
-                                "lon": data[0]["lon"],
-                                "display_name": data[0]["display_name"],
-                                "timestamp": datetime.now().isoformat(),
-                            }
-                    elif response.status_code == 429:
-                        if debug:
-                            print(
-                                f"Debug: Rate limited, waiting {APIConfig.RETRY_DELAY}s"
-                            )
-                        time.sleep(APIConfig.RETRY_DELAY)
-
-                except requests.Timeout:
-                    if debug:
-                        print(f"Debug: Timeout on attempt {attempt + 1}")
-                    time.sleep(APIConfig.RETRY_DELAY)
+            location = await geocode_city(city, state, debug)
+            if not location:
+                return None
 
-            return None
+            return {
+                "bbox": location["boundingbox"],
+                "osm_id": location.get("osm_id"),
+                "lat": location["lat"],
+                "lon": location["lon"],
+                "display_name": location["display_name"],
+                "timestamp": datetime.now().isoformat(),
+            }
 
         except Exception as e:
             if debug:
                 print(f"Debug: Error in get_city_coordinates: {str(e)}")
             return None
 
+    @staticmethod
+    def get_city_coordinates(
+        city: str, state: str, debug: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Get city coordinates and boundary information"""
+        return run_sync(LocationAPI.aget_city_coordinates(city, state, debug))
+
 
 class OverpassAPI:
     """Handles Overpass API interactions"""
@@ -424,10 +406,16 @@ class OverpassAPI:
         out skel qt;"""
 
     @staticmethod
-    def get_city_data(
-        city: str, bbox: list, debug: bool = False
+    async def aget_city_data(
+        city: str, bbox: list, debug: bool = False, stream: bool = False
     ) -> Optional[Dict[str, Any]]:
-        """Get raw city data from Overpass API"""
+        """
+        Get raw city data from Overpass API.
+
+        The response is streamed to the response cache. With stream=True it
+        is not loaded: "elements_path" points to the saved response instead
+        of an "elements" list, iterate over it with OverpassAPI.iter_elements.
+        """
         try:
             start_time = time.time()
             query = OverpassAPI.build_query(city, bbox)
@@ -436,87 +424,169 @@ class OverpassAPI:
                 print("\nDebug: Sending Overpass API request")
                 print(f"Debug: Query length: {len(query)} characters")
 
-            for attempt in range(APIConfig.MAX_RETRIES):
-                try:
-                    response = requests.post(
-                        APIConfig.OVERPASS_URL,
-                        data={"data": query},
-                        timeout=APIConfig.TIMEOUT,
-                    )
+            path = await get_http_client().download(
+                "POST",
+                APIConfig.OVERPASS_URL,
+                data={"data": query},
+                timeout=APIConfig.TIMEOUT,
+                cache_ttl=APIConfig.OVERPASS_CACHE_TTL,
+                validate=OverpassAPI.validate_response,
+                debug=debug,
+            )
+            query_time = time.time() - start_time
 
-                    if debug:
-                        print(
-                            f"Debug: Attempt {attempt + 1} - Status: {response.status_code}"
-                        )
+            result = {
+                "timestamp": datetime.now().isoformat(),
+                "query_time_seconds": query_time,
+            }
+            if stream:
+                if debug:
+                    print(f"Debug: Saved Overpass response to {path}")
+                    print(f"Debug: Query time: {query_time:.2f} seconds")
+                result["elements_path"] = path
+                return result
+
+            elements = await asyncio.to_thread(OverpassAPI.load_elements, path)
+            type_counts = Counter(e.get("type") for e in elements)
+            result.update(
+                {
+                    "elements": elements,
+                    "node_count": type_counts["node"],
+                    "way_count": type_counts["way"],
+                    "relation_count": type_counts["relation"],
+                }
+            )
 
-                    if response.status_code == 200:
-                        data = response.json()
-                        query_time = time.time() - start_time
-
-                        result = {
-                            "elements": data.get("elements", []),
-                            "timestamp": datetime.now().isoformat(),
-                            "query_time_seconds": query_time,
-                            "node_count": sum(
-                                1
-                                for e in data.get("elements", [])
-                                if e.get("type") == "node"
-                            ),
-                            "way_count": sum(
-                                1
-                                for e in data.get("elements", [])
-                                if e.get("type") == "way"
-                            ),
-                            "relation_count": sum(
-                                1
-                                for e in data.get("elements", [])
-                                if e.get("type") == "relation"
-                            ),
-                        }
-
-                        if debug:
-                            print(
-                                f"Debug: Retrieved {len(result['elements'])} elements"
-                            )
-                            print(
-                                f"Debug: {result['node_count']} nodes, {result['way_count']} ways"
-                            )
-                            print(f"Debug: Query time: {query_time:.2f} seconds")
-
-                        return result
-
-                    elif response.status_code == 429:
-                        if debug:
-                            print(
-                                f"Debug: Rate limited, waiting {APIConfig.RETRY_DELAY}s"
-                            )
-                        time.sleep(APIConfig.RETRY_DELAY)
-
-                except requests.Timeout:
-                    if debug:
-                        print(f"Debug: Timeout on attempt {attempt + 1}")
-                    if attempt < APIConfig.MAX_RETRIES - 1:
-                        time.sleep(APIConfig.RETRY_DELAY)
+            if debug:
+                print(f"Debug: Retrieved {len(result['elements'])} elements")
+                print(
+                    f"Debug: {result['node_count']} nodes, {result['way_count']} ways"
+                )
+                print(f"Debug: Query time: {query_time:.2f} seconds")
 
-            return None
+            return result
 
         except Exception as e:
             if debug:
                 print(f"Debug: Error in get_city_data: {str(e)}")
             return None
 
+    @staticmethod
+    def get_city_data(
+        city: str, bbox: list, debug: bool = False, stream: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Get raw city data from Overpass API"""
+        return run_sync(OverpassAPI.aget_city_data(city, bbox, debug, stream))
 
-def fetch_city_data(
-    city: str, state: str, debug: bool = False
+    @staticmethod
+    def validate_response(path: str) -> None:
+        """
+        Check that a saved Overpass response is a complete result: a JSON
+        object with an elements array and no runtime error remark. Only
+        the ends of the file are read.
+
+        Raises:
+            ValueError: The response is not a complete result
+        """
+        with open(path, "rb") as f:
+            head = f.read(OVERPASS_VALIDATE_BYTES).decode("utf-8", "replace")
+            f.seek(max(f.seek(0, os.SEEK_END) - OVERPASS_VALIDATE_BYTES, 0))
+            tail = f.read().decode("utf-8", "replace")
+
+        if not head.lstrip().startswith("{") or not OVERPASS_ELEMENTS_START.search(
+            head
+        ):
+            raise ValueError(f"No elements array in Overpass response: {path}")
+        end = OVERPASS_RESPONSE_END.search(tail)
+        if not end:
+            raise ValueError(f"Truncated Overpass response: {path}")
+        if end.group(1):
+            raise ValueError(f"Overpass error: {json.loads(end.group(1))}")
+
+    @staticmethod
+    def check_response(data: Any) -> bool:
+        """
+        Whether a decoded Overpass response is a complete result: a JSON
+        object with an elements list and no runtime error remark. The
+        in-memory counterpart of validate_response, used by load_elements.
+        """
+        return isinstance(data, dict) and "elements" in data and "remark" not in data
+
+    @staticmethod
+    def load_elements(path: str) -> List[Dict]:
+        """Load all elements of a saved Overpass JSON response"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not OverpassAPI.check_response(data):
+            remark = data.get("remark") if isinstance(data, dict) else None
+            raise ValueError(
+                f"Overpass error: {remark}"
+                if remark
+                else f"No elements array in Overpass response: {path}"
+            )
+        return data["elements"]
+
+    @staticmethod
+    def iter_elements(path: str, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+        """
+        Yield the elements of a saved Overpass JSON response one at a time.
+        The file is read in chunks, only the element being decoded is
+        buffered, so large responses never sit in memory as a whole.
+        """
+        decoder = json.JSONDecoder()
+        with open(path, encoding="utf-8") as f:
+            # Skip the header up to the start of the elements array
+            buffer = ""
+            while True:
+                chunk = f.read(chunk_size)
+                buffer += chunk
+                match = OVERPASS_ELEMENTS_START.search(buffer)
+                if match:
+                    pos = match.end()
+                    break
+                if not chunk:
+                    raise ValueError(f"No elements array in Overpass response: {path}")
+                # Keep a tail in case the key is split across chunks
+                buffer = buffer[-64:]
+
+            while True:
+                # Skip separators, reading more once the buffer is consumed
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos == len(buffer):
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        raise ValueError(f"Truncated Overpass response: {path}")
+                    buffer, pos = chunk, 0
+                    continue
+                if buffer[pos] == "]":
+                    return
+
+                try:
+                    element, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # The element continues in the next chunk
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        raise
+                    buffer, pos = buffer[pos:] + chunk, 0
+                    continue
+                yield element
+
+
+async def afetch_city_data(
+    city: str, state: str, debug: bool = False, stream: bool = False
 ) -> Tuple[Optional[Dict], Optional[Dict]]:
     """Fetch all raw city data from both APIs"""
-    location_data = LocationAPI.get_city_coordinates(city, state, debug)
+    location_data = await LocationAPI.aget_city_coordinates(city, state, debug)
     if not location_data:
         if debug:
             print("Debug: Failed to get location data")
         return None, None
 
-    city_data = OverpassAPI.get_city_data(city, location_data["bbox"], debug)
+    city_data = await OverpassAPI.aget_city_data(
+        city, location_data["bbox"], debug, stream
+    )
     if not city_data:
         if debug:
             print("Debug: Failed to get city data")
@@ -525,6 +595,13 @@ def fetch_city_data(
     return location_data, city_data
 
 
+def fetch_city_data(
+    city: str, state: str, debug: bool = False, stream: bool = False
+) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """Fetch all raw city data from both APIs"""
+    return run_sync(afetch_city_data(city, state, debug, stream))
+
+
 from datetime import datetime
 import math
 from typing import Any, Dict, List
@@ -902,6 +979,32 @@ class RawDataProcessor:
 
     @staticmethod
     def process_area_metrics(location_data: Dict, elements: List[Dict]) -> AreaMetrics:
+        # Count areas by type (no processing, just raw counts converted to area)
+        water_ways = sum(
+            1
+            for e in elements
+            if e.get("type") == "way" and e.get("tags", {}).get("natural") == "water"
+        )
+        green_ways = sum(
+            1
+            for e in elements
+            if e.get("type") == "way" and e.get("tags", {}).get("landuse") == "grass"
+        )
+        built_ways = sum(
+            1
+            for e in elements
+            if e.get("type") == "way"
+            and e.get("tags", {}).get("landuse")
+            in ["residential", "commercial", "industrial"]
+        )
+        return RawDataProcessor.area_metrics_from_counts(
+            location_data, water_ways, green_ways, built_ways
+        )
+
+    @staticmethod
+    def area_metrics_from_counts(
+        location_data: Dict, water_ways: int, green_ways: int, built_ways: int
+    ) -> AreaMetrics:
         metrics = AreaMetrics()
 
         # Get bounds
@@ -927,25 +1030,6 @@ class RawDataProcessor:
         height = R * abs(lat2 - lat1)
         metrics.total_area_sqkm = width * height
 
-        # Count areas by type (no processing, just raw counts converted to area)
-        water_ways = sum(
-            1
-            for e in elements
-            if e.get("type") == "way" and e.get("tags", {}).get("natural") == "water"
-        )
-        green_ways = sum(
-            1
-            for e in elements
-            if e.get("type") == "way" and e.get("tags", {}).get("landuse") == "grass"
-        )
-        built_ways = sum(
-            1
-            for e in elements
-            if e.get("type") == "way"
-            and e.get("tags", {}).get("landuse")
-            in ["residential", "commercial", "industrial"]
-        )
-
         # Simple proportional area assignment
         total_counted_ways = water_ways + green_ways + built_ways
         if total_counted_ways > 0:
@@ -962,6 +1046,379 @@ class RawDataProcessor:
         return metrics
 
 
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+
+@dataclass
+class CategoryRules:
+    """
+    Tag rules of a summary category, the table form of a RawDataProcessor
+    method. Each chain is an if/elif chain: an element counts towards the
+    field of the first rule of a chain whose tag conditions all match.
+    Conditions map a tag to a value or a tuple of accepted values.
+    """
+
+    chains: List[List[Tuple[str, Dict[str, Union[str, Tuple[str, ...]]]]]]
+    element_type: Optional[str] = None
+
+
+OSM_CATEGORY_RULES = {
+    "healthcare": CategoryRules(
+        chains=[
+            [
+                ("hospitals", {"amenity": "hospital"}),
+                ("clinics", {"amenity": "clinic"}),
+                ("doctors", {"amenity": "doctors"}),
+                ("dentists", {"amenity": "dentist"}),
+                ("pharmacies", {"amenity": "pharmacy"}),
+                ("healthcare_centres", {"amenity": "healthcare"}),
+                ("veterinary", {"amenity": "veterinary"}),
+            ]
+        ]
+    ),
+    "transport": CategoryRules(
+        chains=[
+            [
+                ("transport_platforms", {"public_transport": "platform"}),
+                ("bus_stations", {"public_transport": "station"}),
+            ],
+            [
+                ("bus_stops", {"highway": "bus_stop"}),
+                ("train_stations", {"railway": "station"}),
+                ("subway_stations", {"railway": "subway_entrance"}),
+                ("tram_stops", {"railway": "tram_stop"}),
+                ("ferry_terminals", {"amenity": "ferry_terminal"}),
+                ("taxi_stands", {"amenity": "taxi"}),
+                ("bike_rental", {"amenity": "bicycle_rental"}),
+            ],
+        ]
+    ),
+    "roads": CategoryRules(
+        element_type="way",
+        chains=[
+            [
+                ("motorways", {"highway": "motorway"}),
+                ("trunks", {"highway": "trunk"}),
+                ("primary_roads", {"highway": "primary"}),
+                ("secondary_roads", {"highway": "secondary"}),
+                ("tertiary_roads", {"highway": "tertiary"}),
+                ("residential_roads", {"highway": "residential"}),
+                ("service_roads", {"highway": "service"}),
+                ("cycleways", {"highway": "cycleway"}),
+                ("footways", {"highway": "footway"}),
+            ],
+            [("bridges", {"bridge": "yes"})],
+            [("tunnels", {"tunnel": "yes"})],
+        ],
+    ),
+    "buildings": CategoryRules(
+        element_type="way",
+        chains=[
+            [
+                ("residential", {"building": ("residential", "house", "detached")}),
+                ("apartments", {"building": "apartments"}),
+                ("commercial", {"building": "commercial"}),
+                ("retail", {"building": "retail"}),
+                ("industrial", {"building": "industrial"}),
+                ("warehouse", {"building": "warehouse"}),
+                ("office", {"building": "office"}),
+                ("government", {"building": "government"}),
+                ("hospital", {"building": "hospital"}),
+                ("school", {"building": "school"}),
+                ("university", {"building": "university"}),
+                ("hotel", {"building": "hotel"}),
+                ("parking", {"building": "parking"}),
+            ]
+        ],
+    ),
+    "education": CategoryRules(
+        chains=[
+            [
+                ("schools", {"amenity": "school"}),
+                ("schools", {"building": "school"}),
+                ("kindergartens", {"amenity": "kindergarten"}),
+                ("colleges", {"amenity": "college"}),
+                ("universities", {"amenity": "university"}),
+                ("universities", {"building": "university"}),
+                ("libraries", {"amenity": "library"}),
+                ("training_centers", {"amenity": "training"}),
+                ("language_schools", {"amenity": "language_school"}),
+                ("music_schools", {"amenity": "music_school"}),
+            ]
+        ]
+    ),
+    "retail": CategoryRules(
+        chains=[
+            [
+                ("malls", {"shop": "mall"}),
+                ("supermarkets", {"shop": "supermarket"}),
+                ("department_stores", {"shop": "department_store"}),
+                ("convenience_stores", {"shop": "convenience"}),
+                ("grocery_stores", {"shop": ("grocery", "greengrocer")}),
+                ("markets", {"shop": "marketplace"}),
+                ("markets", {"amenity": "marketplace"}),
+            ],
+            [("retail_parks", {"landuse": "retail"})],
+            [
+                ("shopping_centres", {"building": "retail"}),
+                ("shopping_centres", {"shop": "shopping_centre"}),
+            ],
+        ]
+    ),
+    "food": CategoryRules(
+        chains=[
+            [
+                ("restaurants", {"amenity": "restaurant"}),
+                ("cafes", {"amenity": "cafe"}),
+                ("fast_food", {"amenity": "fast_food"}),
+                ("pubs", {"amenity": "pub"}),
+                ("bars", {"amenity": "bar"}),
+                ("food_courts", {"amenity": "food_court"}),
+                ("ice_cream", {"amenity": "ice_cream"}),
+                ("bistros", {"amenity": "bistro"}),
+            ]
+        ]
+    ),
+    "parking": CategoryRules(
+        chains=[
+            [
+                ("surface_parking", {"amenity": "parking", "parking": "surface"}),
+                (
+                    "parking_structures",
+                    {"amenity": "parking", "parking": "multi-storey"},
+                ),
+                ("street_parking", {"amenity": "parking", "parking": "street_side"}),
+                # Count as surface parking by default
+                ("surface_parking", {"amenity": "parking"}),
+            ],
+            [("bike_parking", {"amenity": "bicycle_parking"})],
+            [("parking_spaces", {"amenity": "parking_space"})],
+            [("ev_charging", {"amenity": "charging_station"})],
+            [("disabled_parking", {"amenity": "parking", "disabled": "yes"})],
+        ]
+    ),
+    "emergency": CategoryRules(
+        chains=[
+            [
+                ("police_stations", {"amenity": "police"}),
+                ("fire_stations", {"amenity": "fire_station"}),
+                ("ambulance_stations", {"amenity": "ambulance_station"}),
+                ("emergency_posts", {"amenity": "emergency_post"}),
+                ("rescue_stations", {"amenity": "rescue_station"}),
+            ],
+            [
+                (
+                    "disaster_response",
+                    {"emergency": ("disaster_response", "emergency_ward")},
+                )
+            ],
+        ]
+    ),
+    "entertainment": CategoryRules(
+        chains=[
+            [
+                ("cinemas", {"amenity": "cinema"}),
+                ("theatres", {"amenity": "theatre"}),
+                ("arts_centres", {"amenity": "arts_centre"}),
+                ("nightclubs", {"amenity": "nightclub"}),
+                ("community_centres", {"amenity": "community_centre"}),
+                ("event_venues", {"building": "events_venue"}),
+                ("event_venues", {"amenity": "events_venue"}),
+                ("museums", {"amenity": "museum"}),
+                ("galleries", {"amenity": "gallery"}),
+            ]
+        ]
+    ),
+    "automotive": CategoryRules(
+        chains=[
+            [
+                ("car_dealerships", {"shop": "car"}),
+                ("car_repair", {"shop": "car_repair"}),
+                ("car_wash", {"amenity": "car_wash"}),
+                ("car_rental", {"amenity": "car_rental"}),
+                ("car_sharing", {"amenity": "car_sharing"}),
+                ("fuel_stations", {"amenity": "fuel"}),
+                ("ev_charging_stations", {"amenity": "charging_station"}),
+            ]
+        ]
+    ),
+    "amenities": CategoryRules(
+        chains=[
+            [
+                ("post_offices", {"amenity": "post_office"}),
+                ("banks", {"amenity": "bank"}),
+                ("atms", {"amenity": "atm"}),
+                ("toilets", {"amenity": "toilets"}),
+                ("recycling", {"amenity": "recycling"}),
+                ("waste_disposal", {"amenity": "waste_disposal"}),
+                ("water_points", {"amenity": ("water_point", "drinking_water")}),
+                ("benches", {"amenity": "bench"}),
+            ]
+        ]
+    ),
+    "leisure": CategoryRules(
+        chains=[
+            [
+                ("parks", {"leisure": "park"}),
+                ("sports_centres", {"leisure": "sports_centre"}),
+                ("fitness_centers", {"leisure": ("fitness_center", "fitness_centre")}),
+                ("swimming_pools", {"leisure": "swimming_pool"}),
+                ("stadiums", {"leisure": "stadium"}),
+                ("playgrounds", {"leisure": "playground"}),
+                ("recreation_grounds", {"leisure": "recreation_ground"}),
+                ("golf_courses", {"leisure": "golf_course"}),
+            ],
+            # Also check amenity tags for sports/leisure
+            [
+                ("swimming_pools", {"amenity": "swimming_pool"}),
+                ("sports_centres", {"amenity": "sports_centre"}),
+            ],
+        ]
+    ),
+    # Way counts the area metrics are derived from
+    "area_metrics": CategoryRules(
+        element_type="way",
+        chains=[
+            [("water_ways", {"natural": "water"})],
+            [("green_ways", {"landuse": "grass"})],
+            [("built_ways", {"landuse": ("residential", "commercial", "industrial")})],
+        ],
+    ),
+}
+
+OSM_CATEGORY_DATACLASSES = {
+    "healthcare": HealthcareFacilities,
+    "education": EducationalFacilities,
+    "transport": TransportFacilities,
+    "roads": RoadNetwork,
+    "retail": Retail,
+    "food": FoodAndDrink,
+    "leisure": LeisureFacilities,
+    "buildings": Buildings,
+    "parking": Parking,
+    "emergency": EmergencyServices,
+    "entertainment": Entertainment,
+    "automotive": Automotive,
+    "amenities": PublicAmenities,
+}
+
+
+class OSMElementClassifier:
+    """
+    Counts OSM elements into the fields of every requested category in a
+    single pass, driven by OSM_CATEGORY_RULES. Produces the same counts as
+    the RawDataProcessor methods, which each walk all elements.
+
+    Chains are indexed by the tag and value of the first condition of each
+    of their rules, so an element only evaluates the chains its tags can
+    match. Elements can be fed in batches or as a stream with update().
+    """
+
+    def __init__(self, categories: Iterable[str] = tuple(OSM_CATEGORY_RULES)):
+        self.categories = [c for c in categories if c in OSM_CATEGORY_RULES]
+        self.total_elements = 0
+        self.type_counts: Dict[str, int] = {}
+
+        # Flat counter list, (category, field) -> index
+        self._counter_ids: Dict[Tuple[str, str], int] = {}
+        # Per chain: element type and rules as (conditions, counter index)
+        self._chains: List[Tuple[Optional[str], list]] = []
+        # tag -> value -> ids of the chains a matching element may count in
+        self._index: Dict[str, Dict[str, List[int]]] = {}
+
+        for category in self.categories:
+            category_rules = OSM_CATEGORY_RULES[category]
+            for chain in category_rules.chains:
+                chain_id = len(self._chains)
+                rules = []
+                for field_name, conditions in chain:
+                    counter_id = self._counter_ids.setdefault(
+                        (category, field_name), len(self._counter_ids)
+                    )
+                    conditions = [
+                        (tag, {values} if isinstance(values, str) else set(values))
+                        for tag, values in conditions.items()
+                    ]
+                    rules.append((conditions, counter_id))
+                    trigger_tag, trigger_values = conditions[0]
+                    for value in trigger_values:
+                        chain_ids = self._index.setdefault(trigger_tag, {}).setdefault(
+                            value, []
+                        )
+                        if chain_id not in chain_ids:
+                            chain_ids.append(chain_id)
+                self._chains.append((category_rules.element_type, rules))
+
+        self._counts = [0] * len(self._counter_ids)
+
+    def update(self, elements: Iterable[Dict]) -> "OSMElementClassifier":
+        """Count a batch or a stream of elements"""
+        index = self._index
+        chains = self._chains
+        counts = self._counts
+        type_counts = self.type_counts
+        for element in elements:
+            self.total_elements += 1
+            element_type = element.get("type")
+            type_counts[element_type] = type_counts.get(element_type, 0) + 1
+            tags = element.get("tags")
+            if not tags:
+                continue
+
+            matched_chains = None
+            for tag, value in tags.items():
+                values = index.get(tag)
+                if values is not None:
+                    chain_ids = values.get(value)
+                    if chain_ids is not None:
+                        # Most elements match a single tag, only merge when
+                        # a chain may be reached through several tags
+                        matched_chains = (
+                            chain_ids
+                            if matched_chains is None
+                            else {*matched_chains, *chain_ids}
+                        )
+            if matched_chains is None:
+                continue
+
+            for chain_id in matched_chains:
+                chain_element_type, rules = chains[chain_id]
+                if chain_element_type and chain_element_type != element_type:
+                    continue
+                for conditions, counter_id in rules:
+                    for tag, values in conditions:
+                        if tags.get(tag) not in values:
+                            break
+                    else:
+                        counts[counter_id] += 1
+                        break
+        return self
+
+    def get_counts(self, category: str) -> Dict[str, int]:
+        """Return the counts of the rule fields of a category"""
+        return {
+            field_name: self._counts[counter_id]
+            for (counter_category, field_name), counter_id in self._counter_ids.items()
+            if counter_category == category
+        }
+
+    def summarize(self, category: str) -> Any:
+        """Return the counts of a category as its summary dataclass"""
+        return OSM_CATEGORY_DATACLASSES[category](**self.get_counts(category))
+
+    def summarize_area_metrics(self, location_data: Dict) -> AreaMetrics:
+        """Return the area metrics of the city bounds from the way counts"""
+        counts = self.get_counts("area_metrics")
+        return RawDataProcessor.area_metrics_from_counts(
+            location_data,
+            counts.get("water_ways", 0),
+            counts.get("green_ways", 0),
+            counts.get("built_ways", 0),
+        )
+
+
+import asyncio
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Set, Union
 
@@ -969,7 +1426,7 @@ from typing import Any, Dict, List, Optional, Set, Union
 class CitySummaryProcessor:
     """
     Processes city data and creates summaries based on configurable payloads.
-    Uses RawDataProcessor for the actual data processing.
+    Uses OSMElementClassifier to count all categories in one pass.
     """
 
     def __init__(self):
@@ -1041,7 +1498,7 @@ class CitySummaryProcessor:
         self,
         category: str,
         category_config: Union[bool, List[str]],
-        elements: List[Dict],
+        classifier: "OSMElementClassifier",
         location_data: Optional[Dict] = None,
     ) -> Any:
         """Process a single category based on configuration"""
@@ -1049,27 +1506,10 @@ class CitySummaryProcessor:
             category_config, self.category_fields[category]
         )
 
-        # Map categories to their processor methods
-        processors = {
-            "healthcare": RawDataProcessor.process_healthcare,
-            "education": RawDataProcessor.process_education,
-            "transport": RawDataProcessor.process_transport,
-            "roads": RawDataProcessor.process_roads,
-            "retail": RawDataProcessor.process_retail,
-            "food": RawDataProcessor.process_food_drink,
-            "leisure": RawDataProcessor.process_leisure,
-            "buildings": RawDataProcessor.process_buildings,
-            "parking": RawDataProcessor.process_parking,
-            "emergency": RawDataProcessor.process_emergency,
-            "entertainment": RawDataProcessor.process_entertainment,
-            "automotive": RawDataProcessor.process_automotive,
-            "amenities": RawDataProcessor.process_amenities,
-        }
-
         if category == "area_metrics" and location_data:
-            processed = RawDataProcessor.process_area_metrics(location_data, elements)
-        elif category in processors:
-            processed = processors[category](elements)
+            processed = classifier.summarize_area_metrics(location_data)
+        elif category in OSM_CATEGORY_DATACLASSES:
+            processed = classifier.summarize(category)
         else:
             return None
 
@@ -1087,18 +1527,56 @@ class CitySummaryProcessor:
         Returns:
             NeighborhoodSummary object or None if data fetching fails
         """
-        # Extract basic parameters
-        city = payload["city"]
-        state = payload["state"]
+        city, state, debug = self._get_payload_params(payload)
+        location_data, city_data = fetch_city_data(city, state, debug, stream=True)
+        return self._build_city_summary(payload, location_data, city_data)
+
+    async def acreate_city_summary(
+        self, payload: Dict[str, Any]
+    ) -> Optional[NeighborhoodSummary]:
+        """
+        Create city summary from a configuration payload without blocking
+        the event loop: data is fetched with the shared async HTTP client
+        and processed in a worker thread.
+
+        Args:
+            payload: Dict containing city, state, and configuration options
+
+        Returns:
+            NeighborhoodSummary object or None if data fetching fails
+        """
+        city, state, debug = self._get_payload_params(payload)
+        location_data, city_data = await afetch_city_data(
+            city, state, debug, stream=True
+        )
+        return await asyncio.to_thread(
+            self._build_city_summary, payload, location_data, city_data
+        )
+
+    @staticmethod
+    def _get_payload_params(payload: Dict[str, Any]) -> tuple:
         config = payload.get("config", {})
         debug = payload.get("debug", False) or config.get("debug", False)
+        return payload["city"], payload["state"], debug
 
-        # Fetch raw data
-        location_data, city_data = fetch_city_data(city, state, debug)
+    def _build_city_summary(
+        self,
+        payload: Dict[str, Any],
+        location_data: Optional[Dict],
+        city_data: Optional[Dict],
+    ) -> Optional[NeighborhoodSummary]:
+        """Process the raw data fetched for a payload into a summary"""
+        city, state, debug = self._get_payload_params(payload)
+        config = payload.get("config", {})
         if not location_data or not city_data:
             return None
 
-        elements = city_data["elements"]
+        # Streamed responses are classified as they are read
+        elements = (
+            city_data["elements"]
+            if "elements" in city_data
+            else OverpassAPI.iter_elements(city_data["elements_path"])
+        )
 
         # Initialize summary
         summary = NeighborhoodSummary(
@@ -1111,6 +1589,13 @@ class CitySummaryProcessor:
                 config.get("categories", "all")
             )
 
+            # Count all configured categories in one pass over the elements
+            classifier = OSMElementClassifier(
+                category
+                for category, category_config in categories_config.items()
+                if category_config
+            ).update(elements)
+
             # Process each configured category
             for category, category_config in categories_config.items():
                 if debug:
@@ -1123,7 +1608,7 @@ class CitySummaryProcessor:
                 result = self._process_category(
                     category=category,
                     category_config=category_config,
-                    elements=elements,
+                    classifier=classifier,
                     location_data=location_data if category == "area_metrics" else None,
                 )
 
@@ -1131,10 +1616,12 @@ class CitySummaryProcessor:
                     setattr(summary, category, result)
 
             # Update data quality information
-            summary.data_quality.total_elements = len(elements)
-            summary.data_quality.node_count = city_data["node_count"]
-            summary.data_quality.way_count = city_data["way_count"]
-            summary.data_quality.relation_count = city_data["relation_count"]
+            summary.data_quality.total_elements = classifier.total_elements
+            summary.data_quality.node_count = classifier.type_counts.get("node", 0)
+            summary.data_quality.way_count = classifier.type_counts.get("way", 0)
+            summary.data_quality.relation_count = classifier.type_counts.get(
+                "relation", 0
+            )
             summary.data_quality.timestamp = datetime.fromisoformat(
                 city_data["timestamp"]
             )
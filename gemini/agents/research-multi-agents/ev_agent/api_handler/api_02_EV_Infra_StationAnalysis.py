@@ -1,16 +1,23 @@
 # @title Helper Functions
 
+import asyncio
+from dataclasses import dataclass
 from datetime import datetime
 from math import atan2, cos, radians, sin, sqrt
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
+from ev_agent.api_handler.http_client import geocode_city, get_http_client, run_sync
+import numpy as np
 from pydantic import BaseModel
-import requests
 
 # Constants
 DEFAULT_TIMEOUT = 30
+STATIONS_CACHE_TTL = 24 * 3600  # seconds
 DEFAULT_RADIUS = 25.0
 DEFAULT_STATIONS_PER_PAGE = 200
+# Stations fetched when no limit is given, bounds the pages requested for
+# dense areas where the NREL API reports thousands of results
+DEFAULT_MAX_TOTAL_STATIONS = 1000
 EARTH_RADIUS_MILES = 3956
 
 
@@ -102,80 +109,217 @@ class StationAnalysis(BaseModel):
     station_age: StationAge
 
 
-def analyze_facility_types(stations: List[Dict]) -> FacilityTypeCount:
-    """Analyze facility types from station data"""
-    counts = FacilityTypeCount()
+@dataclass
+class Categorical:
+    """Column of repeated values stored as codes into its distinct values"""
 
-    for station in stations:
-        # Handle potential None values properly
-        facility_type = (station.get("facility_type") or "").lower()
+    codes: np.ndarray
+    values: List[Any]
 
-        if "parking" in facility_type or "garage" in facility_type:
-            counts.parking_garage += 1
-        elif "retail" in facility_type or "shopping" in facility_type:
-            counts.retail += 1
-        elif "workplace" in facility_type or "office" in facility_type:
-            counts.workplace += 1
-        else:
-            counts.other += 1
+    @classmethod
+    def from_values(cls, values: List[Any]) -> "Categorical":
+        index = {value: code for code, value in enumerate(dict.fromkeys(values))}
+        codes = np.fromiter(map(index.__getitem__, values), np.int64, len(values))
+        return cls(codes, list(index))
 
-    return counts
+    def take(self, indices: np.ndarray) -> "Categorical":
+        return Categorical(self.codes[indices], self.values)
 
+    def map(self, fn: Callable[[Any], Any], dtype=bool) -> np.ndarray:
+        """Apply fn once per distinct value and broadcast it to every row"""
+        return np.array([fn(value) for value in self.values], dtype=dtype)[self.codes]
 
-def analyze_charging_capabilities(stations: List[Dict]) -> ChargingCapabilities:
-    """Analyze charging capabilities from station data"""
-    speeds = {
-        "dc_fast": ChargingSpeed(),
-        "level2": ChargingSpeed(),
-        "level1": ChargingSpeed(),
-    }
+    def counts(self) -> Dict[Any, int]:
+        """Count rows per value, in order of first appearance"""
+        codes, first_rows, counts = np.unique(
+            self.codes, return_index=True, return_counts=True
+        )
+        return {self.values[codes[i]]: int(counts[i]) for i in np.argsort(first_rows)}
+
+
+@dataclass
+class StationFrame:
+    """
+    Columnar view of NREL station records. Numeric fields are NumPy arrays
+    and string fields are Categorical columns, so the analyses below are
+    array operations, with string checks done once per distinct value.
+    Connector types are flattened, one row per connector of a station.
+    """
+
+    latitude: np.ndarray
+    longitude: np.ndarray
+    dc_ports: np.ndarray
+    l2_ports: np.ndarray
+    l1_ports: np.ndarray
+    dc_power: np.ndarray
+    l2_power: np.ndarray
+    l1_power: np.ndarray
+    facility_type: Categorical
+    access_days_time: Categorical
+    access_code: Categorical
+    network: Categorical
+    pricing: Categorical
+    open_date: Categorical
+    date_last_confirmed: Categorical
+    operational: np.ndarray
+    near_highway: np.ndarray
+    city_center: np.ndarray
+    connector_station: np.ndarray
+    connector_type: Categorical
+
+    @classmethod
+    def from_stations(cls, stations: List[Dict]) -> "StationFrame":
+        def column(key):
+            return [station.get(key) for station in stations]
+
+        def numbers(key, dtype=float):
+            return np.array([value or 0 for value in column(key)], dtype=dtype)
+
+        def categorical(key):
+            return Categorical.from_values(column(key))
+
+        connector_station = []
+        connector_types = []
+        for row, station in enumerate(stations):
+            for connector in station.get("ev_connector_types") or []:
+                if connector:
+                    connector_station.append(row)
+                    connector_types.append(connector)
+
+        return cls(
+            # Missing coordinates are NaN, and never within a radius
+            latitude=np.array([v or np.nan for v in column("latitude")], dtype=float),
+            longitude=np.array([v or np.nan for v in column("longitude")], dtype=float),
+            dc_ports=numbers("ev_dc_fast_num", np.int64),
+            l2_ports=numbers("ev_level2_evse_num", np.int64),
+            l1_ports=numbers("ev_level1_evse_num", np.int64),
+            dc_power=numbers("ev_power_level_dc_max"),
+            l2_power=numbers("ev_power_level_l2_max"),
+            l1_power=numbers("ev_power_level_l1_max"),
+            facility_type=categorical("facility_type"),
+            access_days_time=categorical("access_days_time"),
+            access_code=categorical("access_code"),
+            network=categorical("ev_network"),
+            pricing=categorical("ev_pricing"),
+            open_date=categorical("open_date"),
+            date_last_confirmed=categorical("date_last_confirmed"),
+            operational=np.array([v == "E" for v in column("status_code")], dtype=bool),
+            near_highway=np.array(column("intersection_directions"), dtype=bool),
+            city_center=categorical("city_center").map(
+                lambda v: "downtown" in (v or "").lower()
+            ),
+            connector_station=np.array(connector_station, dtype=np.int64),
+            connector_type=Categorical.from_values(connector_types),
+        )
 
-    connector_types = {}
-    total_ports = 0
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    def take(self, indices: np.ndarray) -> "StationFrame":
+        """Select stations by row, in the given order"""
+        columns = {}
+        for name, value in self.__dict__.items():
+            if name.startswith("connector_"):
+                continue
+            columns[name] = (
+                value.take(indices)
+                if isinstance(value, Categorical)
+                else value[indices]
+            )
 
-    for station in stations:
-        # Count ports and analyze charging speeds
-        dc_ports = int(station.get("ev_dc_fast_num") or 0)
-        l2_ports = int(station.get("ev_level2_evse_num") or 0)
-        l1_ports = int(station.get("ev_level1_evse_num") or 0)
+        # Remap connector rows to the selected stations
+        new_rows = np.full(len(self), -1, dtype=np.int64)
+        new_rows[indices] = np.arange(len(indices))
+        connector_rows = new_rows[self.connector_station]
+        order = np.argsort(connector_rows[connector_rows >= 0], kind="stable")
+        keep = np.flatnonzero(connector_rows >= 0)[order]
+        return StationFrame(
+            **columns,
+            connector_station=connector_rows[keep],
+            connector_type=self.connector_type.take(keep),
+        )
 
-        total_ports += dc_ports + l2_ports + l1_ports
+    def within_radius(
+        self, center_lat: float, center_lon: float, radius_miles: float
+    ) -> np.ndarray:
+        """Mask of stations with coordinates within radius_miles of the center"""
+        has_location = ~np.isnan(self.latitude) & ~np.isnan(self.longitude)
+        distances = haversine_miles(
+            center_lat, center_lon, self.latitude, self.longitude
+        )
+        return has_location & (distances <= radius_miles)
 
-        if dc_ports:
-            speeds["dc_fast"].count += 1
-            speeds["dc_fast"].total_ports += dc_ports
-            speeds["dc_fast"].max_power = max(
-                speeds["dc_fast"].max_power,
-                float(station.get("ev_power_level_dc_max") or 0),
-            )
 
-        if l2_ports:
-            speeds["level2"].count += 1
-            speeds["level2"].total_ports += l2_ports
-            speeds["level2"].max_power = max(
-                speeds["level2"].max_power,
-                float(station.get("ev_power_level_l2_max") or 0),
-            )
+def haversine_miles(
+    lat1: float, lon1: float, lat2: np.ndarray, lon2: np.ndarray
+) -> np.ndarray:
+    """Vectorized calculate_distance from a point to arrays of points"""
+    lat1, lon1 = np.radians(float(lat1)), np.radians(float(lon1))
+    lat2, lon2 = np.radians(lat2), np.radians(lon2)
 
-        if l1_ports:
-            speeds["level1"].count += 1
-            speeds["level1"].total_ports += l1_ports
-            speeds["level1"].max_power = max(
-                speeds["level1"].max_power,
-                float(station.get("ev_power_level_l1_max") or 0),
-            )
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return EARTH_RADIUS_MILES * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
 
-        # Analyze connector types
-        connectors = station.get("ev_connector_types", []) or []
-        for connector in connectors:
-            if connector:
-                connector_types[connector] = connector_types.get(connector, 0) + 1
 
-    # Calculate percentages
-    total_stations = len(stations)
-    for speed in speeds.values():
-        speed.percentage = (
-            round((speed.count / total_stations * 100), 2) if total_stations > 0 else 0
+def _as_frame(stations: Union[List[Dict], StationFrame]) -> StationFrame:
+    if isinstance(stations, StationFrame):
+        return stations
+    return StationFrame.from_stations(stations)
+
+
+def _percentage(count: int, total: int) -> float:
+    return round((count / total * 100), 2) if total > 0 else 0
+
+
+def analyze_facility_types(
+    stations: Union[List[Dict], StationFrame]
+) -> FacilityTypeCount:
+    """Analyze facility types from station data"""
+    frame = _as_frame(stations)
+
+    def facility_class(facility_type: Optional[str]) -> int:
+        # Handle potential None values properly
+        facility_type = (facility_type or "").lower()
+        if "parking" in facility_type or "garage" in facility_type:
+            return 0
+        elif "retail" in facility_type or "shopping" in facility_type:
+            return 1
+        elif "workplace" in facility_type or "office" in facility_type:
+            return 2
+        return 3
+
+    counts = np.bincount(frame.facility_type.map(facility_class, int), minlength=4)
+    return FacilityTypeCount(
+        parking_garage=int(counts[0]),
+        retail=int(counts[1]),
+        workplace=int(counts[2]),
+        other=int(counts[3]),
+    )
+
+
+def analyze_charging_capabilities(
+    stations: Union[List[Dict], StationFrame]
+) -> ChargingCapabilities:
+    """Analyze charging capabilities from station data"""
+    frame = _as_frame(stations)
+    total_stations = len(frame)
+
+    speeds = {}
+    for name, ports, power in [
+        ("dc_fast", frame.dc_ports, frame.dc_power),
+        ("level2", frame.l2_ports, frame.l2_power),
+        ("level1", frame.l1_ports, frame.l1_power),
+    ]:
+        has_ports = ports != 0
+        count = int(has_ports.sum())
+        speeds[name] = ChargingSpeed(
+            count=count,
+            total_ports=int(ports[has_ports].sum()),
+            max_power=max(0.0, float(power[has_ports].max())) if count else 0.0,
+            percentage=_percentage(count, total_stations),
         )
 
     # Create connector distribution list
@@ -183,62 +327,70 @@ def analyze_charging_capabilities(stations: List[Dict]) -> ChargingCapabilities:
         ConnectorDistribution(
             connector_type=c_type,
             count=count,
-            percentage=(
-                round((count / total_stations * 100), 2) if total_stations > 0 else 0
-            ),
+            percentage=_percentage(count, total_stations),
             ports_per_station=(
                 round(count / total_stations, 2) if total_stations > 0 else 0
             ),
         )
-        for c_type, count in connector_types.items()
+        for c_type, count in frame.connector_type.counts().items()
     ]
 
     return ChargingCapabilities(
         by_type=speeds,
         connector_distribution=connector_distribution,
-        total_ports=total_ports,
+        total_ports=int(
+            frame.dc_ports.sum() + frame.l2_ports.sum() + frame.l1_ports.sum()
+        ),
     )
 
 
-def analyze_accessibility(stations: List[Dict]) -> AccessibilityMetrics:
+def analyze_accessibility(
+    stations: Union[List[Dict], StationFrame]
+) -> AccessibilityMetrics:
     """Analyze accessibility metrics from station data"""
+    frame = _as_frame(stations)
     metrics = AccessibilityMetrics()
-    total_stations = len(stations)
-
-    for station in stations:
-        # Access type analysis
-        access_time = (station.get("access_days_time") or "").lower()
-        access_code = (station.get("access_code") or "").lower()
-
-        if "24 hours" in access_time:
-            metrics.access_type["24_7_access"]["count"] += 1
-        if "restricted" in access_time:
-            metrics.access_type["restricted"]["count"] += 1
-        if access_code == "public":
-            metrics.access_type["public"]["count"] += 1
-
-        # print(station)
-
-        # Payment methods analysis based on network and other indicators
-        network = station.get("ev_network", "").lower()
-        # If it's a networked station (not Tesla and not Non-Networked)
-        if network and network not in ["tesla", "non-networked"]:
-            # Most charging networks support multiple payment methods
-            metrics.payment_methods["credit_card"]["count"] += 1
-            metrics.payment_methods["mobile_pay"]["count"] += 1
-            metrics.payment_methods["network_card"]["count"] += 1
-        elif "tesla" in network.lower():
-            # Tesla specific payment methods
-            metrics.payment_methods["mobile_pay"]["count"] += 1
-        elif any(keyword in access_time.lower() for keyword in ["pay", "fee", "paid"]):
-            # For non-networked stations that mention payment
-            metrics.payment_methods["credit_card"]["count"] += 1
-
-        # Operational status
-        if station.get("status_code") == "E":
-            metrics.operational_status["operational"]["count"] += 1
-        else:
-            metrics.operational_status["non_operational"]["count"] += 1
+    total_stations = len(frame)
+
+    # Access type analysis
+    access_time = frame.access_days_time
+    is_24_7 = access_time.map(lambda v: "24 hours" in (v or "").lower())
+    is_restricted = access_time.map(lambda v: "restricted" in (v or "").lower())
+    is_public = frame.access_code.map(lambda v: (v or "").lower() == "public")
+
+    # Payment methods analysis based on network and other indicators
+    network = frame.network.map(lambda v: (v or "").lower(), dtype=object)
+    tesla = network == "tesla"
+    # If it's a networked station (not Tesla and not Non-Networked), most
+    # charging networks support multiple payment methods
+    networked = (network != "") & ~tesla & (network != "non-networked")
+    # For non-networked stations that mention payment
+    mentions_payment = access_time.map(
+        lambda v: any(
+            keyword in (v or "").lower() for keyword in ["pay", "fee", "paid"]
+        )
+    )
+
+    for category, masks in [
+        (
+            metrics.access_type,
+            {"24_7_access": is_24_7, "restricted": is_restricted, "public": is_public},
+        ),
+        (
+            metrics.payment_methods,
+            {
+                "credit_card": networked | (~tesla & mentions_payment),
+                "mobile_pay": networked | tesla,
+                "network_card": networked,
+            },
+        ),
+        (
+            metrics.operational_status,
+            {"operational": frame.operational, "non_operational": ~frame.operational},
+        ),
+    ]:
+        for name, mask in masks.items():
+            category[name]["count"] = int(mask.sum())
 
     # Calculate percentages
     if total_stations > 0:
@@ -255,63 +407,42 @@ def analyze_accessibility(stations: List[Dict]) -> AccessibilityMetrics:
     return metrics
 
 
-def process_station_data(
-    data: Dict, city_area: float, debug: bool = False
-) -> StationAnalysis:
-    """Process station data with enhanced metrics"""
-    try:
-        stations = data["stations"]
-        if not stations:
-            if debug:
-                print("Debug: No stations found in data")
-            return StationAnalysis()
+def _days_since(dates: Categorical, now: datetime, debug: bool) -> np.ndarray:
+    """Days since each date, NaN for dates which cannot be parsed"""
 
-        total_stations = len(stations)
+    def parse(value):
+        try:
+            return (now - datetime.strptime(value, "%Y-%m-%d")).days
+        except (TypeError, ValueError):
+            if debug and value:
+                print(f"Debug: Could not parse date: {value}")
+            return np.nan
 
-        # Geographic Analysis
-        facility_counts = analyze_facility_types(stations)
-        geographic = GeographicAnalysis(
-            total_stations_per_square_mile=(
-                round(total_stations / city_area, 2) if city_area > 0 else 0
-            ),
-            stations_by_facility_type=facility_counts,
-            highway_proximity={
-                "near_highway": sum(
-                    1 for s in stations if s.get("intersection_directions")
-                ),
-                "city_center": sum(
-                    1
-                    for s in stations
-                    if "downtown" in (s.get("city_center", "") or "").lower()
-                ),
-            },
-        )
+    return dates.map(parse, dtype=float)
 
-        # Charging Capabilities
-        charging = analyze_charging_capabilities(stations)
 
-        # Accessibility Metrics
-        accessibility = analyze_accessibility(stations)
+def analyze_network(frame: StationFrame) -> NetworkAnalysis:
+    """Analyze networks and pricing from station data"""
+    total_stations = len(frame)
 
-        # Network Analysis
-        networks = {}
-        pricing_types = {"free": 0, "paid": 0, "variable": 0}
+    networks = {}
+    for name, count in frame.network.counts().items():
+        name = name or "Unknown"
+        networks[name] = networks.get(name, 0) + count
 
-        for station in stations:
-            # Network analysis
-            network = station.get("ev_network") or "Unknown"
-            networks[network] = networks.get(network, 0) + 1
+    def pricing_class(pricing: Optional[str]) -> int:
+        pricing = (pricing or "").lower()
+        if not pricing or pricing in ["free", "no fee", "no charge"]:
+            return 0
+        elif "variable" in pricing:
+            return 2
+        return 1
 
-            # Pricing analysis
-            pricing = station.get("ev_pricing", "") or ""
-            if not pricing or pricing.lower() in ["free", "no fee", "no charge"]:
-                pricing_types["free"] += 1
-            elif "variable" in pricing.lower():
-                pricing_types["variable"] += 1
-            else:
-                pricing_types["paid"] += 1
+    pricing_counts = np.bincount(frame.pricing.map(pricing_class, int), minlength=3)
+    pricing_types = dict(zip(["free", "paid", "variable"], map(int, pricing_counts)))
 
-        network_info = [
+    return NetworkAnalysis(
+        networks=[
             NetworkInfo(
                 name=name,
                 station_count=count,
@@ -320,73 +451,82 @@ def process_station_data(
             for name, count in sorted(
                 networks.items(), key=lambda x: x[1], reverse=True
             )
-        ]
+        ],
+        pricing_types={
+            k: {"count": v, "percentage": round((v / total_stations * 100), 2)}
+            for k, v in pricing_types.items()
+        },
+    )
 
-        network_analysis = NetworkAnalysis(
-            networks=network_info,
-            pricing_types={
-                k: {"count": v, "percentage": round((v / total_stations * 100), 2)}
-                for k, v in pricing_types.items()
-            },
-        )
 
-        now = datetime.now()
+def analyze_station_age(frame: StationFrame, debug: bool = False) -> StationAge:
+    """Analyze station age and verification recency from station data"""
+    total_stations = len(frame)
+    now = datetime.now()
+
+    # Age distribution, stations without an open date are not counted and
+    # unparseable dates count as the oldest
+    has_open_date = frame.open_date.map(bool)
+    age_days = _days_since(frame.open_date, now, debug)
+    with np.errstate(invalid="ignore"):
         age_distribution = {
-            "less_than_1_year": 0,
-            "1_to_3_years": 0,
-            "more_than_3_years": 0,
+            "less_than_1_year": has_open_date & (age_days <= 365),
+            "1_to_3_years": has_open_date & (age_days > 365) & (age_days <= 1095),
+            "more_than_3_years": has_open_date & ~(age_days <= 1095),
         }
-        last_verified = {"last_30_days": 0, "last_90_days": 0, "older": 0}
-
-        for station in stations:
-            # Age distribution
-            open_date = station.get("open_date")
-            if open_date:
-                try:
-                    date_opened = datetime.strptime(open_date, "%Y-%m-%d")
-                    age_days = (now - date_opened).days
-                    if age_days <= 365:
-                        age_distribution["less_than_1_year"] += 1
-                    elif age_days <= 1095:
-                        age_distribution["1_to_3_years"] += 1
-                    else:
-                        age_distribution["more_than_3_years"] += 1
-                except:
-                    if debug:
-                        print(f"Debug: Could not parse open date: {open_date}")
-                    age_distribution["more_than_3_years"] += 1
-
-            # Last verified - Fixed to handle date_last_confirmed field
-            date_last_verified = station.get(
-                "date_last_confirmed"
-            )  # Changed from date_last_verified
-            if date_last_verified:
-                try:
-                    verified_date = datetime.strptime(date_last_verified, "%Y-%m-%d")
-                    days_since_verified = (now - verified_date).days
-                    if days_since_verified <= 30:
-                        last_verified["last_30_days"] += 1
-                    elif days_since_verified <= 90:
-                        last_verified["last_90_days"] += 1
-                    else:
-                        last_verified["older"] += 1
-                except:
-                    if debug:
-                        print(
-                            f"Debug: Could not parse verification date: {date_last_verified}"
-                        )
-                    last_verified["older"] += 1
-            else:
-                last_verified["older"] += 1
-
-        station_age = StationAge(
-            age_distribution={
-                k: {"count": v, "percentage": round((v / total_stations * 100), 2)}
-                for k, v in age_distribution.items()
-            },
-            last_verified={
-                k: {"count": v, "percentage": round((v / total_stations * 100), 2)}
-                for k, v in last_verified.items()
+
+        # Last verified, from the date_last_confirmed field
+        verified_days = _days_since(frame.date_last_confirmed, now, debug)
+        last_verified = {
+            "last_30_days": verified_days <= 30,
+            "last_90_days": (verified_days > 30) & (verified_days <= 90),
+            "older": ~(verified_days <= 90),
+        }
+
+    return StationAge(
+        age_distribution={
+            k: {
+                "count": int(mask.sum()),
+                "percentage": round((int(mask.sum()) / total_stations * 100), 2),
+            }
+            for k, mask in age_distribution.items()
+        },
+        last_verified={
+            k: {
+                "count": int(mask.sum()),
+                "percentage": round((int(mask.sum()) / total_stations * 100), 2),
+            }
+            for k, mask in last_verified.items()
+        },
+    )
+
+
+def process_station_data(
+    data: Dict, city_area: float, debug: bool = False
+) -> StationAnalysis:
+    """Process station data with enhanced metrics"""
+    try:
+        stations = data["stations"]
+        if not stations:
+            if debug:
+                print("Debug: No stations found in data")
+            return StationAnalysis()
+
+        # Frame built by get_station_data_filtered, or from the records
+        frame = data.get("frame")
+        if frame is None:
+            frame = StationFrame.from_stations(stations)
+        total_stations = len(frame)
+
+        # Geographic Analysis
+        geographic = GeographicAnalysis(
+            total_stations_per_square_mile=(
+                round(total_stations / city_area, 2) if city_area > 0 else 0
+            ),
+            stations_by_facility_type=analyze_facility_types(frame),
+            highway_proximity={
+                "near_highway": int(frame.near_highway.sum()),
+                "city_center": int(frame.city_center.sum()),
             },
         )
 
@@ -397,10 +537,10 @@ def process_station_data(
                 "analysis_timestamp": datetime.now().isoformat(),
             },
             geographic_analysis=geographic,
-            charging_capabilities=charging,
-            accessibility=accessibility,
-            network_analysis=network_analysis,
-            station_age=station_age,
+            charging_capabilities=analyze_charging_capabilities(frame),
+            accessibility=analyze_accessibility(frame),
+            network_analysis=analyze_network(frame),
+            station_age=analyze_station_age(frame, debug),
         )
 
     except Exception as e:
@@ -409,34 +549,18 @@ def process_station_data(
         raise
 
 
-def get_city_coordinates(
+async def aget_city_coordinates(
     city: str, state: str, debug: bool = False
 ) -> Dict[str, float]:
     """Get city coordinates and metadata"""
     try:
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            "city": city,
-            "state": state,
-            "country": "USA",
-            "format": "json",
-            "limit": 1,
-        }
-        headers = {"User-Agent": "EVChargingStationFinder/1.0"}
-
         if debug:
             print(f"\nDebug: Getting coordinates for {city}, {state}")
 
-        response = requests.get(
-            url, params=params, headers=headers, timeout=DEFAULT_TIMEOUT
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        if not data:
+        location = await geocode_city(city, state, debug)
+        if not location:
             raise LocationError(f"Location not found: {city}, {state}")
 
-        location = data[0]
         if debug:
             print(f"Debug: Found location data: {location}")
 
@@ -461,7 +585,14 @@ def get_city_coordinates(
         raise
 
 
-def get_station_data_filtered(
+def get_city_coordinates(
+    city: str, state: str, debug: bool = False
+) -> Dict[str, float]:
+    """Get city coordinates and metadata"""
+    return run_sync(aget_city_coordinates(city, state, debug))
+
+
+async def aget_station_data_filtered(
     lat: float,
     lon: float,
     radius: float,
@@ -471,7 +602,15 @@ def get_station_data_filtered(
     stations_per_page: int = DEFAULT_STATIONS_PER_PAGE,
     debug: bool = False,
 ) -> Dict:
-    """Get charging station data with proper location filtering"""
+    """
+    Get charging station data with proper location filtering.
+
+    At most max_stations stations are fetched, DEFAULT_MAX_TOTAL_STATIONS
+    if None and every page if 0.
+    """
+    if max_stations is None:
+        max_stations = DEFAULT_MAX_TOTAL_STATIONS
+
     url = "https://developer.nrel.gov/api/alt-fuel-stations/v1.json"
 
     base_params = {
@@ -487,36 +626,59 @@ def get_station_data_filtered(
         "limit": stations_per_page,
     }
 
+    async def fetch_page(offset: int) -> Dict:
+        return await get_http_client().get_json(
+            url,
+            params={**base_params, "offset": offset},
+            timeout=DEFAULT_TIMEOUT,
+            cache_ttl=STATIONS_CACHE_TTL,
+            debug=debug,
+        )
+
     try:
-        response = requests.get(url, params=base_params, timeout=DEFAULT_TIMEOUT)
-        response.raise_for_status()
-        data = response.json()
+        data = await fetch_page(0)
 
         total_available = data.get("total_results", 0)
         if debug:
             print(f"Debug: Found {total_available} stations in {state}")
 
-        # Validate and collect stations
-        stations = []
-        for station in data.get("fuel_stations", []):
-            if validate_station_location(station, lat, lon, radius):
-                stations.append(station)
+        # Fetch the remaining pages concurrently, the client's host limit
+        # bounds the requests in flight to the NREL API
+        num_results = (
+            min(total_available, max_stations) if max_stations else total_available
+        )
+        pages = [data] + await asyncio.gather(
+            *[
+                fetch_page(offset)
+                for offset in range(stations_per_page, num_results, stations_per_page)
+            ]
+        )
+        fuel_stations = [
+            station for page in pages for station in page.get("fuel_stations", [])
+        ]
+        if debug:
+            print(f"Debug: Fetched {len(fuel_stations)} stations in {len(pages)} pages")
+
+        # Validate station locations on the columnar frame
+        frame = await asyncio.to_thread(StationFrame.from_stations, fuel_stations)
+        selected = np.flatnonzero(frame.within_radius(lat, lon, radius))
 
         if debug:
-            print(f"Debug: Validated {len(stations)} stations within {radius} miles")
+            print(f"Debug: Validated {len(selected)} stations within {radius} miles")
 
         # Limit stations if max_stations is specified
         if max_stations:
-            stations = stations[:max_stations]
+            selected = selected[:max_stations]
             if debug:
                 print(
-                    f"Debug: Limited to {len(stations)} stations due to max_stations setting"
+                    f"Debug: Limited to {len(selected)} stations due to max_stations setting"
                 )
 
         return {
-            "stations": stations,
-            "total_available": len(stations),
-            "stations_processed": len(stations),
+            "stations": [fuel_stations[i] for i in selected],
+            "frame": frame.take(selected),
+            "total_available": len(selected),
+            "stations_processed": len(selected),
         }
 
     except Exception as e:
@@ -525,6 +687,24 @@ def get_station_data_filtered(
         raise
 
 
+def get_station_data_filtered(
+    lat: float,
+    lon: float,
+    radius: float,
+    state: str,
+    api_key: str,
+    max_stations: Optional[int] = None,
+    stations_per_page: int = DEFAULT_STATIONS_PER_PAGE,
+    debug: bool = False,
+) -> Dict:
+    """Get charging station data with proper location filtering"""
+    return run_sync(
+        aget_station_data_filtered(
+            lat, lon, radius, state, api_key, max_stations, stations_per_page, debug
+        )
+    )
+
+
 def validate_station_location(
     station: Dict, center_lat: float, center_lon: float, radius_miles: float
 ) -> bool:
@@ -553,7 +733,7 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return EARTH_RADIUS_MILES * c
 
 
-def get_charging_stations(config: Dict) -> Dict:
+async def aget_charging_stations(config: Dict) -> Dict:
     """Main function to get and analyze charging station data"""
     debug = config.get("debug", False)
     radius_miles = config.get("radius_miles", DEFAULT_RADIUS)
@@ -569,22 +749,24 @@ def get_charging_stations(config: Dict) -> Dict:
             raise ValueError("City and state are required")
 
         # Get coordinates
-        coords = get_city_coordinates(config["city"], config["state"], debug)
+        coords = await aget_city_coordinates(config["city"], config["state"], debug)
 
         # Get station data
-        station_data = get_station_data_filtered(
+        station_data = await aget_station_data_filtered(
             coords["lat"],
             coords["lon"],
             radius_miles,
             config["state"],
             api_key,
-            config.get("max_total_stations"),
+            config.get("max_total_stations", DEFAULT_MAX_TOTAL_STATIONS),
             config.get("stations_per_page", DEFAULT_STATIONS_PER_PAGE),
             debug,
         )
 
-        # Process and analyze the data
-        result = process_station_data(station_data, coords["city_area"], debug)
+        # Process and analyze the data off the event loop
+        result = await asyncio.to_thread(
+            process_station_data, station_data, coords["city_area"], debug
+        )
 
         # Add location metadata
         result.metadata.update(
@@ -605,6 +787,11 @@ def get_charging_stations(config: Dict) -> Dict:
         raise
 
 
+def get_charging_stations(config: Dict) -> Dict:
+    """Main function to get and analyze charging station data"""
+    return run_sync(aget_charging_stations(config))
+
+
 class LocationError(Exception):
     """Custom exception for location-related errors"""
 
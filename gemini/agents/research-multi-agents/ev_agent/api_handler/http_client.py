@@ -0,0 +1,454 @@
+# @title Helper Functions
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional
+from urllib.parse import urlparse
+import weakref
+
+import httpx
+
+
+@dataclass
+class HostLimit:
+    """Rate limit of a single API host"""
+
+    min_interval: float  # seconds between request starts
+    max_concurrency: int
+
+
+class HttpConfig:
+    """Shared HTTP client configuration and constants"""
+
+    USER_AGENT = "EV-Planning-Tool/1.0"
+    MAX_RETRIES = 4
+    BACKOFF_BASE = 1.0  # seconds
+    BACKOFF_MAX = 30.0  # seconds
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    MAX_CONNECTIONS = 20
+    MAX_KEEPALIVE_CONNECTIONS = 10
+    KEEPALIVE_EXPIRY = 60  # seconds
+    DEFAULT_TIMEOUT = 30  # seconds
+
+    # Nominatim allows one request per second, Overpass a couple of slots
+    # per client, NREL 1,000 requests per hour per API key
+    HOST_LIMITS = {
+        "nominatim.openstreetmap.org": HostLimit(min_interval=1.0, max_concurrency=1),
+        "overpass-api.de": HostLimit(min_interval=1.0, max_concurrency=2),
+        "developer.nrel.gov": HostLimit(min_interval=0.1, max_concurrency=4),
+    }
+    DEFAULT_HOST_LIMIT = HostLimit(min_interval=0.0, max_concurrency=8)
+
+    CACHE_DIR = os.environ.get(
+        "EV_AGENT_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "ev_agent"),
+    )
+    # Query parameters which do not change the response, left out of cache keys
+    CACHE_IGNORED_PARAMS = {"api_key"}
+
+    NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+    GEOCODE_CACHE_TTL = 30 * 24 * 3600  # seconds
+
+
+class ResponseCache:
+    """
+    On-disk cache of decoded JSON responses with a TTL per entry.
+
+    Every entry is a JSON file named after the hash of the request, written
+    atomically so concurrent agents and interrupted runs never read a
+    partial entry. Expired entries are ignored and overwritten on refresh.
+    Raw response bodies too large to decode in memory are kept next to the
+    entries and expire by their modification time.
+    """
+
+    def __init__(self, cache_dir: str = HttpConfig.CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value of key, or None if missing or expired"""
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry["expires_at"] < time.time():
+            return None
+        return entry["value"]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"expires_at": time.time() + ttl, "value": value}, f)
+        os.replace(tmp_path, path)
+
+    def body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.body")
+
+    def get_body(self, key: str, ttl: float) -> Optional[str]:
+        """Return the path of the raw body of key, or None if missing or expired"""
+        path = self.body_path(key)
+        try:
+            if os.path.getmtime(path) + ttl < time.time():
+                return None
+        except OSError:
+            return None
+        return path
+
+
+def normalize_query(values: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Normalize request parameters so equivalent requests share a cache key"""
+    return {
+        key: " ".join(value.split()) if isinstance(value, str) else value
+        for key, value in sorted((values or {}).items())
+        if key not in HttpConfig.CACHE_IGNORED_PARAMS
+    }
+
+
+def make_cache_key(
+    method: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    data: Optional[Dict[str, Any]] = None,
+) -> str:
+    request = {
+        "method": method.upper(),
+        "url": url,
+        "params": normalize_query(params),
+        "data": normalize_query(data),
+    }
+    return hashlib.sha256(
+        json.dumps(request, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class HostRateLimiter:
+    """Spaces request starts to a host and caps its concurrent requests"""
+
+    def __init__(self, limit: HostLimit):
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit.max_concurrency)
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._semaphore:
+            async with self._lock:
+                now = time.monotonic()
+                wait = self._next_start - now
+                self._next_start = max(now, self._next_start) + self.limit.min_interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield
+
+
+class AsyncHttpClient:
+    """
+    Async JSON client shared by all agents running on an event loop.
+
+    Requests go through a keep-alive connection pool, are rate limited per
+    host, and are retried on timeouts, connection errors, 429 and 5xx
+    responses with jittered exponential backoff. Identical requests in
+    flight at the same time share a single round trip, and responses
+    requested with a TTL are kept in an on-disk ResponseCache shared
+    across agents and runs.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None):
+        self.cache = cache or ResponseCache()
+        self._client = httpx.AsyncClient(
+            headers={"User-Agent": HttpConfig.USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=HttpConfig.MAX_CONNECTIONS,
+                max_keepalive_connections=HttpConfig.MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HttpConfig.KEEPALIVE_EXPIRY,
+            ),
+            follow_redirects=True,
+        )
+        self._limiters: Dict[str, HostRateLimiter] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def _get_limiter(self, url: str) -> HostRateLimiter:
+        host = urlparse(url).hostname or ""
+        if host not in self._limiters:
+            self._limiters[host] = HostRateLimiter(
+                HttpConfig.HOST_LIMITS.get(host, HttpConfig.DEFAULT_HOST_LIMIT)
+            )
+        return self._limiters[host]
+
+    @staticmethod
+    def _backoff_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+        """Full jitter backoff, never shorter than a Retry-After header"""
+        delay = random.uniform(
+            0, min(HttpConfig.BACKOFF_MAX, HttpConfig.BACKOFF_BASE * 2**attempt)
+        )
+        retry_after = response.headers.get("Retry-After") if response else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return delay
+
+    async def request_json(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = HttpConfig.DEFAULT_TIMEOUT,
+        cache_ttl: Optional[float] = None,
+        cache_if: Optional[Callable[[Any], bool]] = None,
+        debug: bool = False,
+    ) -> Any:
+        """
+        Send a request and return its decoded JSON body.
+
+        Args:
+            cache_ttl: Seconds to keep the response in the disk cache,
+                responses are not cached if None
+            cache_if: Only cache responses for which this returns True
+
+        Raises:
+            httpx.HTTPStatusError: The final attempt returned an error status
+            httpx.TransportError: The final attempt timed out or failed to connect
+        """
+        key = make_cache_key(method, url, params, data)
+        if cache_ttl is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                if debug:
+                    print(f"Debug: Cache hit for {method} {url}")
+                return cached
+
+        async def read_json(response: httpx.Response) -> Any:
+            # Large bodies are decoded off the loop
+            return await asyncio.to_thread(json.loads, await response.aread())
+
+        async def fetch() -> Any:
+            value = await self._send(
+                method, url, params, data, headers, timeout, read_json, debug
+            )
+            if cache_ttl is not None and (cache_if is None or cache_if(value)):
+                await asyncio.to_thread(self.cache.set, key, value, cache_ttl)
+            return value
+
+        return await self._coalesce(key, fetch)
+
+    async def download(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = HttpConfig.DEFAULT_TIMEOUT,
+        cache_ttl: Optional[float] = None,
+        validate: Optional[Callable[[str], None]] = None,
+        debug: bool = False,
+    ) -> str:
+        """
+        Stream the response body of a request to a file in the cache and
+        return its path, the body is never held in memory.
+
+        Args:
+            cache_ttl: Seconds to reuse a downloaded body for, the request is
+                always sent if None
+            validate: Called with the path of a body before it is saved or
+                reused, raises if the body must not be used
+
+        Raises:
+            httpx.HTTPStatusError: The final attempt returned an error status
+            httpx.TransportError: The final attempt timed out or failed to connect
+            Exception: Raised by validate, the body is not saved
+        """
+        key = make_cache_key(method, url, params, data)
+        if cache_ttl is not None:
+            cached_path = self.cache.get_body(key, cache_ttl)
+            if cached_path is not None:
+                try:
+                    if validate is not None:
+                        await asyncio.to_thread(validate, cached_path)
+                    if debug:
+                        print(f"Debug: Cache hit for {method} {url}")
+                    return cached_path
+                except Exception as e:
+                    # e.g. saved before the body was validated
+                    if debug:
+                        print(f"Debug: Discarding cached body of {url}: {e}")
+                    os.remove(cached_path)
+
+        path = self.cache.body_path(key)
+
+        async def write_body(response: httpx.Response) -> str:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    async for chunk in response.aiter_bytes():
+                        f.write(chunk)
+                if validate is not None:
+                    await asyncio.to_thread(validate, tmp_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            os.replace(tmp_path, path)
+            return path
+
+        return await self._coalesce(
+            key,
+            lambda: self._send(
+                method, url, params, data, headers, timeout, write_body, debug
+            ),
+        )
+
+    async def _coalesce(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        # Identical concurrent requests, e.g. two agents geocoding the
+        # same city, wait for the first one
+        if key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await fetch()
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Only raised to waiters, if there are any
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        data: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeout: float,
+        read: Callable[[httpx.Response], Awaitable[Any]],
+        debug: bool,
+    ) -> Any:
+        limiter = self._get_limiter(url)
+        for attempt in range(HttpConfig.MAX_RETRIES):
+            last_attempt = attempt == HttpConfig.MAX_RETRIES - 1
+            response = None
+            try:
+                async with limiter.slot(), self._client.stream(
+                    method,
+                    url,
+                    params=params,
+                    data=data,
+                    headers=headers,
+                    timeout=timeout,
+                ) as response:
+                    if debug:
+                        print(
+                            f"Debug: {method} {url} attempt {attempt + 1} - "
+                            f"Status: {response.status_code}"
+                        )
+                    if (
+                        response.status_code not in HttpConfig.RETRY_STATUS_CODES
+                        or last_attempt
+                    ):
+                        response.raise_for_status()
+                        return await read(response)
+            except httpx.TransportError as e:
+                if debug:
+                    print(f"Debug: {type(e).__name__} on attempt {attempt + 1}")
+                if last_attempt:
+                    raise
+
+            delay = self._backoff_delay(attempt, response)
+            if debug:
+                print(f"Debug: Retrying {url} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def get_json(self, url: str, **kwargs) -> Any:
+        return await self.request_json("GET", url, **kwargs)
+
+    async def post_json(self, url: str, **kwargs) -> Any:
+        return await self.request_json("POST", url, **kwargs)
+
+
+# One client per event loop, connection pools and asyncio primitives
+# cannot be shared across loops
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncHttpClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_http_client() -> AsyncHttpClient:
+    """Return the shared client of the running event loop"""
+    loop = asyncio.get_running_loop()
+    if loop not in _clients:
+        _clients[loop] = AsyncHttpClient()
+    return _clients[loop]
+
+
+def run_sync(coro: Coroutine) -> Any:
+    """
+    Run a coroutine from synchronous code. A client created for the call
+    is closed afterwards, a client already shared on the loop is kept.
+    """
+
+    async def main():
+        had_client = asyncio.get_running_loop() in _clients
+        try:
+            return await coro
+        finally:
+            loop = asyncio.get_running_loop()
+            if not had_client and loop in _clients:
+                await _clients.pop(loop).aclose()
+
+    return asyncio.run(main())
+
+
+async def geocode_city(
+    city: str, state: str, debug: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Return the Nominatim search result of a US city, or None if not found.
+    Shared by the neighborhood and the EV station analyses so a city is
+    geocoded once.
+    """
+    # Nominatim is case insensitive, lowercase names share cache entries
+    params = {
+        "city": city.strip().lower(),
+        "state": state.strip().lower(),
+        "country": "USA",
+        "format": "json",
+        "limit": 1,
+    }
+    if debug:
+        print(f"\nDebug: Querying Nominatim API for {city}, {state}")
+        print(f"Debug: Parameters: {params}")
+
+    data = await get_http_client().get_json(
+        HttpConfig.NOMINATIM_URL,
+        params=params,
+        cache_ttl=HttpConfig.GEOCODE_CACHE_TTL,
+        # Misses may be transient, they are not cached
+        cache_if=bool,
+        debug=debug,
+    )
+    return data[0] if data else None
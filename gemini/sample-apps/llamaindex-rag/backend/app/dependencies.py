@@ -1,7 +1,7 @@
 import logging
 
-from backend.app.shared_state import index_manager, prompts
-from shared_state import IndexManager, Prompts
+from backend.app.shared_state import index_manager, prompts, response_cache
+from shared_state import IndexManager, Prompts, SemanticResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -15,3 +15,7 @@ def get_index_manager() -> IndexManager:
 
 def get_prompts() -> Prompts:
     return prompts
+
+
+def get_response_cache() -> SemanticResponseCache:
+    return response_cache
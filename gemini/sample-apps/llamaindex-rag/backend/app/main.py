@@ -1,5 +1,7 @@
+from contextlib import asynccontextmanager
 import logging
 
+from backend.app.dependencies import get_response_cache
 from backend.app.routers import evaluation, indexes, prompts, rag
 from fastapi import FastAPI
 import uvicorn
@@ -8,7 +10,15 @@ import uvicorn
 logging.basicConfig(filename="eval.log", encoding="utf-8", level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Keep cached responses across restarts if response_cache_dir is set
+    get_response_cache().persist()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Include routers
 app.include_router(prompts.router, tags=["prompts"])
@@ -41,3 +41,6 @@ class EvalRequest(RAGConfig):
     input_eval_dataset_bucket_uri: str = "test_rag_questions/test_ground_truth.csv"
     bq_eval_results_table_id: str = "eval_results.eval_results_table"
     ragas_metrics: list[str] = ["faithfulness", "answer_relevancy"]
+    max_concurrency: int = 8
+    requests_per_minute: float | None = None
+    max_retries: int = 3
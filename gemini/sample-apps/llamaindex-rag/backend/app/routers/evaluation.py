@@ -1,13 +1,19 @@
+import asyncio
 from datetime import datetime
+import hashlib
+import json
 import logging
+import os
+import threading
+import time
 import uuid
 
 from backend.app.dependencies import get_index_manager, get_prompts
 from backend.app.models import EvalRequest
 from backend.rag.evaluate import LLMEvaluator
-from common.utils import download_blob
+from common.utils import download_blob, load_config
 from datasets import Dataset
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from langchain_google_vertexai import ChatVertexAI, VertexAIEmbeddings
 import pandas as pd
 from ragas import evaluate
@@ -24,6 +30,16 @@ from ragas.metrics import (
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+config = load_config()
+EVAL_CHECKPOINT_DIR = config.get("eval_checkpoint_dir", "/tmp/eval_checkpoints")
+EVAL_JOB_TTL_SEC = config.get("eval_job_ttl_sec", 3600)
+MAX_EVAL_JOBS = config.get("max_eval_jobs", 100)
+
+# eval_uuid -> status of batch evaluations started by this worker process,
+# finished jobs are evicted after EVAL_JOB_TTL_SEC or beyond MAX_EVAL_JOBS
+eval_jobs: dict[str, dict] = {}
+eval_jobs_lock = threading.Lock()
+
 ragas_metrics_dict = {
     "context_precision": context_precision,
     "answer_relevancy": answer_relevancy,
@@ -35,52 +51,168 @@ ragas_metrics_dict = {
 }
 
 
+def get_checkpoint_path(eval_batch_request, index_manager, prompts) -> str:
+    """Runs of the same request against the same indexes and prompts
+    share a checkpoint, so resubmitting an interrupted run resumes it"""
+    run_config = json.dumps(
+        {
+            "request": eval_batch_request.model_dump(
+                exclude={"max_concurrency", "requests_per_minute", "max_retries"}
+            ),
+            "indexes": index_manager.get_current_index_info(),
+            "prompts": prompts.digest(),
+        },
+        sort_keys=True,
+    )
+    run_hash = hashlib.sha256(run_config.encode()).hexdigest()[:16]
+    return os.path.join(EVAL_CHECKPOINT_DIR, f"{run_hash}.parquet")
+
+
+def evict_eval_jobs() -> None:
+    """Drop finished jobs older than EVAL_JOB_TTL_SEC, then the oldest
+    finished jobs beyond MAX_EVAL_JOBS. Running jobs are kept."""
+    now = time.time()
+    with eval_jobs_lock:
+        finished = sorted(
+            (job["finished_at"], eval_uuid)
+            for eval_uuid, job in eval_jobs.items()
+            if job["finished_at"] is not None
+        )
+        num_over = max(len(eval_jobs) - MAX_EVAL_JOBS, 0)
+        for i, (finished_at, eval_uuid) in enumerate(finished):
+            if i < num_over or now - finished_at > EVAL_JOB_TTL_SEC:
+                del eval_jobs[eval_uuid]
+
+
 @router.post("/eval_batch")
 def eval_batch(
     eval_batch_request: EvalRequest,
+    background_tasks: BackgroundTasks,
     index_manager=Depends(get_index_manager),
     prompts=Depends(get_prompts),
 ) -> dict:
-    query_engine = index_manager.get_query_engine(
-        prompts=prompts,
-        llm_name=eval_batch_request.llm_name,
-        temperature=eval_batch_request.temperature,
-        similarity_top_k=eval_batch_request.similarity_top_k,
-        retrieval_strategy=eval_batch_request.retrieval_strategy,
-        use_hyde=eval_batch_request.use_hyde,
-        use_refine=eval_batch_request.use_refine,
-        use_node_rerank=eval_batch_request.use_node_rerank,
-        qa_followup=eval_batch_request.qa_followup,
-        hybrid_retrieval=eval_batch_request.hybrid_retrieval,
+    """Starts a batch evaluation in the background,
+    poll /eval_batch/{eval_uuid} for its status and results"""
+    evict_eval_jobs()
+    eval_uuid = str(uuid.uuid4())
+    with eval_jobs_lock:
+        eval_jobs[eval_uuid] = {
+            "eval_uuid": eval_uuid,
+            "status": "running",
+            "completed_rows": 0,
+            "total_rows": None,
+            "result": None,
+            "error": None,
+            "finished_at": None,
+        }
+    background_tasks.add_task(
+        run_eval_batch, eval_uuid, eval_batch_request, index_manager, prompts
     )
+    return eval_jobs[eval_uuid]
+
+
+@router.get("/eval_batch/{eval_uuid}")
+def get_eval_batch_status(eval_uuid: str) -> dict:
+    evict_eval_jobs()
+    job = eval_jobs.get(eval_uuid)
+    if job is None:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown or expired eval job {eval_uuid}"
+        )
+    return job
+
+
+def run_eval_batch(
+    eval_uuid: str, eval_batch_request: EvalRequest, index_manager, prompts
+) -> None:
+    job = eval_jobs[eval_uuid]
+    try:
+        job["result"] = evaluate_batch(
+            eval_uuid, eval_batch_request, index_manager, prompts
+        )
+        job["status"] = "completed"
+    except Exception as e:
+        logger.exception(f"Eval job {eval_uuid} failed")
+        job["error"] = str(e)
+        job["status"] = "failed"
+    finally:
+        job["finished_at"] = time.time()
+
+
+def evaluate_batch(
+    eval_uuid: str, eval_batch_request: EvalRequest, index_manager, prompts
+) -> dict:
+    job = eval_jobs[eval_uuid]
     bucket_name = eval_batch_request.input_eval_dataset_bucket_uri.split("/")[0]
     file_name = "/".join(
         eval_batch_request.input_eval_dataset_bucket_uri.split("/")[1:]
     )
     logger.info(bucket_name)
     logger.info(file_name)
-    download_blob(bucket_name, file_name, "ground_truth.csv")
-    eval_df = pd.read_csv("./ground_truth.csv")
+    local_file_name = f"ground_truth_{eval_uuid}.csv"
+    download_blob(bucket_name, file_name, local_file_name)
+    eval_df = pd.read_csv(local_file_name)
+    os.remove(local_file_name)
     eval_df = eval_df[["question", "ground_truth"]]
     eval_df = eval_df.astype({"question": str, "ground_truth": str})
     logging.info(eval_df.dtypes)
+    job["total_rows"] = len(eval_df)
 
+    checkpoint_path = get_checkpoint_path(eval_batch_request, index_manager, prompts)
     llm_evaluator = LLMEvaluator(
         system_prompt=prompts.eval_prompt_wcontext_system,
         user_prompt=prompts.eval_prompt_wcontext_user,
         eval_model_name=eval_batch_request.eval_model_name,
         temperature=eval_batch_request.temperature,
+        max_concurrency=eval_batch_request.max_concurrency,
+        requests_per_minute=eval_batch_request.requests_per_minute,
+        max_retries=eval_batch_request.max_retries,
+        checkpoint_path=checkpoint_path,
     )
 
-    if eval_batch_request.use_react:
-        react_agent = index_manager.get_react_agent(
+    def update_progress(completed_rows: int, total_rows: int) -> None:
+        job["completed_rows"] = completed_rows
+
+    async def aevaluate(eval_df: pd.DataFrame) -> pd.DataFrame:
+        # Engines hold async clients bound to the event loop they are used
+        # on, build them on this job's loop instead of sharing the app's
+        query_engine = index_manager.get_query_engine(
             prompts=prompts,
             llm_name=eval_batch_request.llm_name,
             temperature=eval_batch_request.temperature,
+            similarity_top_k=eval_batch_request.similarity_top_k,
+            retrieval_strategy=eval_batch_request.retrieval_strategy,
+            use_hyde=eval_batch_request.use_hyde,
+            use_refine=eval_batch_request.use_refine,
+            use_node_rerank=eval_batch_request.use_node_rerank,
+            qa_followup=eval_batch_request.qa_followup,
+            hybrid_retrieval=eval_batch_request.hybrid_retrieval,
+        )
+        if eval_batch_request.use_react:
+            react_agent = index_manager.get_react_agent(
+                query_engine=query_engine,
+                prompts=prompts,
+                llm_name=eval_batch_request.llm_name,
+                temperature=eval_batch_request.temperature,
+            )
+            retrieval_qa_func = react_agent.achat
+        else:
+            retrieval_qa_func = query_engine.aquery
+        return await llm_evaluator.async_eval_retrieval(
+            retrieval_qa_func, eval_df, update_progress
+        )
+
+    eval_df = asyncio.run(aevaluate(eval_df))
+
+    failed_rows = eval_df["error"].notna()
+    if failed_rows.any():
+        # The checkpoint is kept, resubmitting the request retries these rows
+        logger.warning(
+            f"{failed_rows.sum()} of {len(eval_df)} questions failed, "
+            "excluding them from the ragas evaluation"
         )
-        eval_df = llm_evaluator.evaluate(react_agent.achat, eval_df)
-    else:
-        eval_df = llm_evaluator.evaluate(query_engine.aquery, eval_df)
+        eval_df = eval_df[~failed_rows].reset_index(drop=True)
+    eval_df = eval_df.drop(columns=["error"])
 
     vertexai_llm = ChatVertexAI(model_name=eval_batch_request.eval_model_name)
     vertexai_embeddings = VertexAIEmbeddings(
@@ -96,7 +228,6 @@ def eval_batch(
     )
     ragas_results_df = result.to_pandas()[eval_batch_request.ragas_metrics].fillna(0)
 
-    eval_uuid = str(uuid.uuid4())
     eval_df["date_time"] = datetime.now()
     eval_df["eval_uuid"] = eval_uuid
     eval_df["retrieval_strategy"] = eval_batch_request.retrieval_strategy
@@ -111,4 +242,6 @@ def eval_batch(
     # Uncomment the following line if you want to write results to BigQuery
     # write_results_to_bq(eval_df, table_id=eval_batch_request.bq_eval_results_table_id)
     logging.info(f"EVAL ID: {eval_uuid}")
+    if not failed_rows.any() and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
     return eval_df.to_dict(orient="list")
@@ -115,6 +115,20 @@ async def get_current_index_info(index_manager=Depends(get_index_manager)) -> di
     return index_manager.get_current_index_info()
 
 
+@router.get("/get_query_engine_cache_info")
+async def get_query_engine_cache_info(
+    index_manager=Depends(get_index_manager),
+) -> dict:
+    return index_manager.get_query_engine_cache_info()
+
+
+@router.get("/get_embedding_cache_info")
+async def get_embedding_cache_info(
+    index_manager=Depends(get_index_manager),
+) -> dict:
+    return index_manager.get_embedding_cache_info()
+
+
 @router.post("/update_index")
 async def update_index(
     index_update: IndexUpdate, index_manager=Depends(get_index_manager)
@@ -1,10 +1,15 @@
+import asyncio
+import json
 import logging
 
-from backend.app.dependencies import get_index_manager, get_prompts
-from backend.app.models import RAGRequest
+from backend.app.dependencies import get_index_manager, get_prompts, get_response_cache
+from backend.app.models import RAGConfig, RAGRequest
 from datasets import Dataset
 from fastapi import APIRouter, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from langchain_google_vertexai import ChatVertexAI, VertexAIEmbeddings
+from llama_index.core.base.response.schema import AsyncStreamingResponse, Response
 import pandas as pd
 from ragas import evaluate
 from ragas.metrics import answer_relevancy, context_relevancy, faithfulness
@@ -13,13 +18,26 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-@router.post("/query_rag")
-async def query_rag(
-    rag_request: RAGRequest,
-    index_manager=Depends(get_index_manager),
-    prompts=Depends(get_prompts),
-) -> dict:
-    query_engine = index_manager.get_query_engine(
+def get_response_cache_namespace(rag_request, index_manager, prompts) -> str:
+    """Responses are only reused for the same RAG configuration,
+    indexes and prompts"""
+    return json.dumps(
+        {
+            "config": rag_request.model_dump(include=set(RAGConfig.model_fields)),
+            "indexes": index_manager.get_current_index_info(),
+            "prompts": prompts.digest(),
+        },
+        sort_keys=True,
+    )
+
+
+@router.get("/get_response_cache_info")
+async def get_response_cache_info(response_cache=Depends(get_response_cache)) -> dict:
+    return response_cache.stats()
+
+
+def get_rag_query_engine(rag_request, index_manager, prompts, streaming=False):
+    return index_manager.get_query_engine(
         prompts=prompts,
         llm_name=rag_request.llm_name,
         temperature=rag_request.temperature,
@@ -30,50 +48,158 @@ async def query_rag(
         use_node_rerank=rag_request.use_node_rerank,
         qa_followup=rag_request.qa_followup,
         hybrid_retrieval=rag_request.hybrid_retrieval,
+        streaming=streaming,
     )
-    if rag_request.use_react:
-        react_agent = index_manager.get_react_agent(
-            prompts=prompts,
-            llm_name=rag_request.llm_name,
-            temperature=rag_request.temperature,
-        )
-        response = await react_agent.achat(rag_request.query)
-    else:
-        response = await query_engine.aquery(rag_request.query)
 
-    if rag_request.evaluate_response:
-        retrieved_contexts = [r.node.text for r in response.source_nodes]
-        eval_df = pd.DataFrame(
-            {
-                "question": rag_request.query,
-                "answer": [response.response],
-                "contexts": [retrieved_contexts],
-            }
-        )
-        eval_df_ds = Dataset.from_pandas(eval_df)
 
-        vertexai_llm = ChatVertexAI(model_name=rag_request.eval_model_name)
-        vertexai_embeddings = VertexAIEmbeddings(
-            model_name=rag_request.embedding_model_name
-        )
+def evaluate_rag_response(rag_request, response) -> dict:
+    """Score a single response with ragas"""
+    retrieved_contexts = [r.node.text for r in response.source_nodes]
+    eval_df = pd.DataFrame(
+        {
+            "question": rag_request.query,
+            "answer": [response.response],
+            "contexts": [retrieved_contexts],
+        }
+    )
+    eval_df_ds = Dataset.from_pandas(eval_df)
 
-        metrics = [answer_relevancy, faithfulness, context_relevancy]
-        result = evaluate(
-            eval_df_ds,
-            metrics=metrics,
-            llm=vertexai_llm,
-            embeddings=vertexai_embeddings,
-        )
-        result_dict = (
-            result.to_pandas()[
-                ["answer_relevancy", "faithfulness", "context_relevancy"]
-            ]
-            .fillna(0)
-            .iloc[0]
-            .to_dict()
-        )
+    vertexai_llm = ChatVertexAI(model_name=rag_request.eval_model_name)
+    vertexai_embeddings = VertexAIEmbeddings(
+        model_name=rag_request.embedding_model_name
+    )
+
+    metrics = [answer_relevancy, faithfulness, context_relevancy]
+    result = evaluate(
+        eval_df_ds,
+        metrics=metrics,
+        llm=vertexai_llm,
+        embeddings=vertexai_embeddings,
+    )
+    result_dict = (
+        result.to_pandas()[["answer_relevancy", "faithfulness", "context_relevancy"]]
+        .fillna(0)
+        .iloc[0]
+        .to_dict()
+    )
+    logger.info(result_dict)
+    return result_dict
+
+
+@router.post("/query_rag")
+async def query_rag(
+    rag_request: RAGRequest,
+    index_manager=Depends(get_index_manager),
+    prompts=Depends(get_prompts),
+    response_cache=Depends(get_response_cache),
+) -> dict:
+    # Look up the cache first, hits skip building the engine
+    cache_lookup = await response_cache.alookup(
+        rag_request.query,
+        get_response_cache_namespace(rag_request, index_manager, prompts),
+    )
+    if cache_lookup.response is not None:
+        response = cache_lookup.response
+    else:
+        query_engine = get_rag_query_engine(rag_request, index_manager, prompts)
+        if rag_request.use_react:
+            react_agent = index_manager.get_react_agent(
+                query_engine=query_engine,
+                prompts=prompts,
+                llm_name=rag_request.llm_name,
+                temperature=rag_request.temperature,
+            )
+            response = await react_agent.achat(rag_request.query)
+        else:
+            response = await query_engine.aquery(rag_request.query)
+        response_cache.put(cache_lookup, response)
+
+    if rag_request.evaluate_response:
+        result_dict = evaluate_rag_response(rag_request, response)
         retrieved_context_dict = {"retrieved_chunks": response.source_nodes}
-        logger.info(result_dict)
         return {"response": response.response} | result_dict | retrieved_context_dict
     else:
         return {"response": response.response}
+
+
+def sse_event(event: str, data) -> str:
+    """Format a server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@router.post("/query_rag_stream")
+async def query_rag_stream(
+    rag_request: RAGRequest,
+    index_manager=Depends(get_index_manager),
+    prompts=Depends(get_prompts),
+    response_cache=Depends(get_response_cache),
+) -> StreamingResponse:
+    """
+    Server-sent events variant of /query_rag. Emits a `source_nodes` event
+    as soon as retrieval is done, then one `token` event per synthesized
+    token, then an `evaluation` event if evaluate_response is set and a
+    final `done` event. ReAct agents only know their sources once the
+    answer is complete, so their `source_nodes` event follows the tokens.
+    """
+    cache_lookup = await response_cache.alookup(
+        rag_request.query,
+        get_response_cache_namespace(rag_request, index_manager, prompts),
+    )
+    # The engine and agent are built now rather than once streaming starts,
+    # engines are shared across requests
+    query_engine = react_agent = None
+    if cache_lookup.response is None:
+        # The ReAct agent wraps the engine as a tool and needs complete
+        # responses from it
+        query_engine = get_rag_query_engine(
+            rag_request, index_manager, prompts, streaming=not rag_request.use_react
+        )
+        if rag_request.use_react:
+            react_agent = index_manager.get_react_agent(
+                query_engine=query_engine,
+                prompts=prompts,
+                llm_name=rag_request.llm_name,
+                temperature=rag_request.temperature,
+            )
+
+    async def event_stream(query_engine, react_agent):
+        try:
+            response = cache_lookup.response
+            if response is not None:
+                yield sse_event("source_nodes", response.source_nodes)
+                yield sse_event("token", {"delta": response.response})
+            elif react_agent is not None:
+                streaming_response = await react_agent.astream_chat(rag_request.query)
+                async for token in streaming_response.async_response_gen():
+                    yield sse_event("token", {"delta": token})
+                response = Response(
+                    response=streaming_response.response,
+                    source_nodes=streaming_response.source_nodes,
+                )
+                yield sse_event("source_nodes", response.source_nodes)
+                response_cache.put(cache_lookup, response)
+            else:
+                response = await query_engine.aquery(rag_request.query)
+                yield sse_event("source_nodes", response.source_nodes)
+                if isinstance(response, AsyncStreamingResponse):
+                    async for token in response.async_response_gen():
+                        yield sse_event("token", {"delta": token})
+                    response = await response.get_response()
+                else:
+                    yield sse_event("token", {"delta": response.response})
+                response_cache.put(cache_lookup, response)
+
+            if rag_request.evaluate_response:
+                # ragas blocks, keep the event loop free for other streams
+                result_dict = await asyncio.to_thread(
+                    evaluate_rag_response, rag_request, response
+                )
+                yield sse_event("evaluation", result_dict)
+            yield sse_event("done", {})
+        except Exception as e:
+            logger.exception("Streaming query failed")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(query_engine, react_agent), media_type="text/event-stream"
+    )
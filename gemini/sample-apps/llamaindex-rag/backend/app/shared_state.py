@@ -1,5 +1,6 @@
 from backend.rag.index_manager import IndexManager
 from backend.rag.prompts import Prompts
+from backend.rag.semantic_cache import SemanticResponseCache
 from common.utils import load_config
 
 config = load_config()
@@ -18,6 +19,20 @@ QA_ENDPOINT_NAME = config.get("qa_endpoint_name")
 FIRESTORE_DB_NAME = config.get("firestore_db_name")
 FIRESTORE_NAMESPACE = config.get("firestore_namespace")
 BUCKET_NAME = config.get("docstore_bucket_name")
+QUERY_ENGINE_CACHE_SIZE = config.get("query_engine_cache_size", 32)
+BM25_INDEX_DIR = config.get("bm25_index_dir")
+BM25_REFRESH_INTERVAL_SEC = config.get("bm25_refresh_interval_sec", 300)
+DOCSTORE_CACHE_SIZE = config.get("docstore_cache_size", 1024)
+DOCSTORE_CACHE_TTL_SEC = config.get("docstore_cache_ttl_sec", 600)
+HYDE_CACHE_SIZE = config.get("hyde_cache_size", 1024)
+HYDE_NUM_HYPOTHETICAL_DOCS = config.get("hyde_num_hypothetical_docs", 1)
+EMBEDDING_CACHE_DIR = config.get("embedding_cache_dir")
+RESPONSE_CACHE_SIMILARITY_THRESHOLD = config.get(
+    "response_cache_similarity_threshold", 0.95
+)
+RESPONSE_CACHE_SIZE = config.get("response_cache_size", 1024)
+RESPONSE_CACHE_TTL_SEC = config.get("response_cache_ttl_sec", 3600)
+RESPONSE_CACHE_DIR = config.get("response_cache_dir")
 
 # Initialize State of Prompts and Indexes
 
@@ -33,4 +48,20 @@ index_manager = IndexManager(
     firestore_db_name=FIRESTORE_DB_NAME,
     firestore_namespace=FIRESTORE_NAMESPACE,
     vs_bucket_name=BUCKET_NAME,
+    query_engine_cache_size=QUERY_ENGINE_CACHE_SIZE,
+    bm25_index_dir=BM25_INDEX_DIR,
+    vector_data_prefix=VECTOR_DATA_PREFIX,
+    docstore_cache_size=DOCSTORE_CACHE_SIZE,
+    docstore_cache_ttl_sec=DOCSTORE_CACHE_TTL_SEC,
+    hyde_cache_size=HYDE_CACHE_SIZE,
+    hyde_num_hypothetical_docs=HYDE_NUM_HYPOTHETICAL_DOCS,
+    embedding_cache_dir=EMBEDDING_CACHE_DIR,
+    bm25_refresh_interval_sec=BM25_REFRESH_INTERVAL_SEC,
+)
+response_cache = SemanticResponseCache(
+    embed_model=index_manager.embed_model,
+    similarity_threshold=RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+    max_size=RESPONSE_CACHE_SIZE,
+    ttl_sec=RESPONSE_CACHE_TTL_SEC,
+    persist_dir=RESPONSE_CACHE_DIR,
 )
@@ -1,7 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
 import json
 import logging
 import time
-import traceback
 
 from google.api_core.client_options import ClientOptions
 from google.cloud import documentai, storage
@@ -29,6 +29,7 @@ class DocAIParser:
         self.processor_name = processor_name
         self.gcs_output_path = gcs_output_path
         self._client = self._initialize_client()
+        self._storage_client = None
 
     def _initialize_client(self):
         options = ClientOptions(
@@ -43,44 +44,81 @@ class DocAIParser:
         include_ancestor_headings: bool = True,
         timeout_sec: int = 3600,
         check_in_interval_sec: int = 60,
+        shard_size: int = 50,
+        min_check_in_interval_sec: float = 5,
+        max_download_workers: int = 8,
     ) -> tuple[list[Document], list["DocAIParsingResults"]]:  # noqa: F821
         """
         Parses a list of blobs using Document AI.
 
+        Blobs are split into shards of at most shard_size files, each
+        processed by its own batch operation. Operations are polled with a
+        check-in interval growing from min_check_in_interval_sec to
+        check_in_interval_sec, and the output of each shard is downloaded
+        and parsed by a thread pool as soon as its operation is done.
+
         Args:
             blobs: List of GCS Blobs to parse.
             chunk_size: Chunk size for Document AI processing.
             include_ancestor_headings: Whether to include ancestor headings.
             timeout_sec: Timeout in seconds for the operation.
-            check_in_interval_sec: Check-in interval in seconds.
+            check_in_interval_sec: Maximum check-in interval in seconds.
+            shard_size: Maximum number of files per batch operation.
+            min_check_in_interval_sec: Initial check-in interval in seconds.
+            max_download_workers: Threads downloading and parsing output files.
 
         Returns:
             A tuple containing a list of parsed documents and a list of
             DocAIParsingResults.
         """
-        try:
-            operations = self._start_batch_process(
-                blobs, chunk_size, include_ancestor_headings
-            )
-            print(f"Number of operations started: {len(operations)}")
-            self._wait_for_operations(operations, timeout_sec, check_in_interval_sec)
-            print("Operations completed successfully")
-
-            for i, operation in enumerate(operations):
-                print(f"Operation {i + 1} metadata: {operation.metadata}")
-
-            results = self._get_results(operations)
-            print(f"Number of results: {len(results)}")
-            parsed_docs = self._parse_from_results(results)
-            print(f"Number of parsed documents: {len(parsed_docs)}")
-            return parsed_docs, results
-        except Exception as e:
-            print(f"Error in batch_parse: {str(e)}")
+        shards = [blobs[i : i + shard_size] for i in range(0, len(blobs), shard_size)]
+        operations = []
+        for shard in shards:
+            try:
+                operations.append(
+                    self._start_batch_process(
+                        shard, chunk_size, include_ancestor_headings
+                    )
+                )
+            except Exception:
+                logger.exception(f"Error starting batch process for {len(shard)} files")
+        logger.info(f"Number of operations started: {len(operations)}")
 
-            traceback.print_exc()
-            # Return any successfully parsed documents
-            # instead of raising an exception
-            return [], []
+        # Shard index -> list of (result, futures of its parsed documents)
+        shard_outputs = {}
+        with ThreadPoolExecutor(max_workers=max_download_workers) as executor:
+            try:
+                for i, operation in self._wait_for_operations(
+                    operations,
+                    timeout_sec,
+                    min_check_in_interval_sec,
+                    check_in_interval_sec,
+                ):
+                    error = operation.exception()
+                    if error:
+                        # Keep the documents parsed from the other shards
+                        logger.error(f"Operation {i + 1} failed: {error}")
+                        continue
+                    logger.info(f"Operation {i + 1} metadata: {operation.metadata}")
+                    shard_outputs[i] = [
+                        (result, self._submit_parse_result(executor, result))
+                        for result in self._get_results([operation])
+                    ]
+            except TimeoutError:
+                # Return the documents of the shards which did finish
+                logger.error(f"Timeout exceeded after {timeout_sec}s")
+
+            results = []
+            parsed_docs = []
+            for i in sorted(shard_outputs):
+                for result, futures in shard_outputs[i]:
+                    results.append(result)
+                    for future in futures:
+                        parsed_docs.extend(future.result())
+
+        logger.info(f"Number of results: {len(results)}")
+        logger.info(f"Number of parsed documents: {len(parsed_docs)}")
+        return parsed_docs, results
 
     def _start_batch_process(
         self, blobs: list[Blob], chunk_size: int, include_ancestor_headings: bool
@@ -119,26 +157,32 @@ class DocAIParser:
             skip_human_review=True,
         )
 
-        try:
-            operation = self._client.batch_process_documents(request)
-            print(f"Batch process started. Operation: {operation}")
-            return [operation]
-        except Exception as e:
-            print(f"Error starting batch process: {str(e)}")
-            raise
-
-    def _wait_for_operations(self, operations, timeout_sec, check_in_interval_sec):
-        time_elapsed = 0
-        while any(not operation.done() for operation in operations):
-            time.sleep(check_in_interval_sec)
-            time_elapsed += check_in_interval_sec
-            if time_elapsed > timeout_sec:
-                raise TimeoutError("Timeout exceeded!")
+        operation = self._client.batch_process_documents(request)
+        logger.info(f"Batch process started. Operation: {operation.operation.name}")
+        return operation
 
-        # Check for errors in completed operations
-        for operation in operations:
-            if operation.exception():
-                raise KeyError(f"Operation failed: {operation.exception()}")
+    def _wait_for_operations(
+        self,
+        operations,
+        timeout_sec,
+        min_check_in_interval_sec,
+        max_check_in_interval_sec,
+    ):
+        """Yields (index, operation) for each operation as soon as it is done"""
+        pending = dict(enumerate(operations))
+        interval = min_check_in_interval_sec
+        deadline = time.monotonic() + timeout_sec
+        while pending:
+            for i, operation in list(pending.items()):
+                if operation.done():
+                    del pending[i]
+                    yield i, operation
+            if not pending:
+                break
+            if time.monotonic() + interval > deadline:
+                raise TimeoutError("Timeout exceeded!")
+            time.sleep(interval)
+            interval = min(interval * 2, max_check_in_interval_sec)
 
     def _get_results(self, operations) -> list["DocAIParsingResults"]:  # noqa: F821
         results = []
@@ -153,69 +197,68 @@ class DocAIParser:
                         )
                     )
             else:
-                print(f"Warning: Unexpected metadata structure: {metadata}")
+                logger.warning(f"Unexpected metadata structure: {metadata}")
         return results
 
-    def _parse_from_results(self, results: list["DocAIParsingResults"]):  # noqa: F821
-        documents = []
-        storage_client = storage.Client()
+    def _submit_parse_result(
+        self, executor, result: "DocAIParsingResults"
+    ):  # noqa: F821
+        """Lists the output files of a result and submits each one to
+        the executor, returns the futures of their parsed documents"""
+        if not result.parsed_path:
+            logger.warning(
+                f"Empty parsed_path for source {result.source_path}. Skipping."
+            )
+            return []
 
-        for result in results:
-            print(
-                f"Processing result: source_path={result.source_path}, "
-                f"parsed_path={result.parsed_path}"
+        try:
+            bucket_name, prefix = result.parsed_path.replace("gs://", "").split("/", 1)
+        except ValueError:
+            logger.error(
+                f"Invalid parsed_path format for {result.source_path}. Skipping."
             )
-            if not result.parsed_path:
-                print(
-                    "Warning: Empty parsed_path for source "
-                    f"{result.source_path}. Skipping."
-                )
-                continue
+            return []
+
+        if self._storage_client is None:
+            self._storage_client = storage.Client()
+        bucket = self._storage_client.bucket(bucket_name)
+        blobs = [
+            blob
+            for blob in bucket.list_blobs(prefix=prefix)
+            if blob.name.endswith(".json")
+        ]
+        logger.info(f"Found {len(blobs)} JSON blobs in {result.parsed_path}")
+        return [
+            executor.submit(self._parse_blob, blob, result.source_path)
+            for blob in blobs
+        ]
 
-            try:
-                bucket_name, prefix = result.parsed_path.replace("gs://", "").split(
-                    "/", 1
-                )
-            except ValueError:
-                print(
-                    f"Error: Invalid parsed_path format for {result.source_path}. Skipping."
-                )
-                continue
-
-            bucket = storage_client.bucket(bucket_name)
-            blobs = list(bucket.list_blobs(prefix=prefix))
-            print(f"Found {len(blobs)} blobs in {result.parsed_path}")
-
-            for blob in blobs:
-                if blob.name.endswith(".json"):
-                    print(f"Processing JSON blob: {blob.name}")
-                    try:
-                        content = blob.download_as_text()
-                        doc_data = json.loads(content)
-
-                        if (
-                            "chunkedDocument" in doc_data
-                            and "chunks" in doc_data["chunkedDocument"]
-                        ):
-                            for chunk in doc_data["chunkedDocument"]["chunks"]:
-                                doc = Document(
-                                    text=chunk["content"],
-                                    metadata={
-                                        "chunk_id": chunk["chunkId"],
-                                        "source": result.source_path,
-                                    },
-                                )
-                                documents.append(doc)
-                        else:
-                            print(
-                                "Warning: Expected 'chunkedDocument' "
-                                f"structure not found in {blob.name}"
-                            )
-                    except Exception as e:
-                        print(f"Error processing blob {blob.name}: {str(e)}")
-
-        print(f"Total documents created: {len(documents)}")
-        return documents
+    @staticmethod
+    def _parse_blob(blob: Blob, source_path: str) -> list[Document]:
+        try:
+            doc_data = json.loads(blob.download_as_bytes())
+        except Exception as e:
+            logger.error(f"Error processing blob {blob.name}: {str(e)}")
+            return []
+
+        if "chunkedDocument" not in doc_data or (
+            "chunks" not in doc_data["chunkedDocument"]
+        ):
+            logger.warning(
+                f"Expected 'chunkedDocument' structure not found in {blob.name}"
+            )
+            return []
+
+        return [
+            Document(
+                text=chunk["content"],
+                metadata={
+                    "chunk_id": chunk["chunkId"],
+                    "source": source_path,
+                },
+            )
+            for chunk in doc_data["chunkedDocument"]["chunks"]
+        ]
 
 
 class DocAIParsingResults:
@@ -0,0 +1,154 @@
+"""Manifest of indexed source files used for incremental re-indexing"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+import json
+import logging
+import os
+
+from llama_index.core.schema import BaseNode, Document
+
+logging.basicConfig(level=logging.INFO)  # Set the desired logging level
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = "manifest.json"
+FORMAT_VERSION = 1
+
+
+@dataclass
+class ManifestDiff:
+    """Source files grouped by how they changed since the last run"""
+
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+
+    @property
+    def to_index(self) -> list[str]:
+        return self.added + self.changed
+
+    @property
+    def to_delete(self) -> list[str]:
+        return self.changed + self.deleted
+
+    def report(self) -> str:
+        lines = [
+            f"Index diff: {len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.deleted)} deleted, {len(self.unchanged)} unchanged"
+        ]
+        for label, sources in [
+            ("+", self.added),
+            ("~", self.changed),
+            ("-", self.deleted),
+        ]:
+            lines.extend(f"  {label} {source}" for source in sources)
+        return "\n".join(lines)
+
+
+class IndexManifest:
+    """
+    Maps every indexed source file to the fingerprint (GCS generation and
+    md5 hash) it had when it was indexed, and to the ids of the docstore
+    nodes and vector store datapoints created from it. Comparing the
+    current bucket listing against the manifest tells which files have to
+    be parsed and embedded again and which ids have to be deleted.
+    """
+
+    def __init__(self, persist_dir: str, entries: dict[str, dict] | None = None):
+        self.persist_dir = persist_dir
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, persist_dir: str) -> "IndexManifest":
+        path = os.path.join(persist_dir, MANIFEST_FILE_NAME)
+        if not os.path.exists(path):
+            return cls(persist_dir)
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest["format_version"] != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported index manifest format: {manifest['format_version']}"
+            )
+        return cls(persist_dir, manifest["entries"])
+
+    def persist(self) -> None:
+        os.makedirs(self.persist_dir, exist_ok=True)
+        path = os.path.join(self.persist_dir, MANIFEST_FILE_NAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"format_version": FORMAT_VERSION, "entries": self.entries}, f)
+        os.replace(tmp_path, path)
+        logger.info(f"Persisted index manifest with {len(self.entries)} sources")
+
+    @staticmethod
+    def fingerprint(blob) -> str:
+        return f"{blob.generation}:{blob.md5_hash}"
+
+    def diff(self, blobs: list) -> ManifestDiff:
+        """Compare the blobs currently in the bucket against the manifest"""
+        diff = ManifestDiff()
+        current = {blob.path: self.fingerprint(blob) for blob in blobs}
+        for source, fingerprint in current.items():
+            if source not in self.entries:
+                diff.added.append(source)
+            elif self.entries[source]["fingerprint"] != fingerprint:
+                diff.changed.append(source)
+            else:
+                diff.unchanged.append(source)
+        diff.deleted = [source for source in self.entries if source not in current]
+        return diff
+
+    def get_ids(self, sources: list[str]) -> dict[str, list[str]]:
+        """Return the docstore, vector and QA vector ids created from sources"""
+        ids = defaultdict(list)
+        for source in sources:
+            entry = self.entries.get(source, {})
+            for key in ["docstore_ids", "vector_ids", "qa_vector_ids"]:
+                ids[key].extend(entry.get(key, []))
+        return ids
+
+    def remove(self, sources: list[str]) -> None:
+        for source in sources:
+            self.entries.pop(source, None)
+
+    def record(
+        self,
+        blobs: list,
+        documents: list[Document],
+        docstore_nodes: list[BaseNode],
+        vector_nodes: list[BaseNode],
+        qa_vector_nodes: list[BaseNode],
+    ) -> list[str]:
+        """
+        Record the ids created from each indexed blob. Nodes are attributed
+        to their source file through the document they were parsed from.
+        Returns the blobs which produced no documents, they are left out of
+        the manifest so the next run retries them.
+        """
+        doc_sources = {doc.doc_id: doc.metadata.get("source") for doc in documents}
+
+        def get_source(node):
+            return doc_sources.get(node.ref_doc_id) or doc_sources.get(node.node_id)
+
+        ids = defaultdict(lambda: defaultdict(list))
+        for key, nodes in [
+            ("docstore_ids", docstore_nodes),
+            ("vector_ids", vector_nodes),
+            ("qa_vector_ids", qa_vector_nodes),
+        ]:
+            for node in nodes:
+                ids[get_source(node)][key].append(node.node_id)
+
+        failed = []
+        for blob in blobs:
+            if blob.path not in ids:
+                failed.append(blob.path)
+                continue
+            self.entries[blob.path] = {
+                "fingerprint": self.fingerprint(blob),
+                "docstore_ids": ids[blob.path]["docstore_ids"],
+                "vector_ids": ids[blob.path]["vector_ids"],
+                "qa_vector_ids": ids[blob.path]["qa_vector_ids"],
+            }
+        return failed
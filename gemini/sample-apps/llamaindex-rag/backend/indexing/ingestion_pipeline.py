@@ -0,0 +1,199 @@
+"""Pipelined chunking, QA extraction, embedding and indexing of parsed documents"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+import logging
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import BaseNode, Document, MetadataMode
+from llama_index.core.storage.docstore import BaseDocumentStore
+from llama_index.core.vector_stores.types import BasePydanticVectorStore
+
+logging.basicConfig(level=logging.INFO)  # Set the desired logging level
+logger = logging.getLogger(__name__)
+
+# Marks the end of the stream on a stage queue
+_DONE = object()
+
+# Returns the nodes to write to the docstore and the nodes to embed
+ChunkFn = Callable[[Document], tuple[list[BaseNode], list[BaseNode]]]
+# Returns the question documents to embed in the QA index
+QAFn = Callable[[Document], Awaitable[list[Document]]]
+
+
+@dataclass
+class IngestionResult:
+    """Documents read by the pipeline and the nodes written from them"""
+
+    documents: list[Document] = field(default_factory=list)
+    docstore_nodes: list[BaseNode] = field(default_factory=list)
+    vector_nodes: list[BaseNode] = field(default_factory=list)
+    qa_vector_nodes: list[BaseNode] = field(default_factory=list)
+
+
+class IngestionPipeline:
+    """
+    Streams parsed documents through chunking, QA extraction, embedding
+    and indexing stages connected by bounded queues, so every stage works
+    on the documents already produced by the previous one and a slow stage
+    applies backpressure instead of buffering the whole corpus.
+
+    Nodes are embedded in batches of up to embed_batch_size with at most
+    embed_concurrency batches in flight and upserted into their vector
+    store as a batch. Docstore writes are batched by docstore_batch_size.
+    """
+
+    def __init__(
+        self,
+        docstore: BaseDocumentStore,
+        embed_model: BaseEmbedding,
+        vector_store: BasePydanticVectorStore | None,
+        chunk_fn: ChunkFn | None,
+        qa_vector_store: BasePydanticVectorStore | None = None,
+        qa_fn: QAFn | None = None,
+        queue_size: int = 64,
+        embed_batch_size: int = 100,
+        embed_concurrency: int = 4,
+        qa_concurrency: int = 8,
+        docstore_batch_size: int = 100,
+    ):
+        self.docstore = docstore
+        self.embed_model = embed_model
+        self.vector_store = vector_store
+        self.chunk_fn = chunk_fn
+        self.qa_vector_store = qa_vector_store
+        self.qa_fn = qa_fn
+        self.queue_size = queue_size
+        self.embed_batch_size = embed_batch_size
+        self.embed_concurrency = embed_concurrency
+        self.qa_concurrency = qa_concurrency
+        self.docstore_batch_size = docstore_batch_size
+
+    async def run(self, documents: AsyncIterator[list[Document]]) -> IngestionResult:
+        """Ingest batches of documents as they are produced"""
+        chunk_queue = asyncio.Queue(maxsize=self.queue_size)
+        qa_queue = asyncio.Queue(maxsize=self.queue_size)
+        docstore_queue = asyncio.Queue(maxsize=self.queue_size)
+        embed_queue = asyncio.Queue(maxsize=self.queue_size)
+        qa_embed_queue = asyncio.Queue(maxsize=self.queue_size)
+        embed_semaphore = asyncio.Semaphore(self.embed_concurrency)
+        result = IngestionResult()
+
+        async def read_documents():
+            async for batch in documents:
+                result.documents.extend(batch)
+                for doc in batch:
+                    if self.chunk_fn:
+                        await chunk_queue.put(doc)
+                    if self.qa_fn:
+                        await qa_queue.put(doc)
+            await chunk_queue.put(_DONE)
+            for _ in range(self.qa_concurrency):
+                await qa_queue.put(_DONE)
+
+        async def chunk_documents():
+            if self.chunk_fn:
+                while (doc := await chunk_queue.get()) is not _DONE:
+                    nodes, embed_nodes = await asyncio.to_thread(self.chunk_fn, doc)
+                    for node in nodes:
+                        await docstore_queue.put(node)
+                    for node in embed_nodes:
+                        await embed_queue.put(node)
+            await embed_queue.put(_DONE)
+
+        async def extract_questions():
+            while (doc := await qa_queue.get()) is not _DONE:
+                q_docs = await self.qa_fn(doc)
+                await docstore_queue.put(doc)
+                for q_doc in q_docs:
+                    await qa_embed_queue.put(q_doc)
+
+        async def run_qa_workers():
+            if self.qa_fn:
+                await asyncio.gather(
+                    *[extract_questions() for _ in range(self.qa_concurrency)]
+                )
+            await qa_embed_queue.put(_DONE)
+
+        async def write_docstore():
+            written_ids = set()
+            async for batch in self._batches(docstore_queue, self.docstore_batch_size):
+                # Source documents can be queued by both the chunking
+                # and the QA stage
+                batch = [n for n in batch if n.node_id not in written_ids]
+                written_ids.update(n.node_id for n in batch)
+                await self.docstore.async_add_documents(batch)
+                result.docstore_nodes.extend(batch)
+                logger.info(f"Wrote {len(result.docstore_nodes)} nodes to the docstore")
+
+        async def embed_and_upsert(queue, vector_store, upserted_nodes):
+            upserts = []
+            async for batch in self._batches(queue, self.embed_batch_size):
+                upserted_nodes.extend(batch)
+                await embed_semaphore.acquire()
+                upserts.append(
+                    asyncio.create_task(
+                        self._embed_and_upsert(batch, vector_store, embed_semaphore)
+                    )
+                )
+            await asyncio.gather(*upserts)
+
+        async def close_docstore_queue():
+            # Both the chunking and the QA stages write to the docstore
+            await asyncio.gather(chunk_task, qa_task)
+            await docstore_queue.put(_DONE)
+
+        chunk_task = asyncio.create_task(chunk_documents())
+        qa_task = asyncio.create_task(run_qa_workers())
+        await asyncio.gather(
+            read_documents(),
+            chunk_task,
+            qa_task,
+            close_docstore_queue(),
+            write_docstore(),
+            embed_and_upsert(embed_queue, self.vector_store, result.vector_nodes),
+            embed_and_upsert(
+                qa_embed_queue, self.qa_vector_store, result.qa_vector_nodes
+            ),
+        )
+        return result
+
+    async def _embed_and_upsert(
+        self,
+        nodes: list[BaseNode],
+        vector_store: BasePydanticVectorStore,
+        semaphore: asyncio.Semaphore,
+    ) -> None:
+        try:
+            embeddings = await self.embed_model.aget_text_embedding_batch(
+                [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+            )
+            # Copies, the same nodes may be queued for the docstore
+            # which should not store their embeddings
+            nodes = [
+                node.model_copy(update={"embedding": embedding})
+                for node, embedding in zip(nodes, embeddings)
+            ]
+            # The vector store client is synchronous
+            await asyncio.to_thread(vector_store.add, nodes)
+            logger.info(f"Upserted {len(nodes)} embeddings")
+        finally:
+            semaphore.release()
+
+    @staticmethod
+    async def _batches(
+        queue: asyncio.Queue, batch_size: int
+    ) -> AsyncIterator[list[BaseNode]]:
+        """Yield items from queue in batches of batch_size until _DONE"""
+        batch = []
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
@@ -6,14 +6,19 @@ import logging
 import os
 
 from backend.indexing.docai_parser import DocAIParser
+from backend.indexing.index_manifest import IndexManifest
+from backend.indexing.ingestion_pipeline import IngestionPipeline, IngestionResult
 from backend.indexing.prompts import QA_EXTRACTION_PROMPT, QA_PARSER_PROMPT
 from backend.indexing.vector_search_utils import (
     get_or_create_existing_index,
 )  # noqa: E501
+from backend.rag.bm25_index import BM25Index
+from backend.rag.embedding_cache import CachedEmbedding
 from common.utils import (
     create_pdf_blob_list,
-    download_bucket_with_transfer_manager,
     link_nodes,
+    sync_directory_from_gcs,
+    upload_directory_to_gcs,
 )
 from google.cloud import aiplatform
 from llama_index.core import Document, Settings, StorageContext, VectorStoreIndex
@@ -69,6 +74,17 @@ FIRESTORE_DB_NAME = config.get("firestore_db_name")
 FIRESTORE_NAMESPACE = config.get("firestore_namespace")
 QA_INDEX_NAME = config.get("qa_index_name")
 QA_ENDPOINT_NAME = config.get("qa_endpoint_name")
+BM25_INDEX_DIR = config.get("bm25_index_dir")
+PIPELINED_INGESTION = config.get("pipelined_ingestion", False)
+INGESTION_QUEUE_SIZE = config.get("ingestion_queue_size", 64)
+EMBED_BATCH_SIZE = config.get("embed_batch_size", 32)
+EMBED_CONCURRENCY = config.get("embed_concurrency", 4)
+QA_CONCURRENCY = config.get("qa_concurrency", 8)
+DOCSTORE_BATCH_SIZE = config.get("docstore_batch_size", 100)
+PARSE_SHARD_SIZE = config.get("parse_shard_size", 20)
+PARSE_CONCURRENCY = config.get("parse_concurrency", 4)
+INDEX_MANIFEST_DIR = config.get("index_manifest_dir")
+EMBEDDING_CACHE_DIR = config.get("embedding_cache_dir")
 
 
 class QuesionsAnswered(BaseModel):
@@ -77,45 +93,42 @@ class QuesionsAnswered(BaseModel):
     questions_list: list[str]
 
 
-def create_qa_index(li_docs, docstore, embed_model, llm):
-    """creates index of hypothetical questions"""
+def get_qa_vector_store():
     qa_index, qa_endpoint = get_or_create_existing_index(
         QA_INDEX_NAME, QA_ENDPOINT_NAME, APPROXIMATE_NEIGHBORS_COUNT
     )
-    qa_vector_store = VertexAIVectorStore(
+    return VertexAIVectorStore(
         project_id=PROJECT_ID,
         region=LOCATION,
         index_id=qa_index.name,  # Use .name instead of .resource_name
         endpoint_id=qa_endpoint.name,
         gcs_bucket_name=DOCSTORE_BUCKET_NAME,
     )
+
+
+def get_qa_extractor_and_program(llm):
     qa_extractor = QuestionsAnsweredExtractor(
         llm, questions=5, prompt_template=QA_EXTRACTION_PROMPT
     )
-
-    async def extract_batch(li_docs):
-        return await tqdm_asyncio.gather(
-            *[qa_extractor._aextract_questions_from_node(doc) for doc in li_docs]
-        )
-
-    loop = asyncio.get_event_loop()
-    metadata_list = loop.run_until_complete(extract_batch(li_docs))
-
     program = LLMTextCompletionProgram.from_defaults(
         output_cls=QuesionsAnswered,
         prompt_template_str=QA_PARSER_PROMPT,
         verbose=True,
     )
+    return qa_extractor, program
 
-    async def parse_batch(metadata_list):
-        return await asyncio.gather(
-            *[program.acall(questions_list=x) for x in metadata_list],
-            return_exceptions=True,
-        )
-
-    parsed_questions = loop.run_until_complete(parse_batch(metadata_list))
 
-    loop.close()
+async def aextract_question_docs(li_docs, qa_extractor, program, show_progress=False):
+    """Extracts the questions answered by each document as
+    question documents pointing back to their source document"""
+    gather = tqdm_asyncio.gather if show_progress else asyncio.gather
+    metadata_list = await gather(
+        *[qa_extractor._aextract_questions_from_node(doc) for doc in li_docs]
+    )
+    parsed_questions = await asyncio.gather(
+        *[program.acall(questions_list=x) for x in metadata_list],
+        return_exceptions=True,
+    )
 
     q_docs = []
     for doc, questions in zip(li_docs, parsed_questions):
@@ -130,6 +143,17 @@ def create_qa_index(li_docs, docstore, embed_model, llm):
                     node_id=doc.doc_id
                 )
                 q_docs.append(q_doc)
+    return q_docs
+
+
+def create_qa_index(li_docs, docstore, embed_model, llm):
+    """creates index of hypothetical questions"""
+    qa_vector_store = get_qa_vector_store()
+    qa_extractor, program = get_qa_extractor_and_program(llm)
+    q_docs = asyncio.run(
+        aextract_question_docs(li_docs, qa_extractor, program, show_progress=True)
+    )
+
     docstore.add_documents(li_docs)
     storage_context = StorageContext.from_defaults(
         docstore=docstore, vector_store=qa_vector_store
@@ -140,6 +164,7 @@ def create_qa_index(li_docs, docstore, embed_model, llm):
         embed_model=embed_model,
         llm=llm,
     )
+    return li_docs, q_docs
 
 
 def create_hierarchical_index(li_docs, docstore, vector_store, embed_model, llm):
@@ -161,6 +186,32 @@ def create_hierarchical_index(li_docs, docstore, vector_store, embed_model, llm)
         embed_model=embed_model,
         llm=llm,
     )
+    return nodes, leaf_nodes
+
+
+def get_flat_nodes(doc, sentence_splitter):
+    """Chunks a document into linked nodes pointing back to it"""
+    doc_dict = doc.to_dict()
+    metadata = doc_dict.pop("metadata")
+    doc_dict.update(metadata)
+    chunks = sentence_splitter.get_nodes_from_documents([doc])
+
+    # Create nodes with relationships and flatten
+    nodes = []
+    for chunk in chunks:
+        text = chunk.pop("text")
+        doc_source_id = doc.doc_id
+        node = TextNode(text=text, metadata=chunk)
+        node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(
+            node_id=doc_source_id
+        )
+        nodes.append(node)
+
+    nodes = link_nodes(nodes)
+    for node in nodes:
+        node.metadata.pop("excluded_embed_metadata_keys", None)
+        node.metadata.pop("excluded_llm_metadata_keys", None)
+    return nodes
 
 
 def create_flat_index(li_docs, docstore, vector_store, embed_model, llm):
@@ -168,24 +219,7 @@ def create_flat_index(li_docs, docstore, vector_store, embed_model, llm):
     # Chunk into granular chunks manually
     node_chunk_list = []
     for doc in li_docs:
-        doc_dict = doc.to_dict()
-        metadata = doc_dict.pop("metadata")
-        doc_dict.update(metadata)
-        chunks = sentence_splitter.get_nodes_from_documents([doc])
-
-        # Create nodes with relationships and flatten
-        nodes = []
-        for chunk in chunks:
-            text = chunk.pop("text")
-            doc_source_id = doc.doc_id
-            node = TextNode(text=text, metadata=chunk)
-            node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(
-                node_id=doc_source_id
-            )
-            nodes.append(node)
-
-        nodes = link_nodes(nodes)
-        node_chunk_list.extend(nodes)
+        node_chunk_list.extend(get_flat_nodes(doc, sentence_splitter))
 
     nodes = node_chunk_list
     logger.info("embedding...")
@@ -194,10 +228,6 @@ def create_flat_index(li_docs, docstore, vector_store, embed_model, llm):
         docstore=docstore, vector_store=vector_store
     )
 
-    for node in nodes:
-        node.metadata.pop("excluded_embed_metadata_keys", None)
-        node.metadata.pop("excluded_llm_metadata_keys", None)
-
     # Creating an index automatically embeds and creates the
     # vector db collection
     VectorStoreIndex(
@@ -206,6 +236,189 @@ def create_flat_index(li_docs, docstore, vector_store, embed_model, llm):
         embed_model=embed_model,
         llm=llm,
     )
+    return li_docs, nodes
+
+
+async def parse_documents(parser, blobs):
+    """Parses blobs with Document AI in shards of PARSE_SHARD_SIZE,
+    yielding the documents of each shard as soon as it is parsed"""
+    semaphore = asyncio.Semaphore(PARSE_CONCURRENCY)
+
+    async def parse_shard(shard):
+        async with semaphore:
+            parsed_docs, _ = await asyncio.to_thread(
+                parser.batch_parse,
+                shard,
+                chunk_size=CHUNK_SIZE,
+                include_ancestor_headings=True,
+            )
+        logger.info(f"Parsed {len(parsed_docs)} documents from {len(shard)} files")
+        return [Document(text=doc.text, metadata=doc.metadata) for doc in parsed_docs]
+
+    shards = [
+        blobs[i : i + PARSE_SHARD_SIZE] for i in range(0, len(blobs), PARSE_SHARD_SIZE)
+    ]
+    for next_shard in asyncio.as_completed([parse_shard(s) for s in shards]):
+        yield await next_shard
+
+
+async def run_pipelined_ingestion(
+    parser, blobs, docstore, vector_store, embed_model, llm
+):
+    """Parses, chunks, extracts questions, embeds and indexes documents
+    as streaming stages"""
+    if INDEXING_METHOD == "hierarchical":
+        node_parser = HierarchicalNodeParser.from_defaults(chunk_sizes=CHUNK_SIZES)
+
+        def chunk_fn(doc):
+            nodes = node_parser.get_nodes_from_documents([doc])
+            return nodes, node_parser.get_leaf_nodes(nodes)
+
+    elif INDEXING_METHOD == "flat":
+        sentence_splitter = SentenceSplitter(chunk_size=CHUNK_OVERLAP)
+
+        def chunk_fn(doc):
+            return [doc], get_flat_nodes(doc, sentence_splitter)
+
+    else:
+        chunk_fn = None
+
+    if QA_INDEX_NAME or QA_ENDPOINT_NAME:
+        qa_vector_store = get_qa_vector_store()
+        qa_extractor, program = get_qa_extractor_and_program(llm)
+
+        async def qa_fn(doc):
+            return await aextract_question_docs([doc], qa_extractor, program)
+
+    else:
+        qa_vector_store = None
+        qa_fn = None
+
+    pipeline = IngestionPipeline(
+        docstore=docstore,
+        embed_model=embed_model,
+        vector_store=vector_store,
+        chunk_fn=chunk_fn,
+        qa_vector_store=qa_vector_store,
+        qa_fn=qa_fn,
+        queue_size=INGESTION_QUEUE_SIZE,
+        embed_batch_size=EMBED_BATCH_SIZE,
+        embed_concurrency=EMBED_CONCURRENCY,
+        qa_concurrency=QA_CONCURRENCY,
+        docstore_batch_size=DOCSTORE_BATCH_SIZE,
+    )
+    return await pipeline.run(parse_documents(parser, blobs))
+
+
+def update_bm25_index(docstore_nodes, deleted_node_ids=()):
+    """Adds the nodes written to the docstore to the persisted BM25 index
+    used for hybrid retrieval and uploads it next to the vector data"""
+    persist_dir = os.path.join(BM25_INDEX_DIR, FIRESTORE_NAMESPACE)
+    gcs_prefix = f"{VECTOR_DATA_PREFIX}/bm25/{FIRESTORE_NAMESPACE}"
+    # Another run may have updated the index since the local copy was made
+    sync_directory_from_gcs(DOCSTORE_BUCKET_NAME, gcs_prefix, persist_dir)
+
+    if BM25Index.exists(persist_dir):
+        bm25_index = BM25Index.load(persist_dir)
+    else:
+        bm25_index = BM25Index()
+    bm25_index.delete(list(deleted_node_ids))
+    bm25_index.add_nodes(docstore_nodes)
+    bm25_index.persist(persist_dir)
+    upload_directory_to_gcs(persist_dir, DOCSTORE_BUCKET_NAME, gcs_prefix)
+
+
+def load_index_manifest():
+    """Loads the manifest of indexed files, kept in GCS between runs"""
+    persist_dir = os.path.join(INDEX_MANIFEST_DIR, FIRESTORE_NAMESPACE)
+    gcs_prefix = f"{VECTOR_DATA_PREFIX}/manifest/{FIRESTORE_NAMESPACE}"
+    # A stale local copy would drive the diff against the bucket and delete
+    # or skip the wrong files, another run may have updated it since
+    sync_directory_from_gcs(DOCSTORE_BUCKET_NAME, gcs_prefix, persist_dir)
+    return IndexManifest.load(persist_dir)
+
+
+def persist_index_manifest(manifest):
+    manifest.persist()
+    gcs_prefix = f"{VECTOR_DATA_PREFIX}/manifest/{FIRESTORE_NAMESPACE}"
+    upload_directory_to_gcs(manifest.persist_dir, DOCSTORE_BUCKET_NAME, gcs_prefix)
+
+
+def delete_stale_nodes(stale_ids, docstore, vector_store):
+    """Deletes the docstore nodes and vector datapoints
+    created from files which changed or were deleted"""
+
+    async def delete_documents(node_ids):
+        await asyncio.gather(
+            *[docstore.adelete_document(i, raise_error=False) for i in node_ids]
+        )
+
+    if stale_ids["docstore_ids"]:
+        asyncio.run(delete_documents(stale_ids["docstore_ids"]))
+    if stale_ids["vector_ids"]:
+        vector_store.index.remove_datapoints(datapoint_ids=stale_ids["vector_ids"])
+    if stale_ids["qa_vector_ids"]:
+        get_qa_vector_store().index.remove_datapoints(
+            datapoint_ids=stale_ids["qa_vector_ids"]
+        )
+    logger.info(
+        f"Deleted {len(stale_ids['docstore_ids'])} docstore nodes, "
+        f"{len(stale_ids['vector_ids'])} vectors and "
+        f"{len(stale_ids['qa_vector_ids'])} QA vectors"
+    )
+
+
+def run_ingestion(parser, blobs, docstore, vector_store, embed_model, llm):
+    """Parses, embeds and indexes blobs one stage after the other"""
+    # Parse documents using Document AI
+    try:
+        parsed_docs, raw_results = parser.batch_parse(
+            blobs,
+            chunk_size=CHUNK_SIZE,
+            include_ancestor_headings=True,
+            shard_size=PARSE_SHARD_SIZE,
+        )
+        print(f"Number of documents parsed by Document AI: {len(parsed_docs)}")
+        if parsed_docs:
+            print(
+                f"First parsed document text (first 100 chars): {parsed_docs[0].text[:100]}..."  # noqa: E501
+            )
+        else:
+            print("No documents were parsed by Document AI.")
+
+        # Print raw results for debugging
+        print("Raw results:")
+        for result in raw_results:
+            print(f"  Source: {result.source_path}")
+            print(f"  Parsed: {result.parsed_path}")
+    except Exception as e:
+        print(f"Error processing single document: {str(e)}")
+        parsed_docs = []
+        raw_results = []
+
+    # Turn each parsed document into a llamaindex Document
+    li_docs = [Document(text=doc.text, metadata=doc.metadata) for doc in parsed_docs]
+
+    # Track everything written to the docstore for the BM25 index
+    result = IngestionResult(documents=li_docs)
+    if QA_INDEX_NAME or QA_ENDPOINT_NAME:
+        docstore_nodes, result.qa_vector_nodes = create_qa_index(
+            li_docs, docstore, embed_model, llm
+        )
+        result.docstore_nodes.extend(docstore_nodes)
+
+    if INDEXING_METHOD == "hierarchical":
+        docstore_nodes, result.vector_nodes = create_hierarchical_index(
+            li_docs, docstore, vector_store, embed_model, llm
+        )
+        result.docstore_nodes.extend(docstore_nodes)
+
+    elif INDEXING_METHOD == "flat":
+        docstore_nodes, result.vector_nodes = create_flat_index(
+            li_docs, docstore, vector_store, embed_model, llm
+        )
+        result.docstore_nodes.extend(docstore_nodes)
+    return result
 
 
 def main():
@@ -233,8 +446,14 @@ def main():
 
     # Setup embedding model and LLM
     embed_model = VertexTextEmbedding(
-        model_name=EMBEDDINGS_MODEL_NAME, project=PROJECT_ID, location=LOCATION
+        model_name=EMBEDDINGS_MODEL_NAME,
+        project=PROJECT_ID,
+        location=LOCATION,
+        embed_batch_size=EMBED_BATCH_SIZE,
     )
+    if EMBEDDING_CACHE_DIR:
+        # Unchanged chunks of re-indexed files are not embedded again
+        embed_model = CachedEmbedding(embed_model, persist_dir=EMBEDDING_CACHE_DIR)
     llm = Vertex(model="gemini-1.5-flash", temperature=0.0)
     Settings.llm = llm
     Settings.embed_model = embed_model
@@ -249,49 +468,48 @@ def main():
         gcs_output_path=GCS_OUTPUT_PATH,
     )
 
-    # Download data from specified bucket and parse
-    local_data_path = os.path.join("/tmp", BUCKET_PREFIX)
-    os.makedirs(local_data_path, exist_ok=True)
     blobs = create_pdf_blob_list(INPUT_BUCKET_NAME, BUCKET_PREFIX)
-    logger.info("downloading data")
-    download_bucket_with_transfer_manager(
-        INPUT_BUCKET_NAME, prefix=BUCKET_PREFIX, destination_directory=local_data_path
-    )
 
-    # Parse documents using Document AI
-    try:
-        parsed_docs, raw_results = parser.batch_parse(
-            blobs, chunk_size=CHUNK_SIZE, include_ancestor_headings=True
-        )
-        print(f"Number of documents parsed by Document AI: {len(parsed_docs)}")
-        if parsed_docs:
-            print(
-                f"First parsed document text (first 100 chars): {parsed_docs[0].text[:100]}..."  # noqa: E501
+    # Only files which are new or changed since the last run are indexed
+    stale_ids = {"docstore_ids": []}
+    manifest = load_index_manifest() if INDEX_MANIFEST_DIR else None
+    if manifest:
+        diff = manifest.diff(blobs)
+        print(diff.report())
+        stale_ids = manifest.get_ids(diff.to_delete)
+        delete_stale_nodes(stale_ids, docstore, vector_store)
+        manifest.remove(diff.to_delete)
+        blobs_to_index = set(diff.to_index)
+        blobs = [blob for blob in blobs if blob.path in blobs_to_index]
+
+    if not blobs:
+        result = IngestionResult()
+    elif PIPELINED_INGESTION:
+        result = asyncio.run(
+            run_pipelined_ingestion(
+                parser, blobs, docstore, vector_store, embed_model, llm
             )
-        else:
-            print("No documents were parsed by Document AI.")
-
-        # Print raw results for debugging
-        print("Raw results:")
-        for result in raw_results:
-            print(f"  Source: {result.source_path}")
-            print(f"  Parsed: {result.parsed_path}")
-    except Exception as e:
-        print(f"Error processing single document: {str(e)}")
-        parsed_docs = []
-        raw_results = []
-
-    # Turn each parsed document into a llamaindex Document
-    li_docs = [Document(text=doc.text, metadata=doc.metadata) for doc in parsed_docs]
-
-    if QA_INDEX_NAME or QA_ENDPOINT_NAME:
-        create_qa_index(li_docs, docstore, embed_model, llm)
+        )
+    else:
+        result = run_ingestion(parser, blobs, docstore, vector_store, embed_model, llm)
+
+    if manifest:
+        failed_sources = manifest.record(
+            blobs,
+            result.documents,
+            result.docstore_nodes,
+            result.vector_nodes,
+            result.qa_vector_nodes,
+        )
+        for source in failed_sources:
+            print(f"  ! {source} produced no documents, retrying on the next run")
+        persist_index_manifest(manifest)
 
-    if INDEXING_METHOD == "hierarchical":
-        create_hierarchical_index(li_docs, docstore, vector_store, embed_model, llm)
+    if BM25_INDEX_DIR:
+        update_bm25_index(result.docstore_nodes, stale_ids["docstore_ids"])
 
-    elif INDEXING_METHOD == "flat":
-        create_flat_index(li_docs, docstore, vector_store, embed_model, llm)
+    if EMBEDDING_CACHE_DIR:
+        print(f"Embedding cache: {embed_model.stats()}")
 
 
 if __name__ == "__main__":
@@ -1,8 +1,14 @@
 """Extensions to Llamaindex Base classes to allow for asynchronous execution"""
 
-from collections.abc import Sequence
+import asyncio
+from collections.abc import MutableMapping, Sequence
+from contextlib import AbstractContextManager
+import dataclasses
+import hashlib
 import logging
+import threading
 
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.base.response.schema import RESPONSE_TYPE
 from llama_index.core.callbacks import CallbackManager
 from llama_index.core.indices.query.query_transform.base import BaseQueryTransform
@@ -141,6 +147,10 @@ class AsyncHyDEQueryTransform(BaseQueryTransform):
         llm: LLMPredictorType | None = None,
         hyde_prompt: BasePromptTemplate | None = None,
         include_original: bool = True,
+        embed_model: BaseEmbedding | None = None,
+        num_hypothetical_docs: int = 1,
+        cache: MutableMapping | None = None,
+        cache_lock: AbstractContextManager | None = None,
     ) -> None:
         """Initialize HyDEQueryTransform.
 
@@ -150,12 +160,26 @@ class AsyncHyDEQueryTransform(BaseQueryTransform):
             hyde_prompt (Optional[BasePromptTemplate]): Custom prompt for HyDE
             include_original (bool): Whether to include original query
                 string as one of the embedding strings
+            embed_model (Optional[BaseEmbedding]): If set, the averaged query
+                embedding is computed here and memoized with the
+                hypothetical documents, so retrievers do not re-embed them
+            num_hypothetical_docs (int): Number of hypothetical documents
+                generated concurrently per query
+            cache (Optional[MutableMapping]): Bounded mapping (e.g. an
+                LRUCache) memoizing transformed queries per (query, prompt,
+                llm), shared across requests and query engines
+            cache_lock (Optional[AbstractContextManager]): Lock guarding
+                cache, pass the same lock wherever the cache is shared
         """
         super().__init__()
 
         self._llm = llm or Settings.llm
         self._hyde_prompt = hyde_prompt or DEFAULT_HYDE_PROMPT
         self._include_original = include_original
+        self._embed_model = embed_model
+        self._num_hypothetical_docs = num_hypothetical_docs
+        self._cache = cache if cache is not None else {}
+        self._cache_lock = cache_lock or threading.Lock()
 
     def _get_prompts(self) -> PromptDictType:
         """Get prompts."""
@@ -166,33 +190,134 @@ class AsyncHyDEQueryTransform(BaseQueryTransform):
         if "hyde_prompt" in prompts:
             self._hyde_prompt = prompts["hyde_prompt"]
 
-    def _run(self, query_bundle: QueryBundle, metadata: dict) -> QueryBundle:
-        """Run query transform."""
-        # TODO: support generating multiple hypothetical docs
-        query_str = query_bundle.query_str
-        hypothetical_doc = self._llm.predict(self._hyde_prompt, context_str=query_str)
-        embedding_strs = [hypothetical_doc]
+    def _cache_key(self, query_bundle: QueryBundle) -> tuple:
+        prompt_hash = hashlib.sha256(
+            self._hyde_prompt.get_template().encode()
+        ).hexdigest()
+        return (
+            query_bundle.query_str,
+            tuple(query_bundle.embedding_strs),
+            prompt_hash,
+            type(self._llm).__name__,
+            self._llm.metadata.model_name,
+            getattr(self._llm, "model", None),
+            getattr(self._llm, "temperature", None),
+            self._include_original,
+            self._num_hypothetical_docs,
+            self._embed_model.model_name if self._embed_model else None,
+        )
+
+    def _get_cached(self, cache_key: tuple) -> QueryBundle | None:
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+        return self._copy_query_bundle(cached) if cached is not None else None
+
+    def _put_cached(self, cache_key: tuple, query_bundle: QueryBundle) -> QueryBundle:
+        with self._cache_lock:
+            self._cache[cache_key] = query_bundle
+        return self._copy_query_bundle(query_bundle)
+
+    @staticmethod
+    def _copy_query_bundle(query_bundle: QueryBundle) -> QueryBundle:
+        """Callers get their own copy, cached bundles are shared"""
+        return dataclasses.replace(
+            query_bundle,
+            custom_embedding_strs=list(query_bundle.custom_embedding_strs or []),
+            embedding=(
+                list(query_bundle.embedding)
+                if query_bundle.embedding is not None
+                else None
+            ),
+        )
+
+    def _to_query_bundle(
+        self,
+        query_bundle: QueryBundle,
+        hypothetical_docs: list[str],
+        doc_embeddings: list[list[float]] | None = None,
+        original_embeddings: list[list[float]] | None = None,
+    ) -> QueryBundle:
+        embedding_strs = list(hypothetical_docs)
+        embeddings = list(doc_embeddings or [])
         if self._include_original:
             embedding_strs.extend(query_bundle.embedding_strs)
+            embeddings.extend(original_embeddings or [])
         return QueryBundle(
-            query_str=query_str,
+            query_str=query_bundle.query_str,
             custom_embedding_strs=embedding_strs,
+            # Same aggregation the retrievers apply to embedding_strs
+            embedding=(
+                [sum(values) / len(embeddings) for values in zip(*embeddings)]
+                if doc_embeddings is not None
+                else None
+            ),
+        )
+
+    def _run(self, query_bundle: QueryBundle, metadata: dict) -> QueryBundle:
+        """Run query transform."""
+        cache_key = self._cache_key(query_bundle)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+
+        query_str = query_bundle.query_str
+        hypothetical_docs = [
+            self._llm.predict(self._hyde_prompt, context_str=query_str)
+            for _ in range(self._num_hypothetical_docs)
+        ]
+        doc_embeddings = original_embeddings = None
+        if self._embed_model:
+            # Hypothetical docs are embedded as documents, as in HyDE
+            doc_embeddings = self._embed_model.get_text_embedding_batch(
+                hypothetical_docs
+            )
+            if self._include_original:
+                original_embeddings = [
+                    self._embed_model.get_query_embedding(s)
+                    for s in query_bundle.embedding_strs
+                ]
+        transformed = self._to_query_bundle(
+            query_bundle, hypothetical_docs, doc_embeddings, original_embeddings
         )
+        return self._put_cached(cache_key, transformed)
 
-    async def _arun(self, query_bundle: QueryBundle) -> QueryBundle:
+    async def _arun(
+        self, query_bundle: QueryBundle, metadata: dict | None = None
+    ) -> QueryBundle:
         """Run query transform."""
-        # TODO: support generating multiple hypothetical docs
+        cache_key = self._cache_key(query_bundle)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+
         query_str = query_bundle.query_str
-        hypothetical_doc = await self._llm.apredict(
-            self._hyde_prompt, context_str=query_str
+        hypothetical_docs = await asyncio.gather(
+            *[
+                self._llm.apredict(self._hyde_prompt, context_str=query_str)
+                for _ in range(self._num_hypothetical_docs)
+            ]
         )
-        embedding_strs = [hypothetical_doc]
-        if self._include_original:
-            embedding_strs.extend(query_bundle.embedding_strs)
-        return QueryBundle(
-            query_str=query_str,
-            custom_embedding_strs=embedding_strs,
+        doc_embeddings = original_embeddings = None
+        if self._embed_model:
+            # Hypothetical docs are embedded as documents in one batched
+            # call, as in HyDE, concurrently with the original query
+            doc_embeddings, original_embeddings = await asyncio.gather(
+                self._embed_model.aget_text_embedding_batch(hypothetical_docs),
+                asyncio.gather(
+                    *[
+                        self._embed_model.aget_query_embedding(s)
+                        for s in (
+                            query_bundle.embedding_strs
+                            if self._include_original
+                            else []
+                        )
+                    ]
+                ),
+            )
+        transformed = self._to_query_bundle(
+            query_bundle, hypothetical_docs, doc_embeddings, original_embeddings
         )
+        return self._put_cached(cache_key, transformed)
 
 
 class AsyncRetrieverQueryEngine(RetrieverQueryEngine):
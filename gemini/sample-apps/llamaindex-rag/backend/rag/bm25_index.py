@@ -0,0 +1,258 @@
+"""Persistent BM25 index and retriever for hybrid retrieval"""
+
+import asyncio
+from collections import Counter
+import json
+import logging
+import os
+import re
+
+import Stemmer
+from bm25s.stopwords import STOPWORDS_EN
+from llama_index.core import QueryBundle
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore
+from llama_index.core.storage.docstore import BaseDocumentStore
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)  # Set the desired logging level
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+FORMAT_VERSION = 1
+
+
+class BM25Index:
+    """
+    Inverted BM25 index over docstore nodes.
+
+    Postings are stored term-major (CSR layout): the postings of term t are
+    postings_docs[term_offsets[t]:term_offsets[t + 1]] together with their
+    term frequencies in postings_tfs. The arrays are saved as .npy files and
+    memory-mapped on load, so a query only touches the postings of its own
+    terms instead of re-tokenizing the whole docstore.
+
+    Nodes can be added or deleted incrementally. Changes are buffered and
+    merged into the postings arrays on the next search or persist,
+    reusing the already tokenized postings of unchanged nodes.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, language: str = "english"):
+        self.k1 = k1
+        self.b = b
+        self.language = language
+        self._stemmer = Stemmer.Stemmer(language)
+        self._stopwords = set(STOPWORDS_EN)
+        self.vocab: dict[str, int] = {}
+        self.node_ids: list[str] = []
+        self.term_offsets = np.zeros(1, dtype=np.int64)
+        self.postings_docs = np.zeros(0, dtype=np.int32)
+        self.postings_tfs = np.zeros(0, dtype=np.float32)
+        self.doc_lengths = np.zeros(0, dtype=np.int32)
+        # Pending changes, merged by _compact()
+        self._added: dict[str, tuple[Counter, int]] = {}
+        self._deleted: set[str] = set()
+
+    def __len__(self) -> int:
+        self._compact()
+        return len(self.node_ids)
+
+    def tokenize(self, text: str) -> list[str]:
+        """Lowercase, split, drop stopwords and stem"""
+        tokens = [
+            t for t in TOKEN_PATTERN.findall(text.lower()) if t not in self._stopwords
+        ]
+        return self._stemmer.stemWords(tokens)
+
+    def add_nodes(self, nodes: list[BaseNode]) -> None:
+        """Add nodes, replacing any node already indexed under the same id"""
+        for node in nodes:
+            tokens = self.tokenize(node.get_content())
+            self._deleted.add(node.node_id)
+            self._added[node.node_id] = (Counter(tokens), len(tokens))
+
+    def delete(self, node_ids: list[str]) -> None:
+        """Remove nodes from the index"""
+        for node_id in node_ids:
+            self._added.pop(node_id, None)
+            self._deleted.add(node_id)
+
+    def _compact(self) -> None:
+        """Merge pending additions and deletions into the postings arrays"""
+        if not self._added and not self._deleted:
+            return
+
+        num_terms = len(self.term_offsets) - 1
+        term_ids = np.repeat(
+            np.arange(num_terms, dtype=np.int64), np.diff(self.term_offsets)
+        )
+        docs = np.asarray(self.postings_docs, dtype=np.int64)
+        tfs = np.asarray(self.postings_tfs, dtype=np.float32)
+        keep = np.array(
+            [node_id not in self._deleted for node_id in self.node_ids], dtype=bool
+        )
+
+        # Renumber surviving docs, then append the new ones after them
+        new_doc_idx = np.cumsum(keep) - 1
+        posting_mask = keep[docs]
+        term_ids = term_ids[posting_mask]
+        docs = new_doc_idx[docs[posting_mask]]
+        tfs = tfs[posting_mask]
+        node_ids = [n for n, k in zip(self.node_ids, keep) if k]
+        doc_lengths = [np.asarray(self.doc_lengths)[keep]]
+
+        added_terms, added_docs, added_tfs, added_lengths = [], [], [], []
+        for node_id, (counts, length) in self._added.items():
+            doc_idx = len(node_ids)
+            node_ids.append(node_id)
+            added_lengths.append(length)
+            for term, tf in counts.items():
+                added_terms.append(self.vocab.setdefault(term, len(self.vocab)))
+                added_docs.append(doc_idx)
+                added_tfs.append(tf)
+        doc_lengths.append(np.asarray(added_lengths, dtype=np.int32))
+
+        term_ids = np.concatenate([term_ids, np.asarray(added_terms, dtype=np.int64)])
+        docs = np.concatenate([docs, np.asarray(added_docs, dtype=np.int64)])
+        tfs = np.concatenate([tfs, np.asarray(added_tfs, dtype=np.float32)])
+        order = np.lexsort((docs, term_ids))
+
+        self.node_ids = node_ids
+        self.postings_docs = docs[order].astype(np.int32)
+        self.postings_tfs = tfs[order]
+        self.term_offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(term_ids, minlength=len(self.vocab)), out=self.term_offsets[1:]
+        )
+        self.doc_lengths = np.concatenate(doc_lengths).astype(np.int32)
+        self._added = {}
+        self._deleted = set()
+
+    def search(self, query: str, top_k: int) -> list[tuple[str, float]]:
+        """Return up to top_k (node_id, score) pairs ranked by BM25 score"""
+        self._compact()
+        num_docs = len(self.node_ids)
+        term_ids = {self.vocab[t] for t in self.tokenize(query) if t in self.vocab}
+        if not num_docs or not term_ids:
+            return []
+
+        avg_doc_len = float(self.doc_lengths.mean()) or 1.0
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / avg_doc_len)
+        scores = np.zeros(num_docs, dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = self.postings_docs[start:end]
+            tfs = self.postings_tfs[start:end]
+            doc_freq = end - start
+            idf = np.log(1 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + length_norm[docs])
+
+        top_k = min(top_k, num_docs)
+        top_idx = np.argpartition(-scores, top_k - 1)[:top_k]
+        top_idx = top_idx[np.argsort(-scores[top_idx])]
+        return [(self.node_ids[i], float(scores[i])) for i in top_idx if scores[i] > 0]
+
+    def persist(self, persist_dir: str) -> None:
+        """Write the index to persist_dir"""
+        self._compact()
+        os.makedirs(persist_dir, exist_ok=True)
+
+        def replace(file_name, write_fn):
+            # Files are swapped in atomically since a loaded index
+            # may still be memory-mapping the previous version
+            tmp_path = os.path.join(persist_dir, f"{file_name}.tmp")
+            with open(tmp_path, "wb") as f:
+                write_fn(f)
+            os.replace(tmp_path, os.path.join(persist_dir, file_name))
+
+        replace("term_offsets.npy", lambda f: np.save(f, self.term_offsets))
+        replace("postings_docs.npy", lambda f: np.save(f, self.postings_docs))
+        replace("postings_tfs.npy", lambda f: np.save(f, self.postings_tfs))
+        replace("doc_lengths.npy", lambda f: np.save(f, self.doc_lengths))
+        replace("vocab.json", lambda f: f.write(json.dumps(self.vocab).encode()))
+        replace("node_ids.json", lambda f: f.write(json.dumps(self.node_ids).encode()))
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "language": self.language,
+            "num_docs": len(self.node_ids),
+            "num_terms": len(self.vocab),
+        }
+        # The manifest is written last, it marks the index as complete
+        replace("manifest.json", lambda f: f.write(json.dumps(manifest).encode()))
+        logger.info(f"Persisted BM25 index with {len(self.node_ids)} nodes")
+
+    @classmethod
+    def exists(cls, persist_dir: str) -> bool:
+        """Whether a persisted index is present in persist_dir"""
+        return os.path.exists(os.path.join(persist_dir, "manifest.json"))
+
+    @classmethod
+    def load(cls, persist_dir: str, mmap: bool = True) -> "BM25Index":
+        """Load an index written by persist, memory-mapping the postings"""
+        with open(os.path.join(persist_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest["format_version"] != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported BM25 index format: {manifest['format_version']}"
+            )
+        index = cls(k1=manifest["k1"], b=manifest["b"], language=manifest["language"])
+        mmap_mode = "r" if mmap else None
+        index.term_offsets = np.load(
+            os.path.join(persist_dir, "term_offsets.npy"), mmap_mode=mmap_mode
+        )
+        index.postings_docs = np.load(
+            os.path.join(persist_dir, "postings_docs.npy"), mmap_mode=mmap_mode
+        )
+        index.postings_tfs = np.load(
+            os.path.join(persist_dir, "postings_tfs.npy"), mmap_mode=mmap_mode
+        )
+        index.doc_lengths = np.load(os.path.join(persist_dir, "doc_lengths.npy"))
+        with open(os.path.join(persist_dir, "vocab.json")) as f:
+            index.vocab = json.load(f)
+        with open(os.path.join(persist_dir, "node_ids.json")) as f:
+            index.node_ids = json.load(f)
+        return index
+
+
+class BM25IndexRetriever(BaseRetriever):
+    """Retrieves nodes by BM25 score from a prebuilt BM25Index
+    and fetches only the top scoring nodes from the docstore."""
+
+    def __init__(
+        self,
+        bm25_index: BM25Index,
+        docstore: BaseDocumentStore,
+        similarity_top_k: int = 5,
+    ) -> None:
+        self._bm25_index = bm25_index
+        self._docstore = docstore
+        self._similarity_top_k = similarity_top_k
+        super().__init__()
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        hits = self._bm25_index.search(query_bundle.query_str, self._similarity_top_k)
+        nodes = [
+            self._docstore.get_document(node_id, raise_error=False)
+            for node_id, _ in hits
+        ]
+        return [
+            NodeWithScore(node=node, score=score)
+            for node, (_, score) in zip(nodes, hits)
+            if node is not None
+        ]
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        hits = self._bm25_index.search(query_bundle.query_str, self._similarity_top_k)
+        nodes = await asyncio.gather(
+            *[
+                self._docstore.aget_document(node_id, raise_error=False)
+                for node_id, _ in hits
+            ]
+        )
+        return [
+            NodeWithScore(node=node, score=score)
+            for node, (_, score) in zip(nodes, hits)
+            if node is not None
+        ]
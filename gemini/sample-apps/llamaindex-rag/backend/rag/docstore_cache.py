@@ -0,0 +1,111 @@
+"""Batched and cached document lookups against a docstore"""
+
+import asyncio
+from collections.abc import Iterable
+import logging
+import threading
+
+from cachetools import LRUCache, TTLCache
+from llama_index.core.schema import BaseNode
+from llama_index.core.storage.docstore import BaseDocumentStore
+from llama_index.core.storage.docstore.utils import json_to_doc
+from llama_index.storage.kvstore.firestore import FirestoreKVStore
+
+logging.basicConfig(level=logging.INFO)  # Set the desired logging level
+logger = logging.getLogger(__name__)
+
+
+class CachedDocstoreReader:
+    """
+    Reads documents from a docstore by id. Requested ids are deduplicated,
+    served from an in-process cache where possible and the remaining ids
+    are fetched in a single bulk read. For Firestore docstores this is one
+    batched get_all call instead of one round trip per document.
+    """
+
+    def __init__(
+        self,
+        docstore: BaseDocumentStore,
+        max_size: int = 1024,
+        ttl_sec: float | None = None,
+    ):
+        self._docstore = docstore
+        if ttl_sec:
+            self._cache = TTLCache(maxsize=max_size, ttl=ttl_sec)
+        else:
+            self._cache = LRUCache(maxsize=max_size)
+        self._lock = threading.Lock()
+
+    @property
+    def docstore(self) -> BaseDocumentStore:
+        return self._docstore
+
+    def get_documents(
+        self, doc_ids: Iterable[str], raise_error: bool = True
+    ) -> dict[str, BaseNode]:
+        """
+        Return a mapping of doc id to document. Like
+        BaseDocumentStore.get_document, an id not found raises a ValueError,
+        unless raise_error is False in which case it is omitted.
+        """
+        docs, missing_ids = self._get_cached(doc_ids)
+        if missing_ids:
+            docs.update(self._fetch_and_cache(missing_ids, raise_error))
+        return docs
+
+    async def aget_documents(
+        self, doc_ids: Iterable[str], raise_error: bool = True
+    ) -> dict[str, BaseNode]:
+        """Async get_documents, the bulk read runs off the event loop"""
+        docs, missing_ids = self._get_cached(doc_ids)
+        if missing_ids:
+            docs.update(
+                await asyncio.to_thread(self._fetch_and_cache, missing_ids, raise_error)
+            )
+        return docs
+
+    def _get_cached(self, doc_ids: Iterable[str]) -> tuple[dict, list[str]]:
+        docs = {}
+        missing_ids = []
+        with self._lock:
+            for doc_id in dict.fromkeys(doc_ids):
+                doc = self._cache.get(doc_id)
+                if doc is None:
+                    missing_ids.append(doc_id)
+                else:
+                    docs[doc_id] = doc
+        return docs, missing_ids
+
+    def _fetch_and_cache(
+        self, doc_ids: list[str], raise_error: bool
+    ) -> dict[str, BaseNode]:
+        docs = self._bulk_get(doc_ids)
+        with self._lock:
+            self._cache.update(docs)
+        not_found = [doc_id for doc_id in doc_ids if doc_id not in docs]
+        if not_found and raise_error:
+            raise ValueError(f"doc_id {not_found[0]} not found.")
+        for doc_id in not_found:
+            logger.warning(f"Document {doc_id} not found in docstore")
+        return docs
+
+    def _bulk_get(self, doc_ids: list[str]) -> dict[str, BaseNode]:
+        kvstore = getattr(self._docstore, "_kvstore", None)
+        if not isinstance(kvstore, FirestoreKVStore):
+            docs = {
+                doc_id: self._docstore.get_document(doc_id, raise_error=False)
+                for doc_id in doc_ids
+            }
+            return {doc_id: doc for doc_id, doc in docs.items() if doc is not None}
+
+        collection = kvstore._db.collection(
+            kvstore.firestore_collection(self._docstore._node_collection)
+        )
+        snapshots = kvstore._db.get_all(
+            [collection.document(doc_id) for doc_id in doc_ids]
+        )
+        return {
+            snapshot.id: json_to_doc(kvstore.replace_field_name_get(snapshot.to_dict()))
+            for snapshot in snapshots
+            if snapshot.exists
+        }
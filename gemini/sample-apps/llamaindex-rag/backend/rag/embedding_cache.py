@@ -0,0 +1,317 @@
+"""Content-addressed on-disk cache of text embeddings"""
+
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+import numpy as np
+from pydantic import PrivateAttr
+
+logging.basicConfig(level=logging.INFO)  # Set the desired logging level
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+VECTORS_FILE_NAME = "embeddings.f32"
+KEYS_FILE_NAME = "keys.txt"
+MANIFEST_FILE_NAME = "manifest.json"
+LOCK_FILE_NAME = ".lock"
+
+
+class EmbeddingStore:
+    """
+    Append-only store of float32 vectors addressed by key.
+
+    Vectors are appended as raw float32 rows to a single file which is
+    memory-mapped for reads, and keys are appended to a text file with one
+    key per line, so row i of the matrix belongs to line i of the key file.
+    Several processes can share a store: appends hold an exclusive file lock
+    and number their rows from the size of the vectors file, and keys
+    appended by other processes are read before a lookup misses.
+    """
+
+    def __init__(self, persist_dir: str):
+        self.persist_dir = persist_dir
+        self.dim: int | None = None
+        self._rows: dict[str, int] = {}
+        self._num_rows = 0
+        self._keys_offset = 0
+        self._matrix: np.ndarray | None = None
+        self._lock = threading.Lock()
+        os.makedirs(persist_dir, exist_ok=True)
+        with self._file_lock(fcntl.LOCK_EX):
+            self._repair()
+            self._refresh()
+        if self._num_rows:
+            logger.info(
+                f"Loaded {self._num_rows} cached embeddings from {self.persist_dir}"
+            )
+
+    def __len__(self) -> int:
+        return self._num_rows
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    @property
+    def disk_bytes(self) -> int:
+        return self._num_rows * (self.dim or 0) * 4
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.persist_dir, file_name)
+
+    @contextmanager
+    def _file_lock(self, operation: int) -> Iterator[None]:
+        """Hold a shared or exclusive lock on the store across processes"""
+        with open(self._path(LOCK_FILE_NAME), "a") as f:
+            fcntl.flock(f, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_dim(self) -> None:
+        if self.dim is not None or not os.path.exists(self._path(MANIFEST_FILE_NAME)):
+            return
+        with open(self._path(MANIFEST_FILE_NAME)) as f:
+            manifest = json.load(f)
+        if manifest["format_version"] != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported embedding cache format: {manifest['format_version']}"
+            )
+        self.dim = manifest["dim"]
+
+    def _repair(self) -> None:
+        """
+        Drop the partial row or the keys without a vector left by an
+        interrupted write. Must hold the exclusive file lock.
+        """
+        self._read_dim()
+        if self.dim is None:
+            return
+        with open(self._path(KEYS_FILE_NAME), "a+") as f:
+            f.seek(0)
+            keys = f.read().splitlines()
+        vectors_path = self._path(VECTORS_FILE_NAME)
+        vectors_size = (
+            os.path.getsize(vectors_path) if os.path.exists(vectors_path) else 0
+        )
+        num_rows = min(len(keys), vectors_size // (self.dim * 4))
+        if num_rows != len(keys) or num_rows * self.dim * 4 != vectors_size:
+            logger.warning(f"Truncating embedding cache to {num_rows} complete rows")
+            with open(vectors_path, "ab") as f:
+                f.truncate(num_rows * self.dim * 4)
+            with open(self._path(KEYS_FILE_NAME), "w") as f:
+                f.writelines(f"{key}\n" for key in keys[:num_rows])
+            # Keys read before the repair may have lost their row
+            self._rows = {}
+            self._num_rows = 0
+            self._keys_offset = 0
+            self._matrix = None
+
+    def _refresh(self) -> None:
+        """
+        Read the keys appended since the last refresh, by this or another
+        process. Must hold a file lock.
+        """
+        self._read_dim()
+        if self.dim is None or not os.path.exists(self._path(KEYS_FILE_NAME)):
+            return
+        with open(self._path(KEYS_FILE_NAME), "rb") as f:
+            f.seek(self._keys_offset)
+            appended = f.read()
+        # Vectors are written before keys, so a complete key line
+        # always has its row
+        appended = appended[: appended.rfind(b"\n") + 1]
+        self._keys_offset += len(appended)
+        for key in appended.decode().splitlines():
+            self._rows[key] = self._num_rows
+            self._num_rows += 1
+
+    def _get_matrix(self) -> np.ndarray:
+        """Memory-map the vectors file, remapping it after appends"""
+        if self._matrix is None or len(self._matrix) < self._num_rows:
+            self._matrix = np.memmap(
+                self._path(VECTORS_FILE_NAME),
+                dtype=np.float32,
+                mode="r",
+                shape=(self._num_rows, self.dim),
+            )
+        return self._matrix
+
+    def get(self, keys: Iterable[str]) -> dict[str, list[float]]:
+        """Return the cached vectors of keys, omitting keys not cached"""
+        keys = list(keys)
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                with self._file_lock(fcntl.LOCK_SH):
+                    self._refresh()
+            rows = {key: self._rows[key] for key in keys if key in self._rows}
+            if not rows:
+                return {}
+            matrix = self._get_matrix()
+            return {key: matrix[row].tolist() for key, row in rows.items()}
+
+    def add(self, vectors: dict[str, list[float]]) -> None:
+        """Append vectors for keys which are not cached yet"""
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._repair()
+            self._refresh()
+            vectors = {k: v for k, v in vectors.items() if k not in self._rows}
+            if not vectors:
+                return
+            matrix = np.asarray(list(vectors.values()), dtype=np.float32)
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                with open(self._path(MANIFEST_FILE_NAME), "w") as f:
+                    json.dump({"format_version": FORMAT_VERSION, "dim": self.dim}, f)
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match "
+                    f"the cache dimension {self.dim}"
+                )
+            # Vectors are written before keys, a key is only
+            # trusted once its row is complete
+            with open(self._path(VECTORS_FILE_NAME), "ab") as f:
+                first_row = f.tell() // (self.dim * 4)
+                f.write(matrix.tobytes())
+            with open(self._path(KEYS_FILE_NAME), "a") as f:
+                f.writelines(f"{key}\n" for key in vectors)
+            self._rows.update({key: first_row + i for i, key in enumerate(vectors)})
+            self._num_rows = first_row + len(vectors)
+            self._keys_offset = os.path.getsize(self._path(KEYS_FILE_NAME))
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps an embedding model and stores every embedding it computes in an
+    EmbeddingStore keyed by the model name, the task type (query or
+    document embedding under the model's embed mode) and a hash of the
+    text. Identical text is only embedded once, across ingestion reruns
+    and repeated queries. Each model gets its own store under persist_dir.
+
+    Only the misses of a batch are sent to the wrapped model, in a single
+    batch, and duplicate texts within a batch are embedded once.
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _store: EmbeddingStore = PrivateAttr()
+    _stats_lock: Any = PrivateAttr()
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+    _bytes_saved: int = PrivateAttr(default=0)
+
+    def __init__(self, embed_model: BaseEmbedding, persist_dir: str, **kwargs: Any):
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            num_workers=embed_model.num_workers,
+            **kwargs,
+        )
+        self._embed_model = embed_model
+        self._store = EmbeddingStore(
+            os.path.join(persist_dir, re.sub(r"[^\w.-]", "_", embed_model.model_name))
+        )
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    def cache_key(self, text: str, task_type: str) -> str:
+        embed_mode = getattr(self._embed_model, "embed_mode", None)
+        mode = getattr(embed_mode, "value", embed_mode)
+        return hashlib.sha256(
+            "\0".join([self.model_name, f"{mode}:{task_type}", text]).encode()
+        ).hexdigest()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the bytes of text not re-embedded"""
+        with self._stats_lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._store),
+                "disk_bytes": self._store.disk_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "bytes_saved": self._bytes_saved,
+            }
+
+    def _lookup(
+        self, texts: list[str], task_type: str
+    ) -> tuple[list[str], dict[str, list[float]], dict[str, str]]:
+        """Return the keys of texts, their cached embeddings and the
+        deduplicated texts to embed by key"""
+        keys = [self.cache_key(text, task_type) for text in texts]
+        cached = self._store.get(keys)
+        missing = {}
+        with self._stats_lock:
+            for key, text in zip(keys, texts):
+                # Repeats within the batch are embedded once
+                if key in cached or key in missing:
+                    self._hits += 1
+                    self._bytes_saved += len(text.encode())
+                else:
+                    self._misses += 1
+                    missing.setdefault(key, text)
+        return keys, cached, missing
+
+    def _update(
+        self,
+        keys: list[str],
+        cached: dict[str, list[float]],
+        missing_keys: list[str],
+        embeddings: list[Embedding],
+    ) -> list[Embedding]:
+        computed = dict(zip(missing_keys, embeddings))
+        self._store.add(computed)
+        cached.update(computed)
+        return [cached[key] for key in keys]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        keys, cached, missing = self._lookup([query], "query")
+        embeddings = [self._embed_model._get_query_embedding(query)] if missing else []
+        return self._update(keys, cached, list(missing), embeddings)[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        keys, cached, missing = self._lookup([query], "query")
+        embeddings = (
+            [await self._embed_model._aget_query_embedding(query)] if missing else []
+        )
+        return self._update(keys, cached, list(missing), embeddings)[0]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        keys, cached, missing = self._lookup(texts, "document")
+        embeddings = (
+            self._embed_model._get_text_embeddings(list(missing.values()))
+            if missing
+            else []
+        )
+        return self._update(keys, cached, list(missing), embeddings)
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        keys, cached, missing = self._lookup(texts, "document")
+        embeddings = (
+            await self._embed_model._aget_text_embeddings(list(missing.values()))
+            if missing
+            else []
+        )
+        return self._update(keys, cached, list(missing), embeddings)
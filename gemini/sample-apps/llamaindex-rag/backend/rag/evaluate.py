@@ -3,7 +3,9 @@
 import asyncio
 from collections.abc import Callable
 import logging
+import os
 import re
+import time
 
 from backend.rag.claude_vertex import ClaudeVertexLLM
 from google.cloud import bigquery
@@ -21,10 +23,29 @@ logging.basicConfig(level=logging.INFO)  # Set the desired logging level
 logger = logging.getLogger(__name__)
 
 
+class AsyncRateLimiter:
+    """Spaces out acquisitions so at most requests_per_minute
+    calls start per minute"""
+
+    def __init__(self, requests_per_minute: float):
+        self._interval = 60.0 / requests_per_minute
+        self._next_time = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_time - now
+            self._next_time = max(now, self._next_time) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
 class LLMEvaluator:
     """
     LLMEvaluator.evaluate
     LLMEvaluator.async_eval_retrieval
+    LLMEvaluator.async_eval_row
     LLMEvaluator.extract_score
     LLMEvaluator.async_eval_question_answer_pair
     LLMEvaluator.async_eval_answer
@@ -36,10 +57,23 @@ class LLMEvaluator:
         user_prompt: str,
         eval_model_name: str,
         temperature: float,
+        max_concurrency: int = 8,
+        requests_per_minute: float | None = None,
+        max_retries: int = 3,
+        retry_backoff_sec: float = 2.0,
+        checkpoint_path: str | None = None,
+        checkpoint_every: int = 10,
     ):
         self.system_prompt = system_prompt
         self.user_prompt = user_prompt
         self.eval_model_name = eval_model_name
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.retry_backoff_sec = retry_backoff_sec
+        # Completed rows are written here so an interrupted run can resume
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
 
         if "gemini" in self.eval_model_name:
             self.eval_model = GenerativeModel(
@@ -133,34 +167,150 @@ class LLMEvaluator:
         else:
             return 0  # Return None if no number is found
 
+    async def async_eval_row(
+        self,
+        retrieval_qa_func: Callable,
+        question: str,
+        ground_truth: str,
+        semaphore: asyncio.Semaphore,
+        rate_limiter: AsyncRateLimiter | None,
+    ) -> tuple:
+        """
+        LLMEvaluator.async_eval_row
+        """
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                if rate_limiter:
+                    await rate_limiter.acquire()
+                try:
+                    return await self.async_eval_question_answer_pair(
+                        retrieval_qa_func, self.eval_model, question, ground_truth
+                    )
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        raise
+                    backoff = self.retry_backoff_sec * 2**attempt
+                    logger.warning(
+                        f"Evaluating question failed ({e}), "
+                        f"retrying in {backoff:.1f}s: {question}"
+                    )
+                    await asyncio.sleep(backoff)
+
+    def load_checkpoint(self) -> dict:
+        """
+        LLMEvaluator.load_checkpoint
+        """
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        checkpoint_df = pd.read_parquet(self.checkpoint_path)
+        logger.info(
+            f"Resuming from {len(checkpoint_df)} checkpointed rows "
+            f"in {self.checkpoint_path}"
+        )
+        return {
+            row.pop("row_idx"): row for row in checkpoint_df.to_dict(orient="records")
+        }
+
+    def write_checkpoint(self, done: dict) -> None:
+        """
+        LLMEvaluator.write_checkpoint
+        """
+        if not self.checkpoint_path:
+            return
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        checkpoint_df = pd.DataFrame(
+            [{"row_idx": idx} | row for idx, row in done.items()]
+        )
+        # Written to a temporary file first so a crash never
+        # leaves a truncated checkpoint behind
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        checkpoint_df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.checkpoint_path)
+
     async def async_eval_retrieval(
-        self, retrieval_qa_func: Callable, eval_df: pd.DataFrame
+        self,
+        retrieval_qa_func: Callable,
+        eval_df: pd.DataFrame,
+        progress_callback: Callable[[int, int], None] | None = None,
     ) -> pd.DataFrame:
         """
         LLMEvaluator.async_eval_retrieval
+
+        Rows are evaluated with at most max_concurrency in flight, each
+        retried with exponential backoff. Rows which still fail are
+        returned with their error in the "error" column.
         """
-        results = await asyncio.gather(
-            *[
-                self.async_eval_question_answer_pair(
-                    retrieval_qa_func, self.eval_model, x["question"], x["ground_truth"]
+        done = self.load_checkpoint()
+        errors = {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        rate_limiter = (
+            AsyncRateLimiter(self.requests_per_minute)
+            if self.requests_per_minute
+            else None
+        )
+
+        async def eval_row(idx, question, ground_truth):
+            try:
+                answer, eval_result, retrieved_context = await self.async_eval_row(
+                    retrieval_qa_func, question, ground_truth, semaphore, rate_limiter
                 )
-                for idx, x in eval_df[["question", "ground_truth"]].iterrows()
-            ]
+            except Exception as e:
+                logger.error(f"Evaluating question failed: {question}: {e}")
+                errors[idx] = str(e)
+                return False
+            done[idx] = {
+                "answer": answer,
+                "retrieved_context": retrieved_context,
+                "eval_result": eval_result,
+            }
+            return True
+
+        pending = [
+            eval_row(idx, x["question"], x["ground_truth"])
+            for idx, x in eval_df[["question", "ground_truth"]].iterrows()
+            if idx not in done
+        ]
+        num_since_checkpoint = 0
+        for next_row in asyncio.as_completed(pending):
+            if await next_row:
+                num_since_checkpoint += 1
+            if num_since_checkpoint >= self.checkpoint_every:
+                self.write_checkpoint(done)
+                num_since_checkpoint = 0
+            if progress_callback:
+                progress_callback(len(done) + len(errors), len(eval_df))
+        if num_since_checkpoint:
+            self.write_checkpoint(done)
+
+        results = [done.get(idx, {}) for idx in eval_df.index]
+        eval_df["answer"] = [r.get("answer") for r in results]
+        eval_df["retrieved_context"] = [
+            (
+                list(r["retrieved_context"])
+                if r.get("retrieved_context") is not None
+                else None
+            )
+            for r in results
+        ]
+        eval_df["eval_result"] = [r.get("eval_result") for r in results]
+        eval_df["score"] = eval_df["eval_result"].apply(
+            lambda x: self.extract_score(x) if isinstance(x, str) and x else 0
         )
-        answers, eval_result, retrieved_context = list(zip(*results))
-        eval_df["answer"] = answers
-        eval_df["retrieved_context"] = retrieved_context
-        eval_df["eval_result"] = eval_result
-        eval_df["score"] = eval_df["eval_result"].apply(lambda x: self.extract_score(x))
+        eval_df["error"] = [errors.get(idx) for idx in eval_df.index]
         return eval_df
 
     def evaluate(
-        self, retrieval_qa_func: Callable, eval_df: pd.DataFrame
+        self,
+        retrieval_qa_func: Callable,
+        eval_df: pd.DataFrame,
+        progress_callback: Callable[[int, int], None] | None = None,
     ) -> pd.DataFrame:
         """
         LLMEvaluator.evaluate
         """
-        eval_df = asyncio.run(self.async_eval_retrieval(retrieval_qa_func, eval_df))
+        eval_df = asyncio.run(
+            self.async_eval_retrieval(retrieval_qa_func, eval_df, progress_callback)
+        )
         return eval_df
 
 
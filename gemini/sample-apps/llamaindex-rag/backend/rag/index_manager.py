@@ -2,6 +2,9 @@
 experimentation UI"""
 
 import logging
+import os
+import threading
+import time
 
 import Stemmer
 from backend.rag.async_extensions import (
@@ -9,11 +12,17 @@ from backend.rag.async_extensions import (
     AsyncRetrieverQueryEngine,
     AsyncTransformQueryEngine,
 )
+from backend.rag.bm25_index import BM25Index, BM25IndexRetriever
 from backend.rag.claude_vertex import ClaudeVertexLLM
+from backend.rag.docstore_cache import CachedDocstoreReader
+from backend.rag.embedding_cache import CachedEmbedding
 from backend.rag.node_reranker import CustomLLMRerank
 from backend.rag.parent_retriever import ParentRetriever
 from backend.rag.prompts import Prompts
 from backend.rag.qa_followup_retriever import QAFollowupRetriever, QARetriever
+from backend.rag.query_engine_cache import QueryEngineCache
+from cachetools import LRUCache
+from common.utils import sync_directory_from_gcs
 from google.cloud import aiplatform
 from llama_index.core import (
     PromptTemplate,
@@ -23,6 +32,7 @@ from llama_index.core import (
     get_response_synthesizer,
 )
 from llama_index.core.agent import ReActAgent
+from llama_index.core.query_engine import BaseQueryEngine
 from llama_index.core.retrievers import AutoMergingRetriever, QueryFusionRetriever
 from llama_index.core.tools import QueryEngineTool, ToolMetadata
 from llama_index.embeddings.vertex import VertexTextEmbedding
@@ -45,6 +55,7 @@ class IndexManager:
     This includes:
     - Switching out vector indices or docstores
     - Changing retrieval parameters (e.g. temperature, llm model, etc.)
+    - Caching query engines per retrieval configuration
     """
 
     def __init__(
@@ -59,6 +70,16 @@ class IndexManager:
         firestore_db_name: str | None,
         firestore_namespace: str | None,
         vs_bucket_name: str,
+        query_engine_cache_size: int = 32,
+        bm25_index_dir: str | None = None,
+        vector_data_prefix: str | None = None,
+        docstore_cache_size: int = 1024,
+        docstore_cache_ttl_sec: float | None = 600,
+        rerank_score_cache_size: int = 4096,
+        hyde_cache_size: int = 1024,
+        hyde_num_hypothetical_docs: int = 1,
+        embedding_cache_dir: str | None = None,
+        bm25_refresh_interval_sec: float = 300,
     ):
         self.project_id = project_id
         self.location = location
@@ -70,11 +91,33 @@ class IndexManager:
         self.firestore_db_name = firestore_db_name
         self.firestore_namespace = firestore_namespace
         self.vs_bucket_name = vs_bucket_name
+        self.query_engine_cache = QueryEngineCache(max_size=query_engine_cache_size)
+        self._prompts_version = None
+        self.bm25_index_dir = bm25_index_dir
+        self.vector_data_prefix = vector_data_prefix
+        self.bm25_refresh_interval_sec = bm25_refresh_interval_sec
+        self._bm25_index = None
+        self._bm25_version: int | None = None
+        self._bm25_synced_at: float | None = None
+        self.docstore_cache_size = docstore_cache_size
+        self.docstore_cache_ttl_sec = docstore_cache_ttl_sec
+        # (model, temperature, query, node_id) -> LLM relevance, shared by
+        # all rerankers on the app's and the batch evaluations' threads
+        self.rerank_score_cache = LRUCache(maxsize=rerank_score_cache_size)
+        self.rerank_score_cache_lock = threading.Lock()
+        # Memoized HyDE transforms, keyed by query, prompt and llm
+        self.hyde_cache = LRUCache(maxsize=hyde_cache_size)
+        self.hyde_cache_lock = threading.Lock()
+        self.hyde_num_hypothetical_docs = hyde_num_hypothetical_docs
         self.embed_model = VertexTextEmbedding(
             model_name=self.embeddings_model_name,
             project=self.project_id,
             location=self.location,
         )
+        if embedding_cache_dir:
+            self.embed_model = CachedEmbedding(
+                self.embed_model, persist_dir=embedding_cache_dir
+            )
         self.base_index = self.get_vector_index(
             index_name=self.base_index_name,
             endpoint_name=self.base_endpoint_name,
@@ -90,6 +133,11 @@ class IndexManager:
             )
         else:
             self.qa_index = None
+        # Shared across query engines so parent documents stay cached
+        self.base_docstore_reader = self.get_docstore_reader(self.base_index)
+        self.qa_docstore_reader = (
+            self.get_docstore_reader(self.qa_index) if self.qa_index else None
+        )
 
     def get_current_index_info(self) -> dict:
         """Return the indices currently being used"""
@@ -155,6 +203,78 @@ class IndexManager:
             )
         else:
             self.qa_index = None
+        # Shared across query engines so parent documents stay cached
+        self.base_docstore_reader = self.get_docstore_reader(self.base_index)
+        self.qa_docstore_reader = (
+            self.get_docstore_reader(self.qa_index) if self.qa_index else None
+        )
+        # Cached engines hold retrievers bound to the previous indexes
+        self._bm25_index = None
+        self._bm25_version = None
+        self._bm25_synced_at = None
+        with self.rerank_score_cache_lock:
+            self.rerank_score_cache.clear()
+        self.query_engine_cache.invalidate()
+
+    def get_query_engine_cache_info(self) -> dict:
+        """Return hit/miss counters of the query engine cache"""
+        return self.query_engine_cache.stats()
+
+    def get_embedding_cache_info(self) -> dict:
+        """Return hit/miss counters of the embedding cache, if enabled"""
+        if isinstance(self.embed_model, CachedEmbedding):
+            return self.embed_model.stats()
+        return {}
+
+    def get_docstore_reader(self, index: VectorStoreIndex) -> CachedDocstoreReader:
+        """Return a batched, cached reader over the docstore of index"""
+        return CachedDocstoreReader(
+            index.docstore,
+            max_size=self.docstore_cache_size,
+            ttl_sec=self.docstore_cache_ttl_sec,
+        )
+
+    def get_bm25_index(self) -> BM25Index | None:
+        """
+        Lazily loads the BM25 index persisted by the indexing job for the
+        current docstore namespace. The local copy is synced with the one in
+        GCS on first use and then at most every bm25_refresh_interval_sec, and
+        reloaded when it changed, so nodes added or deleted by later indexing
+        runs are picked up. Returns None if no persisted index exists.
+        """
+        if not (self.bm25_index_dir and self.firestore_namespace):
+            return None
+        now = time.monotonic()
+        if (
+            self._bm25_synced_at is not None
+            and now - self._bm25_synced_at < self.bm25_refresh_interval_sec
+        ):
+            return self._bm25_index
+
+        first_sync = self._bm25_synced_at is None
+        self._bm25_synced_at = now
+        persist_dir = os.path.join(self.bm25_index_dir, self.firestore_namespace)
+        if self.vector_data_prefix:
+            sync_directory_from_gcs(
+                self.vs_bucket_name,
+                f"{self.vector_data_prefix}/bm25/{self.firestore_namespace}",
+                persist_dir,
+            )
+        if not BM25Index.exists(persist_dir):
+            logger.info(f"No persisted BM25 index found in {persist_dir}")
+            return None
+        # The manifest is replaced last by both persist and the GCS sync
+        version = os.stat(os.path.join(persist_dir, "manifest.json")).st_mtime_ns
+        if version == self._bm25_version:
+            return self._bm25_index
+
+        self._bm25_index = BM25Index.load(persist_dir)
+        self._bm25_version = version
+        logger.info(f"Loaded BM25 index with {len(self._bm25_index)} nodes")
+        if not first_sync:
+            # Cached engines hold retrievers over the previous BM25 index
+            self.query_engine_cache.invalidate()
+        return self._bm25_index
 
     def get_vector_index(
         self,
@@ -221,6 +341,69 @@ class IndexManager:
         use_node_rerank: bool = False,
         qa_followup: bool = True,
         hybrid_retrieval: bool = True,
+        streaming: bool = False,
+    ) -> AsyncRetrieverQueryEngine:
+        """
+        Returns a llamaindex QueryEngine given a
+        VectorStoreIndex and hyperparameters. Engines are cached
+        per configuration, prompts version and running event loop, call
+        it from the loop the engine will be used on. Streaming engines
+        return an AsyncStreamingResponse from aquery.
+        """
+        if hybrid_retrieval:
+            # Reloads the BM25 index if a newer one was uploaded
+            self.get_bm25_index()
+        if prompts.version != self._prompts_version:
+            # Engines built from outdated prompts can never be hit again
+            self.query_engine_cache.invalidate()
+            with self.rerank_score_cache_lock:
+                self.rerank_score_cache.clear()
+            self._prompts_version = prompts.version
+
+        cache_key = (
+            llm_name,
+            temperature,
+            similarity_top_k,
+            retrieval_strategy,
+            use_hyde,
+            use_refine,
+            use_node_rerank,
+            qa_followup,
+            hybrid_retrieval,
+            streaming,
+            prompts.version,
+        )
+        query_engine = self.query_engine_cache.get_or_create(
+            cache_key,
+            lambda: self._build_query_engine(
+                prompts=prompts,
+                llm_name=llm_name,
+                temperature=temperature,
+                similarity_top_k=similarity_top_k,
+                retrieval_strategy=retrieval_strategy,
+                use_hyde=use_hyde,
+                use_refine=use_refine,
+                use_node_rerank=use_node_rerank,
+                qa_followup=qa_followup,
+                hybrid_retrieval=hybrid_retrieval,
+                streaming=streaming,
+            ),
+        )
+        return query_engine
+
+    def _build_query_engine(
+        self,
+        prompts: Prompts,
+        llm_name: str,
+        temperature: float,
+        similarity_top_k: int,
+        retrieval_strategy: str,
+        use_hyde: bool,
+        use_refine: bool,
+        use_node_rerank: bool,
+        qa_followup: bool,
+        hybrid_retrieval: bool,
+        streaming: bool = False,
     ) -> AsyncRetrieverQueryEngine:
         """
         Creates a llamaindex QueryEngine given a
@@ -242,10 +425,14 @@ class IndexManager:
                 refine_template=refine_prompt,
                 response_mode="compact",
                 use_async=True,
+                streaming=streaming,
             )
         else:
             synth = get_response_synthesizer(
-                text_qa_template=qa_prompt, response_mode="compact", use_async=True
+                text_qa_template=qa_prompt,
+                response_mode="compact",
+                use_async=True,
+                streaming=streaming,
             )
 
         base_retriever = self.base_index.as_retriever(similarity_top_k=similarity_top_k)
@@ -265,26 +452,39 @@ class IndexManager:
             )
         elif retrieval_strategy == "parent":
             retriever = ParentRetriever(
-                base_retriever, docstore=self.base_index.docstore
+                base_retriever,
+                docstore=self.base_index.docstore,
+                docstore_reader=self.base_docstore_reader,
             )
         elif retrieval_strategy == "baseline":
             retriever = base_retriever
 
         if qa_followup:
             qa_retriever = QARetriever(
-                qa_vector_retriever=qa_vector_retriever, docstore=self.qa_index.docstore
+                qa_vector_retriever=qa_vector_retriever,
+                docstore=self.qa_index.docstore,
+                docstore_reader=self.qa_docstore_reader,
             )
             retriever = QAFollowupRetriever(
                 qa_retriever=qa_retriever, base_retriever=retriever
             )
 
         if hybrid_retrieval:
-            bm25_retriever = BM25Retriever.from_defaults(
-                docstore=self.base_index.docstore,
-                similarity_top_k=similarity_top_k,
-                stemmer=Stemmer.Stemmer("english"),
-                language="english",
-            )
+            bm25_index = self.get_bm25_index()
+            if bm25_index is not None:
+                bm25_retriever = BM25IndexRetriever(
+                    bm25_index,
+                    docstore=self.base_index.docstore,
+                    similarity_top_k=similarity_top_k,
+                )
+            else:
+                # Fall back to tokenizing the whole docstore
+                bm25_retriever = BM25Retriever.from_defaults(
+                    docstore=self.base_index.docstore,
+                    similarity_top_k=similarity_top_k,
+                    stemmer=Stemmer.Stemmer("english"),
+                    language="english",
+                )
             retriever = QueryFusionRetriever(
                 [retriever, bm25_retriever],
                 similarity_top_k=similarity_top_k,
@@ -309,6 +509,8 @@ class IndexManager:
                 top_n=5,
                 choice_select_prompt=choice_select_prompt,
                 llm=reranker_llm,
+                score_cache=self.rerank_score_cache,
+                score_cache_lock=self.rerank_score_cache_lock,
             )
         else:
             llm_reranker = None
@@ -322,27 +524,33 @@ class IndexManager:
         if use_hyde:
             hyde_prompt = PromptTemplate(prompts.hyde_prompt_tmpl)
             hyde = AsyncHyDEQueryTransform(
-                include_original=True, hyde_prompt=hyde_prompt
+                include_original=True,
+                hyde_prompt=hyde_prompt,
+                embed_model=self.embed_model,
+                num_hypothetical_docs=self.hyde_num_hypothetical_docs,
+                cache=self.hyde_cache,
+                cache_lock=self.hyde_cache_lock,
             )
             query_engine = AsyncTransformQueryEngine(
                 query_engine=query_engine, query_transform=hyde
             )
 
-        self.query_engine = query_engine
         return query_engine
 
     def get_react_agent(
         self,
+        query_engine: BaseQueryEngine,
         prompts: Prompts,
         llm_name: str = "gemini-1.5-flash",
         temperature: float = 0.2,
     ) -> ReActAgent:
         """
-        Creates a ReAct agent from a given QueryEngine
+        Creates a ReAct agent from a given QueryEngine, pass the engine
+        built for the request since engines are shared across requests
         """
         query_engine_tools = [
             QueryEngineTool(
-                query_engine=self.query_engine,
+                query_engine=query_engine,
                 metadata=ToolMetadata(
                     name="google_financials",
                     description=(
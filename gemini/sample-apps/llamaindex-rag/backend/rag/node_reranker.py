@@ -1,7 +1,10 @@
 """Node Re-ranker class for async execution"""
 
-from collections.abc import Callable
+import asyncio
+from collections.abc import Callable, MutableMapping
+from contextlib import AbstractContextManager
 import logging
+import threading
 
 import google.auth
 import google.auth.transport.requests
@@ -111,9 +114,23 @@ class CustomLLMRerank(BaseNodePostprocessor):
     )
     choice_batch_size: int = Field(description="Batch size for choice select.")
     llm: LLM = Field(description="The LLM to rerank with.")
+    max_concurrency: int = Field(
+        default=4, description="Maximum number of batches scored concurrently."
+    )
+    batch_timeout_sec: float = Field(
+        default=60.0, description="Timeout for scoring a single batch."
+    )
+    max_retries: int = Field(
+        default=2, description="Retries for a batch that fails or cannot be parsed."
+    )
+    retry_backoff_sec: float = Field(
+        default=1.0, description="Initial backoff between retries, doubled per retry."
+    )
 
     _format_node_batch_fn: Callable = PrivateAttr()
     _parse_choice_select_answer_fn: Callable = PrivateAttr()
+    _score_cache: MutableMapping | None = PrivateAttr()
+    _score_cache_lock: AbstractContextManager = PrivateAttr()
 
     def __init__(
         self,
@@ -124,25 +141,42 @@ class CustomLLMRerank(BaseNodePostprocessor):
         parse_choice_select_answer_fn: Callable | None = None,
         service_context: ServiceContext | None = None,
         top_n: int = 10,
+        max_concurrency: int = 4,
+        batch_timeout_sec: float = 60.0,
+        max_retries: int = 2,
+        retry_backoff_sec: float = 1.0,
+        score_cache: MutableMapping | None = None,
+        score_cache_lock: AbstractContextManager | None = None,
     ) -> None:
         choice_select_prompt = choice_select_prompt or DEFAULT_CHOICE_SELECT_PROMPT
 
         llm = llm or llm_from_settings_or_context(Settings, service_context)
 
-        self._format_node_batch_fn = (
-            format_node_batch_fn or default_format_node_batch_fn
-        )
-        self._parse_choice_select_answer_fn = (
-            parse_choice_select_answer_fn or default_parse_choice_select_answer_fn
-        )
-
         super().__init__(
             llm=llm,
             choice_select_prompt=choice_select_prompt,
             choice_batch_size=choice_batch_size,
             service_context=service_context,
             top_n=top_n,
+            max_concurrency=max_concurrency,
+            batch_timeout_sec=batch_timeout_sec,
+            max_retries=max_retries,
+            retry_backoff_sec=retry_backoff_sec,
         )
+        # Private attributes are set after pydantic initialization,
+        # which would otherwise reset them
+        self._format_node_batch_fn = (
+            format_node_batch_fn or default_format_node_batch_fn
+        )
+        self._parse_choice_select_answer_fn = (
+            parse_choice_select_answer_fn or default_parse_choice_select_answer_fn
+        )
+        # Optional mapping of (model, temperature, query_str, node_id) ->
+        # relevance, where None marks a node the LLM did not select. Shared
+        # across calls it lets repeated evaluation runs skip already scored
+        # pairs. Pass the lock guarding it when it is shared across threads.
+        self._score_cache = score_cache
+        self._score_cache_lock = score_cache_lock or threading.Lock()
 
     def _get_prompts(self) -> PromptDictType:
         """Get prompts."""
@@ -172,6 +206,48 @@ class CustomLLMRerank(BaseNodePostprocessor):
             pass
         return await self._postprocess_nodes(nodes, query_bundle)
 
+    async def _score_batch(
+        self, query_str: str, nodes_batch: list
+    ) -> dict[str, float | None] | None:
+        """
+        Score one batch of nodes with the LLM, retrying with exponential
+        backoff. Returns node_id -> relevance (None if not selected),
+        or None if the batch could not be scored.
+        """
+        fmt_batch_str = self._format_node_batch_fn(nodes_batch)
+        for attempt in range(self.max_retries + 1):
+            try:
+                raw_response = await asyncio.wait_for(
+                    self.llm.apredict(
+                        self.choice_select_prompt,
+                        context_str=fmt_batch_str,
+                        query_str=query_str,
+                    ),
+                    timeout=self.batch_timeout_sec,
+                )
+                logging.info(raw_response)
+                raw_choices, relevances = self._parse_choice_select_answer_fn(
+                    raw_response, len(nodes_batch)
+                )
+                choice_nodes = [nodes_batch[int(choice) - 1] for choice in raw_choices]
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.warning(
+                        f"Dropping rerank batch after {attempt + 1} tries: {e}"
+                    )
+                    return None
+                backoff_sec = self.retry_backoff_sec * 2**attempt
+                logger.info(f"Retrying rerank batch in {backoff_sec}s: {e}")
+                await asyncio.sleep(backoff_sec)
+                continue
+
+            relevances = relevances or [1.0 for _ in choice_nodes]
+            scores = {node.node_id: None for node in nodes_batch}
+            scores.update(
+                {node.node_id: rel for node, rel in zip(choice_nodes, relevances)}
+            )
+            return scores
+
     async def _postprocess_nodes(
         self,
         nodes: list[NodeWithScore],
@@ -182,46 +258,55 @@ class CustomLLMRerank(BaseNodePostprocessor):
         if len(nodes) == 0:
             return []
 
-        initial_results: list[NodeWithScore] = []
-        for idx in range(0, len(nodes), self.choice_batch_size):
-            nodes_batch = [
-                node.node for node in nodes[idx : idx + self.choice_batch_size]
+        query_str = query_bundle.query_str
+        score_cache = self._score_cache if self._score_cache is not None else {}
+        # Scores of one model are not reused for another
+        key_prefix = (
+            self.llm.metadata.model_name,
+            getattr(self.llm, "temperature", None),
+            query_str,
+        )
+        scores = {}
+        uncached_nodes = []
+        with self._score_cache_lock:
+            for node in nodes:
+                cache_key = (*key_prefix, node.node.node_id)
+                if cache_key in score_cache:
+                    scores[node.node.node_id] = score_cache[cache_key]
+                else:
+                    uncached_nodes.append(node.node)
+
+        # call each batch independently and concurrently
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def score_batch(nodes_batch):
+            async with semaphore:
+                return await self._score_batch(query_str, nodes_batch)
+
+        batch_scores = await asyncio.gather(
+            *[
+                score_batch(uncached_nodes[idx : idx + self.choice_batch_size])
+                for idx in range(0, len(uncached_nodes), self.choice_batch_size)
             ]
-
-            query_str = query_bundle.query_str
-            fmt_batch_str = self._format_node_batch_fn(nodes_batch)
-            # call each batch independently
-            raw_response = await self.llm.apredict(
-                self.choice_select_prompt,
-                context_str=fmt_batch_str,
-                query_str=query_str,
-            )
-
-            logging.info(raw_response)
-            try:
-                raw_choices, relevances = self._parse_choice_select_answer_fn(
-                    raw_response, len(nodes_batch)
-                )
-            # Try again
-            except IndexError:
-                raw_response = await self.llm.apredict(
-                    self.choice_select_prompt,
-                    context_str=fmt_batch_str,
-                    query_str=query_str,
-                )
-                raw_choices, relevances = self._parse_choice_select_answer_fn(
-                    raw_response, len(nodes_batch)
+        )
+        for batch_score in batch_scores:
+            if batch_score is None:
+                continue
+            scores.update(batch_score)
+            with self._score_cache_lock:
+                score_cache.update(
+                    {(*key_prefix, node_id): s for node_id, s in batch_score.items()}
                 )
-            choice_idxs = [int(choice) - 1 for choice in raw_choices]
-            choice_nodes = [nodes_batch[idx] for idx in choice_idxs]
-            relevances = relevances or [1.0 for _ in choice_nodes]
-            initial_results.extend(
-                [
-                    NodeWithScore(node=node, score=relevance)
-                    for node, relevance in zip(choice_nodes, relevances)
-                ]
-            )
 
+        if not scores:
+            logger.warning("All rerank batches failed, keeping retrieval order")
+            return nodes[: self.top_n]
+
+        initial_results = [
+            NodeWithScore(node=node.node, score=scores[node.node.node_id])
+            for node in nodes
+            if scores.get(node.node.node_id) is not None
+        ]
         return sorted(initial_results, key=lambda x: x.score or 0.0, reverse=True)[
             : self.top_n
         ]
@@ -2,11 +2,11 @@
 
 import logging
 
+from backend.rag.docstore_cache import CachedDocstoreReader
 from llama_index.core import QueryBundle
 from llama_index.core.retrievers import BaseRetriever, VectorIndexRetriever
 from llama_index.core.schema import NodeRelationship, NodeWithScore, TextNode
 from llama_index.storage.docstore.firestore import FirestoreDocumentStore
-import pandas as pd
 
 # Set the desired logging level
 logging.basicConfig(encoding="utf-8", level=logging.INFO)
@@ -18,37 +18,60 @@ class ParentRetriever(BaseRetriever):
     the source document associated with a node."""
 
     def __init__(
-        self, vector_retriever: VectorIndexRetriever, docstore: FirestoreDocumentStore
+        self,
+        vector_retriever: VectorIndexRetriever,
+        docstore: FirestoreDocumentStore,
+        docstore_reader: CachedDocstoreReader | None = None,
     ) -> None:
         """
-        This retriever uses a vector store to do initial node retriever and a documentstore to retrieve nodes by id
+        This retriever uses a vector store to do initial node retriever and a documentstore to retrieve nodes by id.
+        Source documents are read through docstore_reader, which batches and caches the lookups.
         """
 
         self._vector_retriever = vector_retriever
         self._docstore = docstore
+        self._docstore_reader = docstore_reader or CachedDocstoreReader(docstore)
         super().__init__()
 
+    @staticmethod
+    def _mean_score_by_source(
+        initial_nodes: list[NodeWithScore],
+    ) -> dict[str, float]:
+        """Average the scores of retrieved nodes per source document"""
+        score_sums: dict[str, float] = {}
+        counts: dict[str, int] = {}
+        for n in initial_nodes:
+            source_id = n.node.relationships[NodeRelationship.SOURCE].node_id
+            score_sums[source_id] = score_sums.get(source_id, 0.0) + (n.score or 0.0)
+            counts[source_id] = counts.get(source_id, 0) + 1
+        return {
+            source_id: score_sum / counts[source_id]
+            for source_id, score_sum in score_sums.items()
+        }
+
+    @staticmethod
+    def _to_source_nodes(
+        source_scores: dict[str, float], source_docs: dict
+    ) -> list[NodeWithScore]:
+        return [
+            NodeWithScore(
+                node=TextNode(id_=source_id, text=source_docs[source_id].text),
+                score=score,
+            )
+            for source_id, score in source_scores.items()
+            if source_id in source_docs
+        ]
+
     def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
         """Expand retrieved nodes into all their source documents"""
         initial_nodes = self._vector_retriever.retrieve(query_bundle)
-        node_source_id_score_df = pd.DataFrame(
-            [
-                {
-                    "source_id": n.node.relationships[NodeRelationship.SOURCE].node_id,
-                    "score": n.score,
-                }
-                for n in initial_nodes
-            ]
-        )
-        final_df = (
-            node_source_id_score_df.groupby("source_id")["score"].mean().reset_index()
-        )
-        unique_source_doc_ids_scores = final_df.to_dict("records")
-
-        source_docs = []
-        for doc_score in unique_source_doc_ids_scores:
-            source_doc = self._docstore.get_document(doc_score["source_id"])
-            node = TextNode(id_=doc_score["source_id"], text=source_doc.text)
-            source_docs.append(NodeWithScore(node=node, score=doc_score["score"]))
-
-        return source_docs
+        source_scores = self._mean_score_by_source(initial_nodes)
+        source_docs = self._docstore_reader.get_documents(source_scores)
+        return self._to_source_nodes(source_scores, source_docs)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        """Expand retrieved nodes into all their source documents"""
+        initial_nodes = await self._vector_retriever.aretrieve(query_bundle)
+        source_scores = self._mean_score_by_source(initial_nodes)
+        source_docs = await self._docstore_reader.aget_documents(source_scores)
+        return self._to_source_nodes(source_scores, source_docs)
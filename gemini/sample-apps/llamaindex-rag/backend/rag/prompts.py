@@ -1,6 +1,8 @@
 """Prompt management class"""
 
-from dataclasses import asdict, dataclass, field
+from dataclasses import asdict, dataclass, field, fields
+import hashlib
+import json
 
 SYSTEM_PROMPT = "You are an expert assistant specializing in \
     financial products and services. Your primary goal is to help users\
@@ -186,13 +188,28 @@ class Prompts:
     eval_prompt_wcontext_system: str = field(default=EVAL_PROMPT_WCONTEXT_SYSTEM)
     eval_prompt_wcontext_user: str = field(default=EVAL_PROMPT_WCONTEXT_USER)
 
+    def __post_init__(self) -> None:
+        # Bumped on every update so cached query engines built
+        # from older prompts are no longer served
+        self.version = 0
+
     def update(self, prompt_name: str, new_content: str) -> None:
         """Update prompts"""
-        if hasattr(self, prompt_name):
+        if prompt_name in {f.name for f in fields(self)}:
             setattr(self, prompt_name, new_content)
+            self.version += 1
         else:
             raise ValueError(f"Invalid prompt name: {prompt_name}")
 
     def to_dict(self) -> dict[str, str]:
         """return prompts as dict"""
         return asdict(self)
+
+    def digest(self) -> str:
+        """
+        Hash of the prompt texts. Unlike version, which restarts at 0 with
+        the process, it identifies the prompts in anything persisted.
+        """
+        return hashlib.sha256(
+            json.dumps(self.to_dict(), sort_keys=True).encode()
+        ).hexdigest()
@@ -1,8 +1,10 @@
 """Custom retriever which implements
 retrieval based on hypothetical questions"""
 
+import asyncio
 import logging
 
+from backend.rag.docstore_cache import CachedDocstoreReader
 from llama_index.core import QueryBundle
 from llama_index.core.retrievers import BaseRetriever, VectorIndexRetriever
 from llama_index.core.schema import NodeRelationship, NodeWithScore
@@ -21,48 +23,54 @@ class QARetriever(BaseRetriever):
         self,
         qa_vector_retriever: VectorIndexRetriever,
         docstore: FirestoreDocumentStore,
+        docstore_reader: CachedDocstoreReader | None = None,
     ) -> None:
         """
         This retriever uses a vector store to do
-        initial node retriever and a documentstore to retrieve nodes by id
+        initial node retriever and a documentstore to retrieve nodes by id.
+        Source documents are read through docstore_reader, which batches
+        and caches the lookups.
         """
 
         self._qa_vector_retriever = qa_vector_retriever
         self._docstore = docstore
+        self._docstore_reader = docstore_reader or CachedDocstoreReader(docstore)
         super().__init__()
 
-    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
-        qa_nodes = self._qa_vector_retriever.retrieve(query_bundle)
+    @staticmethod
+    def _source_doc_id(nodewscore: NodeWithScore) -> str:
+        return nodewscore.node.relationships[NodeRelationship.SOURCE].node_id
+
+    def _to_source_docs(
+        self, qa_nodes: list[NodeWithScore], source_docs: dict
+    ) -> list[NodeWithScore]:
         og_docs = []
         for nodewscore in qa_nodes:
-            logger.info(nodewscore.node.text)
-            source_doc_id = nodewscore.node.relationships[
-                NodeRelationship.SOURCE
-            ].node_id
-            og_docs.append(
-                NodeWithScore(
-                    node=self._docstore.get_document(source_doc_id),
-                    score=nodewscore.score,
+            logger.info(f"Matched Question: {nodewscore.node.text}")
+            source_doc_id = self._source_doc_id(nodewscore)
+            if source_doc_id in source_docs:
+                og_docs.append(
+                    NodeWithScore(
+                        node=source_docs[source_doc_id],
+                        score=nodewscore.score,
+                    )
                 )
-            )
-
         return og_docs
 
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        qa_nodes = self._qa_vector_retriever.retrieve(query_bundle)
+        source_docs = self._docstore_reader.get_documents(
+            self._source_doc_id(n) for n in qa_nodes
+        )
+        return self._to_source_docs(qa_nodes, source_docs)
+
     async def _aretrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
         qa_nodes = await self._qa_vector_retriever.aretrieve(query_bundle)
-        og_docs = []
-        for nodewscore in qa_nodes:
-            logger.info(f"Matched Question: {nodewscore.node.text}")
-            source_doc_id = nodewscore.node.relationships[
-                NodeRelationship.SOURCE
-            ].node_id
-            og_docs.append(
-                NodeWithScore(
-                    node=self._docstore.get_document(source_doc_id),
-                    score=nodewscore.score,
-                )
-            )
-        return og_docs
+        # One deduplicated bulk read for all matched questions
+        source_docs = await self._docstore_reader.aget_documents(
+            self._source_doc_id(n) for n in qa_nodes
+        )
+        return self._to_source_docs(qa_nodes, source_docs)
 
 
 class QAFollowupRetriever(BaseRetriever):
@@ -99,8 +107,10 @@ class QAFollowupRetriever(BaseRetriever):
         return retrieve_nodes
 
     async def _aretrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
-        am_nodes = await self._base_retriever.aretrieve(query_bundle)
-        qa_nodes = await self._qa_retriever.aretrieve(query_bundle)
+        am_nodes, qa_nodes = await asyncio.gather(
+            self._base_retriever.aretrieve(query_bundle),
+            self._qa_retriever.aretrieve(query_bundle),
+        )
 
         am_ids = {n.node.node_id for n in am_nodes}
         qa_ids = {n.node.node_id for n in qa_nodes}
@@ -0,0 +1,105 @@
+"""LRU cache for query engines built by the IndexManager"""
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+import logging
+import threading
+from typing import Any
+import weakref
+
+logging.basicConfig(level=logging.INFO)  # Set the desired logging level
+logger = logging.getLogger(__name__)
+
+
+class QueryEngineCache:
+    """
+    Keyed, size-bounded cache of fully constructed query engines.
+    Building an engine (LLM, synthesizer, retrievers, reranker, HyDE)
+    is a fixed cost per request, so engines are reused across requests
+    which share the same configuration. Least recently used engines are
+    evicted once max_size is reached.
+
+    Engines hold async clients bound to the event loop they are first used
+    on, so they are cached per running event loop: the app's loop and the
+    loop of each batch evaluation get their own engines, and engines of
+    closed loops are dropped.
+    """
+
+    def __init__(self, max_size: int = 32):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._engines: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by invalidate, engines built from older state are not stored
+        self._generation = 0
+
+    @staticmethod
+    def _loop_key() -> weakref.ref | None:
+        """Weak reference to the running event loop, None outside of one"""
+        try:
+            return weakref.ref(asyncio.get_running_loop())
+        except RuntimeError:
+            return None
+
+    def _drop_closed_loops(self) -> None:
+        """Evict engines of event loops which were closed or collected"""
+        for cache_key in list(self._engines):
+            loop_key = cache_key[0]
+            if loop_key is None:
+                continue
+            loop = loop_key()
+            if loop is None or loop.is_closed():
+                del self._engines[cache_key]
+                self.evictions += 1
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the engine stored under key for the running event loop,
+        building it with factory on a miss"""
+        cache_key = (self._loop_key(), key)
+        with self._lock:
+            if cache_key in self._engines:
+                self._engines.move_to_end(cache_key)
+                self.hits += 1
+                return self._engines[cache_key]
+            self.misses += 1
+            generation = self._generation
+
+        # Build outside the lock so a slow build does not block cache hits
+        engine = factory()
+
+        with self._lock:
+            if generation != self._generation:
+                # Invalidated during the build, which may have used the
+                # previous indexes or prompts
+                return engine
+            self._engines[cache_key] = engine
+            self._engines.move_to_end(cache_key)
+            self._drop_closed_loops()
+            while len(self._engines) > self.max_size:
+                self._engines.popitem(last=False)
+                self.evictions += 1
+        return engine
+
+    def invalidate(self) -> None:
+        """Drop all cached engines (e.g. after the underlying indexes change)"""
+        with self._lock:
+            num_engines = len(self._engines)
+            self._engines.clear()
+            self._generation += 1
+        logger.info(f"Invalidated {num_engines} cached query engines")
+
+    def stats(self) -> dict:
+        """Return cache counters used to size the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._engines),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
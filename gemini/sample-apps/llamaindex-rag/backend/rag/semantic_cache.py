@@ -0,0 +1,250 @@
+"""Semantic cache of RAG responses keyed by query embedding"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.response.schema import Response
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.storage.docstore.utils import doc_to_json, json_to_doc
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)  # Set the desired logging level
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries match"""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+@dataclass
+class CacheLookup:
+    """Result of a cache lookup, reused to store the response on a miss"""
+
+    namespace: str
+    normalized_query: str
+    embedding: np.ndarray | None
+    response: Any | None = None
+
+
+@dataclass
+class _CacheEntry:
+    namespace: str
+    normalized_query: str
+    embedding: np.ndarray
+    response: Any
+    created_at: float
+
+
+class SemanticResponseCache:
+    """
+    Caches query engine responses and serves them for new queries whose
+    normalized embedding has a cosine similarity of at least
+    similarity_threshold with a cached query. Entries are partitioned by
+    namespace (engine configuration, index identity and prompt texts)
+    so a response is only reused under the configuration that produced it.
+
+    Exact matches on the normalized query text are served without
+    computing an embedding. Similar queries are found with a brute force
+    inner product over the L2-normalized embeddings of the namespace,
+    which is exact and fast at the cache sizes used here.
+    """
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        similarity_threshold: float = 0.95,
+        max_size: int = 1024,
+        ttl_sec: float | None = 3600,
+        persist_dir: str | None = None,
+    ):
+        self.embed_model = embed_model
+        self.similarity_threshold = similarity_threshold
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+        self.persist_dir = persist_dir
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[int, _CacheEntry] = OrderedDict()
+        self._by_text: dict[tuple[str, str], int] = {}
+        # namespace -> (entry ids, stacked embeddings), rebuilt lazily
+        self._matrices: dict[str, tuple[list[int], np.ndarray]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        if persist_dir and os.path.exists(os.path.join(persist_dir, "entries.json")):
+            self._load()
+
+    async def alookup(self, query: str, namespace: str) -> CacheLookup:
+        """Look up a response for query, embedding it only if no exact match exists"""
+        lookup = CacheLookup(
+            namespace=namespace, normalized_query=normalize_query(query), embedding=None
+        )
+        with self._lock:
+            entry_id = self._by_text.get((namespace, lookup.normalized_query))
+            if entry_id is not None and self._is_live(entry_id):
+                self._entries.move_to_end(entry_id)
+                self.exact_hits += 1
+                lookup.response = self._entries[entry_id].response
+                return lookup
+
+        embedding = await self.embed_model.aget_query_embedding(lookup.normalized_query)
+        lookup.embedding = self._normalize(embedding)
+
+        with self._lock:
+            entry_id = self._nearest(namespace, lookup.embedding)
+            if entry_id is None:
+                self.misses += 1
+                return lookup
+            self._entries.move_to_end(entry_id)
+            self.semantic_hits += 1
+            lookup.response = self._entries[entry_id].response
+            return lookup
+
+    def put(self, lookup: CacheLookup, response: Any) -> None:
+        """Store the response computed after a missed lookup"""
+        if lookup.embedding is None:
+            return
+        with self._lock:
+            self._add(
+                _CacheEntry(
+                    namespace=lookup.namespace,
+                    normalized_query=lookup.normalized_query,
+                    embedding=lookup.embedding,
+                    response=response,
+                    created_at=time.time(),
+                )
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_text.clear()
+            self._matrices.clear()
+
+    def stats(self) -> dict:
+        """Return cache counters"""
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _is_live(self, entry_id: int) -> bool:
+        """Drop the entry if it expired, return whether it is still cached"""
+        entry = self._entries[entry_id]
+        if self.ttl_sec and time.time() - entry.created_at > self.ttl_sec:
+            self._remove(entry_id)
+            return False
+        return True
+
+    def _nearest(self, namespace: str, embedding: np.ndarray) -> int | None:
+        if namespace not in self._matrices:
+            entry_ids = [
+                i for i, e in self._entries.items() if e.namespace == namespace
+            ]
+            if not entry_ids:
+                return None
+            matrix = np.stack([self._entries[i].embedding for i in entry_ids])
+            self._matrices[namespace] = (entry_ids, matrix)
+
+        entry_ids, matrix = self._matrices[namespace]
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        entry_id = entry_ids[best]
+        return entry_id if self._is_live(entry_id) else None
+
+    def _add(self, entry: _CacheEntry) -> None:
+        existing_id = self._by_text.get((entry.namespace, entry.normalized_query))
+        if existing_id is not None:
+            self._remove(existing_id)
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        self._by_text[(entry.namespace, entry.normalized_query)] = entry_id
+        self._matrices.pop(entry.namespace, None)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        self._by_text.pop((entry.namespace, entry.normalized_query), None)
+        self._matrices.pop(entry.namespace, None)
+
+    def persist(self) -> None:
+        """Write the cached responses to persist_dir, if configured"""
+        if not self.persist_dir:
+            return
+        with self._lock:
+            entries = list(self._entries.values())
+        os.makedirs(self.persist_dir, exist_ok=True)
+        if entries:
+            embeddings = np.stack([e.embedding for e in entries])
+        else:
+            embeddings = np.zeros((0, 0), dtype=np.float32)
+        np.save(os.path.join(self.persist_dir, "embeddings.npy"), embeddings)
+        with open(os.path.join(self.persist_dir, "entries.json"), "w") as f:
+            json.dump(
+                [
+                    {
+                        "namespace": e.namespace,
+                        "normalized_query": e.normalized_query,
+                        "created_at": e.created_at,
+                        "response": e.response.response,
+                        "source_nodes": [
+                            {"node": doc_to_json(n.node), "score": n.score}
+                            for n in e.response.source_nodes
+                        ],
+                    }
+                    for e in entries
+                ],
+                f,
+            )
+        logger.info(f"Persisted {len(entries)} cached responses")
+
+    def _load(self) -> None:
+        embeddings = np.load(os.path.join(self.persist_dir, "embeddings.npy"))
+        with open(os.path.join(self.persist_dir, "entries.json")) as f:
+            records = json.load(f)
+        for record, embedding in zip(records, embeddings):
+            self._add(
+                _CacheEntry(
+                    namespace=record["namespace"],
+                    normalized_query=record["normalized_query"],
+                    embedding=embedding,
+                    response=Response(
+                        response=record["response"],
+                        source_nodes=[
+                            NodeWithScore(node=json_to_doc(n["node"]), score=n["score"])
+                            for n in record["source_nodes"]
+                        ],
+                    ),
+                    created_at=record["created_at"],
+                )
+            )
+        logger.info(f"Loaded {len(self._entries)} cached responses")
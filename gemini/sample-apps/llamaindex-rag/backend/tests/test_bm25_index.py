@@ -0,0 +1,121 @@
+import os
+from unittest import mock
+
+from backend.rag.bm25_index import BM25Index
+from common import utils
+from llama_index.core.schema import TextNode
+
+
+def test_bm25_index_persist_and_load(tmp_path):
+    bm25_index = BM25Index()
+    bm25_index.add_nodes(
+        [
+            TextNode(id_="q1", text="Google Q1 earnings and revenue"),
+            TextNode(id_="cloud", text="Cloud margins improved"),
+        ]
+    )
+    bm25_index.persist(str(tmp_path))
+
+    loaded = BM25Index.load(str(tmp_path))
+    assert [node_id for node_id, _ in loaded.search("Q1 earnings", 2)] == ["q1"]
+
+
+def test_bm25_index_incremental_updates():
+    bm25_index = BM25Index()
+    bm25_index.add_nodes(
+        [
+            TextNode(id_="a", text="earnings report"),
+            TextNode(id_="b", text="cloud revenue"),
+        ]
+    )
+    bm25_index.delete(["a"])
+    bm25_index.add_nodes([TextNode(id_="b", text="earnings call")])
+
+    assert len(bm25_index) == 1
+    assert [node_id for node_id, _ in bm25_index.search("earnings", 5)] == ["b"]
+    assert bm25_index.search("cloud", 5) == []
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+
+    @property
+    def generation(self):
+        return self.bucket.objects[self.name][0]
+
+    def download_to_filename(self, file_name):
+        self.bucket.downloads.append(self.name)
+        with open(file_name, "wb") as f:
+            f.write(self.bucket.objects[self.name][1])
+
+
+class FakeBucket:
+    def __init__(self):
+        self.objects = {}
+        self.downloads = []
+
+    def upload_directory(self, local_dir, prefix):
+        for file_name in sorted(os.listdir(local_dir)):
+            with open(os.path.join(local_dir, file_name), "rb") as f:
+                data = f.read()
+            name = f"{prefix}/{file_name}"
+            generation = self.objects.get(name, (0, b""))[0] + 1
+            self.objects[name] = (generation, data)
+
+    def list_blobs(self, prefix):
+        return [
+            FakeBlob(self, name) for name in self.objects if name.startswith(prefix)
+        ]
+
+
+def test_bm25_index_synced_from_gcs(tmp_path, monkeypatch):
+    bucket = FakeBucket()
+    client = mock.Mock()
+    client.bucket.return_value = bucket
+    monkeypatch.setattr(utils.storage, "Client", lambda: client)
+
+    bm25_index = BM25Index()
+    bm25_index.add_nodes([TextNode(id_="q1", text="Google Q1 earnings")])
+    bm25_index.persist(str(tmp_path / "job"))
+    bucket.upload_directory(str(tmp_path / "job"), "bm25/ns")
+
+    local_dir = str(tmp_path / "backend" / "ns")
+    assert utils.sync_directory_from_gcs("bucket", "bm25/ns", local_dir)
+    assert BM25Index.load(local_dir).node_ids == ["q1"]
+    assert bucket.downloads[-1] == "bm25/ns/manifest.json"
+
+    # Unchanged blobs are not downloaded again
+    bucket.downloads.clear()
+    assert not utils.sync_directory_from_gcs("bucket", "bm25/ns", local_dir)
+    assert bucket.downloads == []
+
+    # A later indexing run adds and deletes nodes
+    bm25_index.delete(["q1"])
+    bm25_index.add_nodes([TextNode(id_="cloud", text="Cloud margins improved")])
+    bm25_index.persist(str(tmp_path / "job"))
+    bucket.upload_directory(str(tmp_path / "job"), "bm25/ns")
+    assert utils.sync_directory_from_gcs("bucket", "bm25/ns", local_dir)
+    loaded = BM25Index.load(local_dir)
+    assert [node_id for node_id, _ in loaded.search("cloud margins", 2)] == ["cloud"]
+    assert loaded.search("earnings", 2) == []
+
+
+def test_sync_directory_removes_deleted_blobs(tmp_path, monkeypatch):
+    bucket = FakeBucket()
+    client = mock.Mock()
+    client.bucket.return_value = bucket
+    monkeypatch.setattr(utils.storage, "Client", lambda: client)
+
+    bucket.objects["manifest/ns/manifest.json"] = (1, b"{}")
+    local_dir = tmp_path / "ns"
+    assert utils.sync_directory_from_gcs("bucket", "manifest/ns", str(local_dir))
+    (local_dir / "local_only.json").write_text("{}")
+
+    # A file deleted from the bucket is not left behind as a stale copy,
+    # files which were never synced are kept
+    del bucket.objects["manifest/ns/manifest.json"]
+    assert utils.sync_directory_from_gcs("bucket", "manifest/ns", str(local_dir))
+    assert sorted(os.listdir(local_dir)) == ["local_only.json"]
+    assert not utils.sync_directory_from_gcs("bucket", "manifest/ns", str(local_dir))
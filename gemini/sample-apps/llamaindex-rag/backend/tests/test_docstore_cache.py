@@ -0,0 +1,115 @@
+import asyncio
+
+from backend.rag.docstore_cache import CachedDocstoreReader
+from llama_index.core.schema import TextNode
+from llama_index.storage.docstore.firestore import FirestoreDocumentStore
+from llama_index.storage.kvstore.firestore import FirestoreKVStore
+import pytest
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self.exists else None
+
+
+class FakeDocumentRef:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+
+    def set(self, val, merge=False):
+        self._collection.setdefault(self.id, {}).update(val)
+
+    def get(self):
+        return FakeSnapshot(self.id, self._collection.get(self.id))
+
+
+class FakeCollection(dict):
+    def document(self, doc_id):
+        return FakeDocumentRef(self, doc_id)
+
+
+class FakeBatch:
+    def set(self, ref, val, merge=False):
+        ref.set(val, merge=merge)
+
+    def commit(self):
+        pass
+
+
+class FakeFirestoreClient:
+    """In-memory stand-in for google.cloud.firestore.Client"""
+
+    def __init__(self):
+        self.collections = {}
+        self.get_all_calls = []
+
+    def collection(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def batch(self):
+        return FakeBatch()
+
+    def get_all(self, refs):
+        refs = list(refs)
+        self.get_all_calls.append([ref.id for ref in refs])
+        return [ref.get() for ref in refs]
+
+
+@pytest.fixture
+def firestore_docstore():
+    kvstore = FirestoreKVStore.__new__(FirestoreKVStore)
+    kvstore._db = FakeFirestoreClient()
+    docstore = FirestoreDocumentStore(kvstore, namespace="test")
+    docstore.add_documents(
+        [TextNode(id_=f"doc{i}", text=f"document {i}") for i in range(3)]
+    )
+    return docstore
+
+
+def test_docstore_reader_batches_firestore_reads(firestore_docstore):
+    reader = CachedDocstoreReader(firestore_docstore)
+    docs = reader.get_documents(["doc0", "doc1", "doc0", "doc2"])
+
+    assert {doc_id: doc.text for doc_id, doc in docs.items()} == {
+        "doc0": "document 0",
+        "doc1": "document 1",
+        "doc2": "document 2",
+    }
+    # One bulk read, with duplicate ids requested once
+    assert firestore_docstore._kvstore._db.get_all_calls == [["doc0", "doc1", "doc2"]]
+
+
+def test_docstore_reader_serves_cached_documents(firestore_docstore):
+    reader = CachedDocstoreReader(firestore_docstore, max_size=8, ttl_sec=60)
+    reader.get_documents(["doc0", "doc1"])
+    docs = asyncio.run(reader.aget_documents(["doc1", "doc2"]))
+
+    assert list(docs) == ["doc1", "doc2"]
+    assert firestore_docstore._kvstore._db.get_all_calls == [
+        ["doc0", "doc1"],
+        ["doc2"],
+    ]
+
+
+def test_docstore_reader_missing_documents(firestore_docstore):
+    reader = CachedDocstoreReader(firestore_docstore)
+
+    with pytest.raises(ValueError, match="missing"):
+        reader.get_documents(["doc0", "missing"])
+    with pytest.raises(ValueError, match="missing"):
+        asyncio.run(reader.aget_documents(["missing"]))
+
+    # The documents found are still cached, the missing id is fetched again
+    docs = reader.get_documents(["doc0", "missing"], raise_error=False)
+    assert list(docs) == ["doc0"]
+    assert firestore_docstore._kvstore._db.get_all_calls == [
+        ["doc0", "missing"],
+        ["missing"],
+        ["missing"],
+    ]
@@ -0,0 +1,106 @@
+import asyncio
+
+from backend.rag.embedding_cache import CachedEmbedding
+from llama_index.core.embeddings import MockEmbedding
+
+
+class CountingEmbedding(MockEmbedding):
+    """Returns a vector derived from the text and records embedded texts"""
+
+    embedded: list = []
+
+    def _get_vector(self, text):
+        return [float(len(text)), float(ord(text[0]))] + [0.5] * (self.embed_dim - 2)
+
+    def _get_query_embedding(self, query):
+        self.embedded.append(("query", query))
+        return self._get_vector(query)
+
+    async def _aget_query_embedding(self, query):
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text):
+        self.embedded.append(("document", text))
+        return self._get_vector(text)
+
+    async def _aget_text_embedding(self, text):
+        return self._get_text_embedding(text)
+
+
+def test_embedding_cache_skips_cached_texts(tmp_path):
+    inner = CountingEmbedding(embed_dim=4, embedded=[])
+    cached = CachedEmbedding(inner, persist_dir=str(tmp_path))
+
+    first = cached.get_text_embedding_batch(["alpha", "beta", "alpha"])
+    assert inner.embedded == [("document", "alpha"), ("document", "beta")]
+    assert first[0] == first[2] == inner._get_vector("alpha")
+
+    inner.embedded.clear()
+    again = asyncio.run(cached.aget_text_embedding_batch(["beta", "gamma"]))
+    assert inner.embedded == [("document", "gamma")]
+    assert again[0] == first[1]
+
+    # Queries and documents are cached separately
+    cached.get_query_embedding("alpha")
+    assert inner.embedded[-1] == ("query", "alpha")
+
+    stats = cached.stats()
+    assert stats["size"] == 4
+    assert stats["hits"] == 2
+    assert stats["misses"] == 4
+    assert stats["bytes_saved"] == len("alpha") + len("beta")
+
+
+def test_embedding_cache_persists_across_instances(tmp_path):
+    inner = CountingEmbedding(embed_dim=4, embedded=[])
+    CachedEmbedding(inner, persist_dir=str(tmp_path)).get_query_embedding("alpha")
+
+    inner.embedded.clear()
+    reloaded = CachedEmbedding(inner, persist_dir=str(tmp_path))
+    assert reloaded.get_query_embedding("alpha") == inner._get_vector("alpha")
+    assert inner.embedded == []
+    assert reloaded.stats()["hit_rate"] == 1.0
+
+
+def test_embedding_cache_drops_incomplete_rows(tmp_path):
+    inner = CountingEmbedding(embed_dim=4, embedded=[])
+    cached = CachedEmbedding(inner, persist_dir=str(tmp_path))
+    cached.get_text_embedding_batch(["alpha", "beta"])
+
+    # Simulate a write interrupted after the vector of a third key
+    store_dir = cached._store.persist_dir
+    with open(f"{store_dir}/embeddings.f32", "ab") as f:
+        f.write(b"\0" * 8)
+
+    reloaded = CachedEmbedding(inner, persist_dir=str(tmp_path))
+    assert reloaded.stats()["size"] == 2
+    inner.embedded.clear()
+    reloaded.get_text_embedding_batch(["beta", "gamma"])
+    assert inner.embedded == [("document", "gamma")]
+    assert CachedEmbedding(inner, persist_dir=str(tmp_path)).stats()["size"] == 3
+
+
+def test_embedding_cache_shared_by_two_instances(tmp_path):
+    # e.g. the backend and the indexing job, or two uvicorn workers
+    backend_inner = CountingEmbedding(embed_dim=4, embedded=[])
+    ingest_inner = CountingEmbedding(embed_dim=4, embedded=[])
+    backend = CachedEmbedding(backend_inner, persist_dir=str(tmp_path))
+    ingest = CachedEmbedding(ingest_inner, persist_dir=str(tmp_path))
+
+    backend.get_text_embedding("a")
+    assert ingest.get_text_embedding_batch(["bbbbbbbbbb", "a"]) == [
+        ingest_inner._get_vector("bbbbbbbbbb"),
+        backend_inner._get_vector("a"),
+    ]
+    assert ingest_inner.embedded == [("document", "bbbbbbbbbb")]
+
+    backend.get_text_embedding("cc")
+    assert backend.get_text_embedding("bbbbbbbbbb") == ingest_inner._get_vector(
+        "bbbbbbbbbb"
+    )
+    assert ingest.get_text_embedding("cc") == backend_inner._get_vector("cc")
+    assert backend_inner.embedded == [("document", "a"), ("document", "cc")]
+    assert ingest_inner.embedded == [("document", "bbbbbbbbbb")]
+    assert (
+        CachedEmbedding(backend_inner, persist_dir=str(tmp_path)).stats()["size"] == 3
+    )
@@ -35,6 +35,20 @@ def test_query_rag(client, payload):
     assert response.status_code == 200
 
 
+@pytest.mark.parametrize("payload", query_rag_params)
+def test_query_rag_stream(client, payload):
+    with client.stream("POST", "/query_rag_stream", json=payload) as response:
+        assert response.status_code == 200
+        events = [
+            line.removeprefix("event: ")
+            for line in response.iter_lines()
+            if line.startswith("event: ")
+        ]
+    assert events[0] == "source_nodes"
+    assert "token" in events
+    assert events[-2:] == ["evaluation", "done"]
+
+
 eval_batch_params = [
     {
         "llm_name": "gemini-1.5-flash",
@@ -58,3 +72,7 @@ eval_batch_params = [
 def test_eval_batch(client, payload):
     response = client.post("/eval_batch", json=payload)
     assert response.status_code == 200
+    # TestClient runs the background job before returning
+    status = client.get(f"/eval_batch/{response.json()['eval_uuid']}")
+    assert status.status_code == 200
+    assert status.json()["status"] == "completed"
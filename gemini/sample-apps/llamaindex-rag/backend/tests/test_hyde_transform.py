@@ -0,0 +1,43 @@
+import asyncio
+
+from backend.rag.async_extensions import AsyncHyDEQueryTransform
+from cachetools import LRUCache
+from llama_index.core import MockEmbedding, QueryBundle
+from llama_index.core.llms import MockLLM
+
+
+class CountingLLM(MockLLM):
+    calls: int = 0
+
+    async def apredict(self, prompt, **prompt_args):
+        self.calls += 1
+        return f"hypothetical answer to {prompt_args['context_str']}"
+
+
+def test_hyde_transform_is_memoized_and_embeds_once():
+    llm = CountingLLM()
+    cache = LRUCache(maxsize=8)
+    hyde = AsyncHyDEQueryTransform(
+        llm=llm,
+        embed_model=MockEmbedding(embed_dim=4),
+        num_hypothetical_docs=3,
+        cache=cache,
+    )
+
+    first = asyncio.run(hyde._arun(QueryBundle("what is rag?"), metadata={}))
+    second = asyncio.run(hyde._arun(QueryBundle("what is rag?")))
+
+    assert llm.calls == 3
+    assert second == first
+    # Callers get their own copy of the cached bundle
+    assert second is not first
+    second.embedding_strs.append("mutated")
+    third = asyncio.run(hyde._arun(QueryBundle("what is rag?")))
+    assert third.embedding_strs == first.embedding_strs
+    assert len(first.embedding_strs) == 4
+    assert first.embedding_strs[-1] == "what is rag?"
+    assert len(first.embedding) == 4
+
+    asyncio.run(hyde._arun(QueryBundle("another question")))
+    assert llm.calls == 6
+    assert len(cache) == 2
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from backend.indexing.index_manifest import IndexManifest
+from llama_index.core import Document
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+
+
+def blob(name, generation):
+    return SimpleNamespace(
+        path=f"gs://bucket/{name}",
+        generation=generation,
+        md5_hash=f"md5-{name}-{generation}",
+    )
+
+
+def chunk_of(doc):
+    node = TextNode(text=f"chunk of {doc.text}")
+    node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(node_id=doc.doc_id)
+    return node
+
+
+def test_manifest_diff_and_ids(tmp_path):
+    manifest = IndexManifest.load(str(tmp_path))
+    blobs = [blob("a.pdf", 1), blob("b.pdf", 1), blob("c.pdf", 1)]
+    docs = [Document(text=b.path, metadata={"source": b.path}) for b in blobs[:2]]
+    chunks = [chunk_of(doc) for doc in docs]
+
+    failed = manifest.record(blobs, docs, docs, chunks, [])
+    assert failed == ["gs://bucket/c.pdf"]
+    manifest.persist()
+
+    manifest = IndexManifest.load(str(tmp_path))
+    diff = manifest.diff([blob("a.pdf", 1), blob("b.pdf", 2), blob("d.pdf", 1)])
+    assert diff.unchanged == ["gs://bucket/a.pdf"]
+    assert diff.changed == ["gs://bucket/b.pdf"]
+    assert diff.added == ["gs://bucket/d.pdf"]
+    assert diff.deleted == []
+    assert "1 added, 1 changed, 0 deleted, 1 unchanged" in diff.report()
+
+    stale_ids = manifest.get_ids(diff.to_delete)
+    assert stale_ids["docstore_ids"] == [docs[1].doc_id]
+    assert stale_ids["vector_ids"] == [chunks[1].node_id]
+
+    diff = manifest.diff([blob("b.pdf", 1)])
+    assert diff.deleted == ["gs://bucket/a.pdf"]
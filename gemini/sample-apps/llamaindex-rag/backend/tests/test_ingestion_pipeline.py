@@ -0,0 +1,58 @@
+import asyncio
+
+from backend.indexing.ingestion_pipeline import IngestionPipeline
+from llama_index.core import Document, MockEmbedding
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.storage.docstore import SimpleDocumentStore
+from llama_index.core.vector_stores import SimpleVectorStore
+
+
+async def document_batches(docs, batch_size):
+    for i in range(0, len(docs), batch_size):
+        await asyncio.sleep(0)
+        yield docs[i : i + batch_size]
+
+
+def test_pipeline_writes_docstore_and_both_vector_stores():
+    docs = [
+        Document(text=f"Document {i}. " + "Some sentence about revenue. " * 50)
+        for i in range(7)
+    ]
+    splitter = SentenceSplitter(chunk_size=64, chunk_overlap=0)
+
+    def chunk_fn(doc):
+        return [doc], splitter.get_nodes_from_documents([doc])
+
+    async def qa_fn(doc):
+        return [Document(text=f"What is in {doc.doc_id}?")]
+
+    docstore = SimpleDocumentStore()
+    vector_store = SimpleVectorStore()
+    qa_vector_store = SimpleVectorStore()
+    pipeline = IngestionPipeline(
+        docstore=docstore,
+        embed_model=MockEmbedding(embed_dim=8),
+        vector_store=vector_store,
+        chunk_fn=chunk_fn,
+        qa_vector_store=qa_vector_store,
+        qa_fn=qa_fn,
+        queue_size=4,
+        embed_batch_size=5,
+        embed_concurrency=2,
+        qa_concurrency=3,
+        docstore_batch_size=3,
+    )
+
+    result = asyncio.run(pipeline.run(document_batches(docs, 2)))
+
+    num_chunks = sum(len(chunk_fn(doc)[1]) for doc in docs)
+    assert num_chunks > len(docs)
+    assert len(vector_store.data.embedding_dict) == num_chunks
+    assert len(qa_vector_store.data.embedding_dict) == len(docs)
+    # Source documents are queued by both stages but written once
+    assert len(result.docstore_nodes) == len(docs)
+    assert len(result.vector_nodes) == num_chunks
+    assert len(result.qa_vector_nodes) == len(docs)
+    assert result.documents == docs
+    assert set(docstore.docs) == {doc.doc_id for doc in docs}
+    assert all(doc.embedding is None for doc in docstore.docs.values())
@@ -0,0 +1,48 @@
+from backend.rag.evaluate import LLMEvaluator
+import pandas as pd
+
+
+def make_evaluator(checkpoint_path, failing_questions, calls):
+    evaluator = LLMEvaluator(
+        system_prompt="",
+        user_prompt="",
+        eval_model_name="none",
+        temperature=0.0,
+        max_concurrency=2,
+        max_retries=1,
+        retry_backoff_sec=0.0,
+        checkpoint_path=str(checkpoint_path),
+        checkpoint_every=2,
+    )
+    evaluator.eval_model = None
+
+    async def eval_question_answer_pair(func, eval_model, question, ground_truth):
+        calls.append(question)
+        if question in failing_questions:
+            raise RuntimeError("429 Quota exceeded")
+        return f"answer to {question}", "90\nGood answer", ["context"]
+
+    evaluator.async_eval_question_answer_pair = eval_question_answer_pair
+    return evaluator
+
+
+def test_evaluate_retries_and_resumes_from_checkpoint(tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.parquet"
+    eval_df = pd.DataFrame(
+        {"question": [f"q{i}" for i in range(5)], "ground_truth": ["gt"] * 5}
+    )
+
+    calls = []
+    evaluator = make_evaluator(checkpoint_path, {"q3"}, calls)
+    result = evaluator.evaluate(None, eval_df.copy())
+    assert calls.count("q3") == 2
+    assert result["error"].notna().tolist() == [False, False, False, True, False]
+    assert result.loc[0, "score"] == 90
+    assert checkpoint_path.exists()
+
+    calls = []
+    evaluator = make_evaluator(checkpoint_path, set(), calls)
+    result = evaluator.evaluate(None, eval_df.copy())
+    assert calls == ["q3"]
+    assert result["error"].isna().all()
+    assert result["answer"].tolist() == [f"answer to q{i}" for i in range(5)]
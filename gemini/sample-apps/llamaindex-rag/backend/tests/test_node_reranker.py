@@ -0,0 +1,117 @@
+import asyncio
+
+from backend.rag.node_reranker import CustomLLMRerank
+from llama_index.core import QueryBundle
+from llama_index.core.llms import MockLLM
+from llama_index.core.schema import NodeWithScore, TextNode
+
+
+class ScriptedLLM(MockLLM):
+    """Answers each choice select call with the next scripted response,
+    where None hangs and an exception is raised"""
+
+    responses: list = []
+    calls: int = 0
+    temperature: float = 0.0
+
+    async def apredict(self, prompt, **prompt_args):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if response is None:
+            await asyncio.sleep(3600)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def scripted_llm(*responses, temperature=0.0):
+    llm = ScriptedLLM()
+    llm.responses = list(responses)
+    llm.temperature = temperature
+    return llm
+
+
+def retrieved_nodes(n):
+    return [
+        NodeWithScore(node=TextNode(id_=f"node{i}", text=f"text {i}"), score=0.5)
+        for i in range(n)
+    ]
+
+
+def rerank(reranker, nodes, query="what is rag?"):
+    return asyncio.run(reranker.postprocess_nodes(nodes, QueryBundle(query)))
+
+
+def test_reranker_drops_timed_out_batch():
+    llm = scripted_llm("Doc: 2, Relevance: 9\nDoc: 1, Relevance: 3", None)
+    reranker = CustomLLMRerank(
+        llm=llm,
+        choice_batch_size=2,
+        top_n=4,
+        batch_timeout_sec=0.1,
+        max_retries=0,
+    )
+
+    ranked = rerank(reranker, retrieved_nodes(4))
+    assert [(n.node.node_id, n.score) for n in ranked] == [
+        ("node1", 9.0),
+        ("node0", 3.0),
+    ]
+
+
+def test_reranker_keeps_retrieval_order_when_all_batches_time_out():
+    llm = scripted_llm(None, None)
+    reranker = CustomLLMRerank(
+        llm=llm, choice_batch_size=2, top_n=3, batch_timeout_sec=0.1, max_retries=0
+    )
+
+    nodes = retrieved_nodes(4)
+    assert rerank(reranker, nodes) == nodes[:3]
+
+
+def test_reranker_retries_failed_batch():
+    llm = scripted_llm(RuntimeError("quota exceeded"), "Doc: 1, Relevance: 7")
+    reranker = CustomLLMRerank(
+        llm=llm, choice_batch_size=2, top_n=2, max_retries=1, retry_backoff_sec=0.01
+    )
+
+    ranked = rerank(reranker, retrieved_nodes(2))
+    assert llm.calls == 2
+    assert [(n.node.node_id, n.score) for n in ranked] == [("node0", 7.0)]
+
+
+def test_reranker_skips_cached_scores():
+    score_cache = {}
+    llm = scripted_llm("Doc: 2, Relevance: 8", "Doc: 1, Relevance: 6")
+    reranker = CustomLLMRerank(
+        llm=llm, choice_batch_size=2, top_n=4, score_cache=score_cache
+    )
+
+    first = rerank(reranker, retrieved_nodes(2))
+    model_name = llm.metadata.model_name
+    assert score_cache == {
+        (model_name, 0.0, "what is rag?", "node0"): None,
+        (model_name, 0.0, "what is rag?", "node1"): 8.0,
+    }
+
+    # Only the node not scored yet for this query is sent to the LLM
+    second = rerank(reranker, retrieved_nodes(3))
+    assert llm.calls == 2
+    assert [(n.node.node_id, n.score) for n in first] == [("node1", 8.0)]
+    assert [(n.node.node_id, n.score) for n in second] == [
+        ("node1", 8.0),
+        ("node2", 6.0),
+    ]
+
+
+def test_reranker_scores_cached_per_temperature():
+    score_cache = {}
+    for temperature, response in [(0.0, "Doc: 1, Relevance: 8"), (1.0, "")]:
+        llm = scripted_llm(response, temperature=temperature)
+        reranker = CustomLLMRerank(
+            llm=llm, choice_batch_size=2, top_n=2, score_cache=score_cache
+        )
+        ranked = rerank(reranker, retrieved_nodes(1))
+        # The scores of the other temperature are not reused
+        assert llm.calls == 1
+    assert ranked == []
@@ -0,0 +1,46 @@
+import asyncio
+
+from backend.rag.parent_retriever import ParentRetriever
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import (
+    NodeRelationship,
+    NodeWithScore,
+    RelatedNodeInfo,
+    TextNode,
+)
+from llama_index.core.storage.docstore import SimpleDocumentStore
+
+
+class StaticRetriever(BaseRetriever):
+    def __init__(self, nodes):
+        self._nodes = nodes
+        super().__init__()
+
+    def _retrieve(self, query_bundle):
+        return self._nodes
+
+
+def chunk(source_id, score):
+    node = TextNode(text=f"chunk of {source_id} {score}")
+    node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(node_id=source_id)
+    return NodeWithScore(node=node, score=score)
+
+
+def test_parent_retriever_averages_scores_per_source():
+    docstore = SimpleDocumentStore()
+    docstore.add_documents(
+        [TextNode(id_="doc1", text="first"), TextNode(id_="doc2", text="second")]
+    )
+    retriever = ParentRetriever(
+        StaticRetriever([chunk("doc1", 0.8), chunk("doc1", 0.4), chunk("doc2", 0.5)]),
+        docstore=docstore,
+    )
+
+    sync_scores = {n.node.node_id: n.score for n in retriever.retrieve("query")}
+    async_scores = {
+        n.node.node_id: n.score for n in asyncio.run(retriever.aretrieve("query"))
+    }
+
+    assert sync_scores == async_scores
+    assert abs(sync_scores["doc1"] - 0.6) < 1e-9
+    assert sync_scores["doc2"] == 0.5
@@ -0,0 +1,16 @@
+from backend.rag.prompts import Prompts
+
+
+def test_prompts_digest_follows_prompt_texts():
+    prompts = Prompts()
+    restarted = Prompts()
+    assert prompts.digest() == restarted.digest()
+
+    prompts.update("qa_prompt_tmpl", "Answer {query_str} from {context_str}")
+    restarted.update("hyde_prompt_tmpl", "Hypothetical answer: {context_str}")
+    # Both were edited once, only the digest tells them apart
+    assert prompts.version == restarted.version
+    assert prompts.digest() != restarted.digest()
+
+    prompts.update("qa_prompt_tmpl", Prompts().qa_prompt_tmpl)
+    assert prompts.digest() == Prompts().digest()
@@ -0,0 +1,67 @@
+import asyncio
+
+from backend.rag.query_engine_cache import QueryEngineCache
+
+
+def test_query_engine_cache_hits_and_evicts():
+    cache = QueryEngineCache(max_size=2)
+    builds = []
+
+    def factory(name):
+        def build():
+            builds.append(name)
+            return name
+
+        return build
+
+    assert cache.get_or_create("a", factory("a")) == "a"
+    assert cache.get_or_create("a", factory("a")) == "a"
+    cache.get_or_create("b", factory("b"))
+    cache.get_or_create("c", factory("c"))  # evicts "a"
+    cache.get_or_create("a", factory("a"))
+
+    assert builds == ["a", "b", "c", "a"]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+    assert stats["evictions"] == 2
+    assert stats["size"] == 2
+
+
+def test_query_engine_cache_invalidate():
+    cache = QueryEngineCache(max_size=2)
+    cache.get_or_create("a", lambda: object())
+    cache.invalidate()
+    assert cache.stats()["size"] == 0
+
+
+def test_query_engine_cache_per_event_loop():
+    cache = QueryEngineCache(max_size=4)
+
+    async def get_engine():
+        return cache.get_or_create("a", lambda: object())
+
+    loop = asyncio.new_event_loop()
+    engine = loop.run_until_complete(get_engine())
+    assert loop.run_until_complete(get_engine()) is engine
+    # Engines are not shared with other event loops or sync callers
+    assert asyncio.run(get_engine()) is not engine
+    assert cache.get_or_create("a", lambda: object()) is not engine
+    # The engine of the loop closed by asyncio.run was dropped
+    assert cache.stats()["size"] == 2
+
+    loop.close()
+    cache.get_or_create("b", lambda: object())
+    assert cache.stats()["size"] == 2
+
+
+def test_query_engine_cache_invalidate_during_build():
+    cache = QueryEngineCache(max_size=2)
+
+    def build():
+        cache.invalidate()
+        return "stale"
+
+    assert cache.get_or_create("a", build) == "stale"
+    assert cache.get_or_create("a", lambda: "fresh") == "fresh"
+    assert cache.get_or_create("a", lambda: "unused") == "fresh"
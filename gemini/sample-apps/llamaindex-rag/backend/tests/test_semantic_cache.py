@@ -0,0 +1,41 @@
+import asyncio
+
+from backend.rag.semantic_cache import SemanticResponseCache
+from llama_index.core.base.response.schema import Response
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import NodeWithScore, TextNode
+
+
+def test_semantic_cache_hits_by_text_and_embedding(tmp_path):
+    # MockEmbedding returns the same vector for every text
+    cache = SemanticResponseCache(
+        embed_model=MockEmbedding(embed_dim=8), persist_dir=str(tmp_path)
+    )
+    response = Response(
+        response="42",
+        source_nodes=[NodeWithScore(node=TextNode(text="context"), score=1.0)],
+    )
+
+    lookup = asyncio.run(cache.alookup("What were Q1 earnings?", "config-a"))
+    assert lookup.response is None
+    cache.put(lookup, response)
+
+    exact = asyncio.run(cache.alookup("  what were Q1 earnings? ", "config-a"))
+    similar = asyncio.run(cache.alookup("Q1 earnings please", "config-a"))
+    other_config = asyncio.run(cache.alookup("What were Q1 earnings?", "config-b"))
+    assert exact.response is response
+    assert similar.response is response
+    assert other_config.response is None
+
+    stats = cache.stats()
+    assert stats["exact_hits"] == 1
+    assert stats["semantic_hits"] == 1
+    assert stats["misses"] == 2
+
+    cache.persist()
+    reloaded = SemanticResponseCache(
+        embed_model=MockEmbedding(embed_dim=8), persist_dir=str(tmp_path)
+    )
+    hit = asyncio.run(reloaded.alookup("What were Q1 earnings?", "config-a"))
+    assert hit.response.response == "42"
+    assert hit.response.source_nodes[0].node.text == "context"
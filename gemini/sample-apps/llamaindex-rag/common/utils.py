@@ -17,6 +17,7 @@
 """
 GCP Download utilities
 """
+import json
 import logging
 import os
 import re
@@ -43,9 +44,18 @@ DATA_PATH = config["data_path"]
 
 
 class Blob:
-    def __init__(self, path: str, mimetype: str):
+    def __init__(
+        self,
+        path: str,
+        mimetype: str,
+        generation: int | None = None,
+        md5_hash: str | None = None,
+    ):
         self.path = path
         self.mimetype = mimetype
+        # Identify the version of the file for incremental re-indexing
+        self.generation = generation
+        self.md5_hash = md5_hash
 
 
 def download_blob(bucket_name, source_blob_name, destination_file_name):
@@ -178,6 +188,8 @@ def create_pdf_blob_list(bucket_name, prefix):
         Blob(
             path=f"gs://{bucket_name}/{blob.name}",
             mimetype=blob.content_type or "application/pdf",
+            generation=blob.generation,
+            md5_hash=blob.md5_hash,
         )
         for blob in blobs
         if blob.name.lower().endswith(".pdf")
@@ -199,6 +211,80 @@ def upload_directory_to_gcs(local_dir_path: str, bucket_name: str, prefix: str):
             print(f"File {local_file_path} uploaded to {gcs_blob_name}")
 
 
+def download_directory_from_gcs(bucket_name: str, prefix: str, local_dir_path: str):
+    """Download all blobs under prefix into local_dir_path, keeping relative paths"""
+    storage_client = storage.Client()
+    bucket = storage_client.bucket(bucket_name)
+    prefix = prefix.rstrip("/") + "/"
+
+    for blob in bucket.list_blobs(prefix=prefix):
+        relative_path = blob.name[len(prefix) :]
+        if not relative_path:
+            continue
+        local_file_path = os.path.join(local_dir_path, relative_path)
+        os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
+        blob.download_to_filename(local_file_path)
+        logger.info(f"Downloaded {blob.name} to {local_file_path}")
+
+
+def sync_directory_from_gcs(bucket_name: str, prefix: str, local_dir_path: str) -> bool:
+    """
+    Mirror the blobs under prefix into local_dir_path, downloading only blobs
+    whose generation differs from the local copy. The generations are kept
+    next to the directory in <local_dir_path>.gcs_generations.json. Files are
+    swapped in atomically, a file named manifest.json last, and files synced
+    before whose blob was deleted are removed. Returns whether any file
+    changed.
+    """
+    storage_client = storage.Client()
+    bucket = storage_client.bucket(bucket_name)
+    prefix = prefix.rstrip("/") + "/"
+    generations_path = f"{local_dir_path.rstrip('/')}.gcs_generations.json"
+
+    local_generations = {}
+    if os.path.exists(generations_path):
+        with open(generations_path) as f:
+            local_generations = json.load(f)
+    blobs = {
+        blob.name[len(prefix) :]: blob
+        for blob in bucket.list_blobs(prefix=prefix)
+        if blob.name != prefix
+    }
+    changed = [
+        relative_path
+        for relative_path, blob in blobs.items()
+        if local_generations.get(relative_path) != blob.generation
+        or not os.path.exists(os.path.join(local_dir_path, relative_path))
+    ]
+    changed.sort(key=lambda relative_path: relative_path == "manifest.json")
+    for relative_path in changed:
+        local_file_path = os.path.join(local_dir_path, relative_path)
+        os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
+        tmp_path = f"{local_file_path}.{os.getpid()}.tmp"
+        blobs[relative_path].download_to_filename(tmp_path)
+        os.replace(tmp_path, local_file_path)
+        logger.info(f"Downloaded {blobs[relative_path].name} to {local_file_path}")
+    deleted = [
+        relative_path
+        for relative_path in local_generations
+        if relative_path not in blobs
+        and os.path.exists(os.path.join(local_dir_path, relative_path))
+    ]
+    for relative_path in deleted:
+        os.remove(os.path.join(local_dir_path, relative_path))
+        logger.info(f"Removed {relative_path}, deleted from gs://{bucket_name}")
+
+    generations = {
+        relative_path: blob.generation for relative_path, blob in blobs.items()
+    }
+    if generations != local_generations:
+        os.makedirs(os.path.dirname(generations_path) or ".", exist_ok=True)
+        with open(f"{generations_path}.{os.getpid()}.tmp", "w") as f:
+            json.dump(generations, f)
+        os.replace(f"{generations_path}.{os.getpid()}.tmp", generations_path)
+    return bool(changed or deleted)
+
+
 def clean_text(text):
     """
     Clean and preprocess the extracted text.
@@ -2,6 +2,7 @@ import json
 import logging
 import os
 from tempfile import NamedTemporaryFile
+import time
 
 import altair as alt
 from google.cloud import storage
@@ -51,7 +52,7 @@ def upload_to_gcs(source_file_name, destination_blob_name):
 
 
 # Function to call the batch evaluation API
-def call_eval_batch_api(payload):
+def call_eval_batch_api(payload, poll_interval_sec=5):
     url = f"{config['fastapi_url']}/eval_batch"
     headers = {"accept": "application/json", "Content-Type": "application/json"}
 
@@ -60,19 +61,31 @@ def call_eval_batch_api(payload):
     cloud_logger.debug(f"Headers: {headers}")
 
     try:
-        response = requests.post(
-            url, json=payload, headers=headers, timeout=300
-        )  # 5-minute timeout
-        cloud_logger.debug(f"Response Status Code: {response.status_code}")
-        cloud_logger.debug(f"Response Content: {response.text}")
-
+        # The evaluation runs as a background job, poll it until it is done
+        response = requests.post(url, json=payload, headers=headers, timeout=60)
         response.raise_for_status()
-        return response.json()
+        job = response.json()
+        cloud_logger.debug(f"Started eval job {job['eval_uuid']}")
+
+        progress_bar = st.progress(0.0)
+        while job["status"] == "running":
+            time.sleep(poll_interval_sec)
+            response = requests.get(
+                f"{url}/{job['eval_uuid']}", headers=headers, timeout=60
+            )
+            response.raise_for_status()
+            job = response.json()
+            if job["total_rows"]:
+                progress_bar.progress(job["completed_rows"] / job["total_rows"])
+        cloud_logger.debug(f"Eval job finished with status {job['status']}")
+
+        if job["status"] == "failed":
+            st.error(f"Evaluation failed: {job['error']}")
+            return None
+        return job["result"]
     except requests.exceptions.Timeout:
         cloud_logger.error("Request timed out")
-        st.error(
-            "Request timed out. The batch operation might take longer than expected."
-        )
+        st.error("Request timed out.")
     except requests.exceptions.HTTPError as err:
         cloud_logger.error(f"HTTP error occurred: {err}")
         st.error(f"HTTP error occurred: {err}")
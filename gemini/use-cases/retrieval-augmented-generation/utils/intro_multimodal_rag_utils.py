@@ -1,13 +1,21 @@
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 import glob
+import json
+import operator
 import os
+import random
+import re
+import threading
 import time
 from typing import Any
+import weakref
 
 from IPython.display import display
 import PIL
 from colorama import Fore, Style
 import fitz
+from google.api_core import exceptions as core_exceptions
 import numpy as np
 import pandas as pd
 from vertexai.generative_models import (
@@ -56,6 +64,139 @@ def get_text_embedding_from_text_embedding_model(
     return text_embedding
 
 
+# Request limits of the text embedding model. Token counts are estimated
+# conservatively from the number of characters.
+TEXT_EMBEDDING_MAX_BATCH_SIZE = 250
+TEXT_EMBEDDING_MAX_BATCH_TOKENS = 20000
+CHARS_PER_TOKEN_ESTIMATE = 3
+
+
+def get_text_embeddings_from_text_embedding_model(texts: list[str]) -> list[list]:
+    """
+    Generates text embeddings for a batch of texts in a single request to the text embedding model.
+
+    Args:
+        texts: The input text strings to be embedded.
+
+    Returns:
+        list: The embedding of each text, in the order of the texts.
+    """
+    try:
+        embeddings = text_embedding_model.get_embeddings(texts)
+    except core_exceptions.InvalidArgument:
+        # The request exceeded the model limits, retry it in halves
+        if len(texts) == 1:
+            raise
+        half = len(texts) // 2
+        return get_text_embeddings_from_text_embedding_model(
+            texts[:half]
+        ) + get_text_embeddings_from_text_embedding_model(texts[half:])
+
+    return [embedding.values for embedding in embeddings]
+
+
+class TextEmbeddingBatcher:
+    """
+    Groups texts into text embedding requests of up to `max_batch_size` texts and an estimated
+    `max_batch_tokens` tokens, and maps the embeddings back to the texts. Identical texts are
+    embedded once. The batcher is meant to be used from a single thread.
+
+    Args:
+        submit_batch: A function starting the embedding of a batch of texts, returning a Future
+            of the list of their embeddings.
+        max_batch_size: The maximum number of texts per request.
+        max_batch_tokens: The maximum number of estimated tokens per request.
+    """
+
+    def __init__(
+        self,
+        submit_batch: Callable[[list[str]], Future],
+        max_batch_size: int = TEXT_EMBEDDING_MAX_BATCH_SIZE,
+        max_batch_tokens: int = TEXT_EMBEDDING_MAX_BATCH_TOKENS,
+    ):
+        self.submit_batch = submit_batch
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.num_texts = 0
+        self.num_requests = 0
+        self._futures: dict[str, Future] = {}
+        self._pending: list[str] = []
+        self._pending_tokens = 0
+
+    def add(self, text: str) -> Future:
+        """Adds a text to the current batch, returning a Future of its embedding."""
+        self.num_texts += 1
+        if text in self._futures:
+            return self._futures[text]
+
+        tokens = len(text) // CHARS_PER_TOKEN_ESTIMATE + 1
+        if self._pending and (
+            len(self._pending) >= self.max_batch_size
+            or self._pending_tokens + tokens > self.max_batch_tokens
+        ):
+            self.flush()
+
+        future: Future = Future()
+        self._futures[text] = future
+        self._pending.append(text)
+        self._pending_tokens += tokens
+        return future
+
+    def flush(self) -> None:
+        """Submits the current batch."""
+        if not self._pending:
+            return
+
+        texts = self._pending
+        futures = [self._futures[text] for text in texts]
+        self._pending, self._pending_tokens = [], 0
+        self.num_requests += 1
+
+        def set_embeddings(batch: Future) -> None:
+            # Exceptions raised by a done callback are only logged, every
+            # future has to be resolved here or its result() never returns
+            try:
+                embeddings = batch.result()
+                if len(embeddings) != len(futures):
+                    raise ValueError(
+                        f"Expected {len(futures)} embeddings, got {len(embeddings)}"
+                    )
+            except BaseException as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+            for future, embedding in zip(futures, embeddings):
+                future.set_result(embedding)
+
+        self.submit_batch(texts).add_done_callback(set_embeddings)
+
+
+def get_text_embeddings_in_batches(texts: list[str]) -> list[list]:
+    """
+    Generates text embeddings for any number of texts with as few requests to the text
+    embedding model as its limits allow.
+
+    Args:
+        texts: The input text strings to be embedded.
+
+    Returns:
+        list: The embedding of each text, in the order of the texts.
+    """
+
+    def embed_batch(batch: list[str]) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(get_text_embeddings_from_text_embedding_model(batch))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    batcher = TextEmbeddingBatcher(embed_batch)
+    futures = [batcher.add(text) for text in texts]
+    batcher.flush()
+    return [future.result() for future in futures]
+
+
 def get_image_embedding_from_multimodal_embedding_model(
     image_uri: str,
     embedding_size: int = 512,
@@ -86,6 +227,86 @@ def get_image_embedding_from_multimodal_embedding_model(
     return embeddings.image_embedding
 
 
+# Chunk boundaries, from the most to the least preferred: the end of a paragraph
+# or a sentence, then the end of a word
+SENTENCE_BOUNDARY = re.compile(
+    r"\n\s*\n|[.!?][\"')\]\u201d\u2019]*\s+|[\u3002\uff01\uff1f]\s*"
+)
+TOKEN_BOUNDARY = re.compile(r"\s+")
+
+
+def find_chunk_end(text: str, start: int, end: int) -> int:
+    """
+    Moves the end of a chunk back to the last sentence boundary, or else the last word boundary,
+    in the second half of the chunk. Keeps the end if there is neither.
+
+    Args:
+        text: The text being chunked.
+        start: The offset of the start of the chunk.
+        end: The offset of the end of the chunk at its maximum length.
+
+    Returns:
+        The offset of the end of the chunk.
+    """
+
+    for boundary in [SENTENCE_BOUNDARY, TOKEN_BOUNDARY]:
+        boundary_end = None
+        for match in boundary.finditer(text, start + (end - start) // 2, end):
+            boundary_end = match.end()
+        if boundary_end:
+            return boundary_end
+    return end
+
+
+def iter_text_chunk_spans(
+    text: str, character_limit: int = 1000, overlap: int = 100
+) -> Iterator[tuple[int, int]]:
+    """
+    Streams overlapping chunks of a text as (offset, length) spans, without copying the text.
+
+    Chunks end at sentence boundaries where possible, or else at word boundaries, and the overlap
+    with the previous chunk starts at a word. Leading and trailing whitespace is left out of the chunks.
+
+    Args:
+        text: The text document to be chunked.
+        character_limit: Maximum characters per chunk (defaults to 1000).
+        overlap: Maximum number of overlapping characters between chunks (defaults to 100).
+
+    Yields:
+        The offset and length of each chunk in the text.
+
+    Raises:
+        ValueError: If `overlap` is greater than `character_limit`.
+    """
+
+    if overlap > character_limit:
+        raise ValueError("Overlap cannot be larger than character limit.")
+
+    match = TOKEN_BOUNDARY.match(text)
+    start = match.end() if match else 0
+    while start < len(text):
+        end = min(start + character_limit, len(text))
+        if end < len(text):
+            end = find_chunk_end(text, start, end)
+
+        length = end - start
+        while length and text[start + length - 1].isspace():
+            length -= 1
+        if length:
+            yield start, length
+
+        if end >= len(text):
+            break
+
+        # Start the next chunk at the first word of the overlap
+        next_start = max(end - overlap, start + 1)
+        if next_start < end and not text[next_start - 1].isspace():
+            match = TOKEN_BOUNDARY.search(text, next_start, end)
+            next_start = match.end() if match else end
+        match = TOKEN_BOUNDARY.match(text, next_start)
+        start = match.end() if match else next_start
+
+
 def get_text_overlapping_chunk(
     text: str, character_limit: int = 1000, overlap: int = 100
 ) -> dict:
@@ -94,10 +315,12 @@ def get_text_overlapping_chunk(
     * Takes a text document, character limit per chunk, and overlap between chunks as input.
     * Returns a dictionary where the keys are chunk numbers and the values are the corresponding text chunks.
 
+    Chunks end at sentence or word boundaries and keep non-ASCII text, see `iter_text_chunk_spans`.
+
     Args:
         text: The text document to be chunked.
         character_limit: Maximum characters per chunk (defaults to 1000).
-        overlap: Number of overlapping characters between chunks (defaults to 100).
+        overlap: Maximum number of overlapping characters between chunks (defaults to 100).
 
     Returns:
         A dictionary where keys are chunk numbers and values are the corresponding text chunks.
@@ -107,27 +330,12 @@ def get_text_overlapping_chunk(
 
     """
 
-    if overlap > character_limit:
-        raise ValueError("Overlap cannot be larger than character limit.")
-
-    # Initialize variables
-    chunk_number = 1
-    chunked_text_dict = {}
-
-    # Iterate over text with the given limit and overlap
-    for i in range(0, len(text), character_limit - overlap):
-        end_index = min(i + character_limit, len(text))
-        chunk = text[i:end_index]
-
-        # Encode and decode for consistent encoding
-        chunked_text_dict[chunk_number] = chunk.encode("ascii", "ignore").decode(
-            "utf-8", "ignore"
+    return {
+        chunk_number: text[offset : offset + length]
+        for chunk_number, (offset, length) in enumerate(
+            iter_text_chunk_spans(text, character_limit, overlap), start=1
         )
-
-        # Increment chunk number
-        chunk_number += 1
-
-    return chunked_text_dict
+    }
 
 
 def get_page_text_embedding(text_data: dict | str) -> dict:
@@ -151,11 +359,9 @@ def get_page_text_embedding(text_data: dict | str) -> dict:
         return embeddings_dict
 
     if isinstance(text_data, dict):
-        # Process each chunk
-        for chunk_number, chunk_value in text_data.items():
-            embeddings_dict[chunk_number] = (
-                get_text_embedding_from_text_embedding_model(text=chunk_value)
-            )
+        # Process the chunks in batches
+        embeddings = get_text_embeddings_in_batches(list(text_data.values()))
+        embeddings_dict = dict(zip(text_data, embeddings))
     else:
         # Process the first 1000 characters of the page text
         embeddings_dict["text_embedding"] = (
@@ -166,7 +372,7 @@ def get_page_text_embedding(text_data: dict | str) -> dict:
 
 
 def get_chunk_text_metadata(
-    page: fitz.Page,
+    page: fitz.Page | str,
     character_limit: int = 1000,
     overlap: int = 100,
     embedding_size: int = 128,
@@ -177,9 +383,9 @@ def get_chunk_text_metadata(
     * Returns the extracted text, the chunked text dictionary, and the chunk embeddings dictionary.
 
     Args:
-        page: The fitz.Page object to process.
+        page: The fitz.Page object to process, or the text already extracted from it.
         character_limit: Maximum characters per chunk (defaults to 1000).
-        overlap: Number of overlapping characters between chunks (defaults to 100).
+        overlap: Maximum number of overlapping characters between chunks (defaults to 100).
         embedding_size: Size of the embedding vector (defaults to 128).
 
     Returns:
@@ -197,33 +403,38 @@ def get_chunk_text_metadata(
     if overlap > character_limit:
         raise ValueError("Overlap cannot be larger than character limit.")
 
-    # Extract text from the page
-    text: str = page.get_text().encode("ascii", "ignore").decode("utf-8", "ignore")
-
-    # Get whole-page text embeddings
-    page_text_embeddings_dict: dict = get_page_text_embedding(text)
+    # Extract text from the page, unless the caller already did
+    text: str = page if isinstance(page, str) else page.get_text()
 
     # Chunk the text with the given limit and overlap
     chunked_text_dict: dict = get_text_overlapping_chunk(text, character_limit, overlap)
 
-    # Get embeddings for the chunks
-    chunk_embeddings_dict: dict = get_page_text_embedding(chunked_text_dict)
+    # Get whole-page and chunk text embeddings in batched requests
+    page_texts = [text] if text else []
+    embeddings = get_text_embeddings_in_batches(
+        page_texts + list(chunked_text_dict.values())
+    )
+    page_text_embeddings_dict: dict = (
+        {"text_embedding": embeddings[0]} if page_texts else {}
+    )
+    chunk_embeddings_dict: dict = dict(
+        zip(chunked_text_dict, embeddings[len(page_texts) :])
+    )
 
     # Return all extracted data
     return text, page_text_embeddings_dict, chunked_text_dict, chunk_embeddings_dict
 
 
-def get_image_for_gemini(
+def save_pdf_image(
     doc: fitz.Document,
     image: tuple,
     image_no: int,
     image_save_dir: str,
     file_name: str,
     page_num: int,
-) -> tuple[Image, str]:
+) -> str:
     """
-    Extracts an image from a PDF document, converts it to JPEG format, saves it to a specified directory,
-    and loads it as a PIL Image Object.
+    Extracts an image from a PDF document and saves it to a specified directory.
 
     Parameters:
     - doc (fitz.Document): The PDF document from which the image is extracted.
@@ -234,7 +445,7 @@ def get_image_for_gemini(
     - page_num (int): The page number from which the image is extracted.
 
     Returns:
-    - Tuple[Image.Image, str]: A tuple containing the Gemini Image object and the image filename.
+    - str: The image filename.
     """
 
     # Extract the image from the document
@@ -253,6 +464,37 @@ def get_image_for_gemini(
     # Save the image to the specified location
     pix.save(image_name)
 
+    return image_name
+
+
+def get_image_for_gemini(
+    doc: fitz.Document,
+    image: tuple,
+    image_no: int,
+    image_save_dir: str,
+    file_name: str,
+    page_num: int,
+) -> tuple[Image, str]:
+    """
+    Extracts an image from a PDF document, converts it to JPEG format, saves it to a specified directory,
+    and loads it as a PIL Image Object.
+
+    Parameters:
+    - doc (fitz.Document): The PDF document from which the image is extracted.
+    - image (tuple): A tuple containing image information.
+    - image_no (int): The image number for naming purposes.
+    - image_save_dir (str): The directory where the image will be saved.
+    - file_name (str): The base name for the image file.
+    - page_num (int): The page number from which the image is extracted.
+
+    Returns:
+    - Tuple[Image.Image, str]: A tuple containing the Gemini Image object and the image filename.
+    """
+
+    image_name = save_pdf_image(
+        doc, image, image_no, image_save_dir, file_name, page_num
+    )
+
     # Load the saved image as a Gemini Image Object
     image_for_gemini = Image.load_from_file(image_name)
 
@@ -387,6 +629,138 @@ def get_image_metadata_df(
     return return_df
 
 
+# Functions for concurrent document ingestion
+
+# Default requests per minute of each model, lower these to match the quotas
+# of your project
+DEFAULT_REQUESTS_PER_MINUTE = {
+    "gemini": 60,
+    "text_embedding": 600,
+    "multimodal_embedding": 120,
+}
+
+# Errors worth retrying: quota exhaustion (429) and unavailable service (503)
+RETRYABLE_ERRORS = (
+    core_exceptions.TooManyRequests,
+    core_exceptions.ServiceUnavailable,
+)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Allows `requests_per_minute` requests per minute on average, with bursts of
+    up to `capacity` requests (defaults to one second of requests).
+    """
+
+    def __init__(self, requests_per_minute: float, capacity: int | None = None):
+        self.rate = requests_per_minute / 60
+        self.capacity = capacity or max(1, int(self.rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Blocks until a request is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def call_with_retry(
+    function: Callable,
+    *args: Any,
+    rate_limiter: TokenBucket | None = None,
+    max_retries: int = 5,
+    initial_backoff: float = 1.0,
+    max_backoff: float = 60.0,
+    **kwargs: Any,
+) -> Any:
+    """
+    Calls a model API function, waiting for the rate limiter before each attempt and retrying
+    quota (429) and unavailable (503) errors with exponential backoff and full jitter.
+
+    Args:
+        function: The function to call.
+        *args: Positional arguments for the function.
+        rate_limiter: An optional TokenBucket to acquire before each attempt.
+        max_retries: The maximum number of retries.
+        initial_backoff: The maximum delay in seconds before the first retry, doubled for every retry.
+        max_backoff: The maximum delay in seconds between retries.
+        **kwargs: Keyword arguments for the function.
+
+    Returns:
+        The return value of the function.
+
+    Raises:
+        The last error of the function once the retries are exhausted.
+    """
+
+    for attempt in range(max_retries + 1):
+        if rate_limiter:
+            rate_limiter.acquire()
+        try:
+            return function(*args, **kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = random.uniform(0, min(max_backoff, initial_backoff * 2**attempt))
+            print(
+                f"{type(e).__name__} in {function.__name__}, retrying in {delay:.1f} sec"
+            )
+            time.sleep(delay)
+
+
+def extract_pdf_pages(
+    pdf_path: str, page_nums: list[int], image_save_dir: str
+) -> list[dict]:
+    """
+    Extracts the text of PDF pages and saves their images. Runs in a worker process of
+    `get_document_metadata`, so it opens the document itself.
+
+    Args:
+        pdf_path: The path to the PDF document.
+        page_nums: The zero-based numbers of the pages to extract.
+        image_save_dir: The directory where extracted images should be saved.
+
+    Returns:
+        A list with a dictionary for each page, containing the page number, the page text,
+        and the file names of the saved images of the page.
+    """
+
+    doc: fitz.Document = fitz.open(pdf_path)
+    file_name = pdf_path.split("/")[-1]
+
+    pages = []
+    for page_num in page_nums:
+        page = doc[page_num]
+        pages.append(
+            {
+                "page_num": page_num,
+                "text": page.get_text(),
+                "image_names": [
+                    save_pdf_image(
+                        doc, image, image_no, image_save_dir, file_name, page_num
+                    )
+                    for image_no, image in enumerate(page.get_images())
+                ],
+            }
+        )
+
+    doc.close()
+    return pages
+
+
 def get_document_metadata(
     generative_multimodal_model,
     pdf_folder_path: str,
@@ -404,16 +778,33 @@ def get_document_metadata(
     },
     add_sleep_after_page: bool = False,
     sleep_time_after_page: int = 2,
+    max_workers: int = 16,
+    page_workers: int | None = 0,
+    pages_per_task: int = 8,
+    requests_per_minute: dict[str, float] | None = None,
+    max_retries: int = 5,
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     This function takes a PDF path, an image save directory, an image description prompt, an embedding size, and a text embedding text limit as input.
 
+    Pages are extracted in a background thread while the Gemini and embedding calls run in a thread pool.
+    The calls are rate limited per model with a token bucket and retried with backoff on quota errors.
+
     Args:
         pdf_path: The path to the PDF document.
         image_save_dir: The directory where extracted images should be saved.
         image_description_prompt: A prompt to guide Gemini for generating image descriptions.
         embedding_size: The dimensionality of the embedding vectors.
-        text_emb_text_limit: The maximum number of tokens for text embedding.
+        add_sleep_after_page: Deprecated, calls are rate limited with `requests_per_minute` instead.
+        sleep_time_after_page: Deprecated, calls are rate limited with `requests_per_minute` instead.
+        max_workers: The maximum number of concurrent model calls.
+        page_workers: The number of processes extracting pages, None for one per CPU. With 0 (the
+            default), pages are extracted in a single background thread. Processes are opt-in: they
+            are forked after the module created its gRPC clients, or import it again under spawn.
+        pages_per_task: The number of pages extracted by each page worker task.
+        requests_per_minute: Requests per minute for "gemini", "text_embedding" and
+            "multimodal_embedding" calls, overriding `DEFAULT_REQUESTS_PER_MINUTE`.
+        max_retries: The maximum number of retries of a model call on quota errors.
 
     Returns:
         A tuple containing two DataFrames:
@@ -421,108 +812,189 @@ def get_document_metadata(
             * Another DataFrame containing the extracted image metadata for each image in the PDF, including the image path, image description, image embeddings (with and without context), and image description text embedding.
     """
 
-    text_metadata_df_final, image_metadata_df_final = pd.DataFrame(), pd.DataFrame()
-
-    for pdf_path in glob.glob(pdf_folder_path + "/*.pdf"):
+    if add_sleep_after_page:
         print(
-            "\n\n",
-            "Processing the file: ---------------------------------",
-            pdf_path,
-            "\n\n",
+            "add_sleep_after_page is deprecated, model calls are rate limited with requests_per_minute"
         )
 
-        # Open the PDF file
-        doc: fitz.Document = fitz.open(pdf_path)
-
-        file_name = pdf_path.split("/")[-1]
-
-        text_metadata: dict[int | str, dict] = {}
-        image_metadata: dict[int | str, dict] = {}
-
-        for page_num, page in enumerate(doc):
-            print(f"Processing page: {page_num + 1}")
-
-            text = page.get_text()
-            (
-                text,
-                page_text_embeddings_dict,
-                chunked_text_dict,
-                chunk_embeddings_dict,
-            ) = get_chunk_text_metadata(page, embedding_size=embedding_size)
-
-            text_metadata[page_num] = {
-                "text": text,
-                "page_text_embeddings": page_text_embeddings_dict,
-                "chunked_text_dict": chunked_text_dict,
-                "chunk_embeddings_dict": chunk_embeddings_dict,
-            }
-
-            images = page.get_images()
-            image_metadata[page_num] = {}
+    rate_limiters = {
+        model: TokenBucket(rate)
+        for model, rate in {
+            **DEFAULT_REQUESTS_PER_MINUTE,
+            **(requests_per_minute or {}),
+        }.items()
+    }
+
+    def call_model(model: str, function: Callable, *args: Any, **kwargs: Any) -> Any:
+        return call_with_retry(
+            function,
+            *args,
+            rate_limiter=rate_limiters[model],
+            max_retries=max_retries,
+            **kwargs,
+        )
 
-            for image_no, image in enumerate(images):
-                image_number = int(image_no + 1)
-                image_metadata[page_num][image_number] = {}
+    def describe_image(image_name: str) -> tuple[str, list]:
+        response = call_model(
+            "gemini",
+            get_gemini_response,
+            generative_multimodal_model,
+            model_input=[image_description_prompt, Image.load_from_file(image_name)],
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+            stream=True,
+        )
+        image_description_text_embedding = call_model(
+            "text_embedding",
+            get_text_embedding_from_text_embedding_model,
+            text=response,
+        )
+        return response, image_description_text_embedding
 
-                image_for_gemini, image_name = get_image_for_gemini(
-                    doc, image, image_no, image_save_dir, file_name, page_num
-                )
+    text_metadata_dfs: list[pd.DataFrame] = []
+    image_metadata_dfs: list[pd.DataFrame] = []
 
-                print(
-                    f"Extracting image from page: {page_num + 1}, saved as: {image_name}"
+    page_pool = (
+        ProcessPoolExecutor(page_workers)
+        if page_workers != 0
+        else ThreadPoolExecutor(1)
+    )
+    with page_pool, ThreadPoolExecutor(max_workers) as api_pool:
+        # Extract the pages of all documents up front, in batches of pages
+        page_tasks: dict[str, list[Future]] = {}
+        for pdf_path in glob.glob(pdf_folder_path + "/*.pdf"):
+            with fitz.open(pdf_path) as doc:
+                page_count = doc.page_count
+            page_tasks[pdf_path] = [
+                page_pool.submit(
+                    extract_pdf_pages,
+                    pdf_path,
+                    list(range(start, min(start + pages_per_task, page_count))),
+                    image_save_dir,
                 )
+                for start in range(0, page_count, pages_per_task)
+            ]
 
-                response = get_gemini_response(
-                    generative_multimodal_model,
-                    model_input=[image_description_prompt, image_for_gemini],
-                    generation_config=generation_config,
-                    safety_settings=safety_settings,
-                    stream=True,
-                )
+        # Page and chunk texts of all documents are embedded in batched requests
+        text_embedding_batcher = TextEmbeddingBatcher(
+            lambda texts: api_pool.submit(
+                call_model,
+                "text_embedding",
+                get_text_embeddings_from_text_embedding_model,
+                texts,
+            )
+        )
 
-                image_embedding = get_image_embedding_from_multimodal_embedding_model(
-                    image_uri=image_name,
-                    embedding_size=embedding_size,
-                )
+        # Submit the model calls of each batch of pages as soon as it is extracted
+        document_tasks: dict[str, list[dict]] = {}
+        for pdf_path, tasks in page_tasks.items():
+            print(
+                "\n\n",
+                "Processing the file: ---------------------------------",
+                pdf_path,
+                "\n\n",
+            )
+            document_tasks[pdf_path] = []
+            for task in tasks:
+                for page in task.result():
+                    print(f"Processing page: {page['page_num'] + 1}")
+                    chunked_text_dict = get_text_overlapping_chunk(page["text"])
+                    document_tasks[pdf_path].append(
+                        {
+                            **page,
+                            "chunked_text_dict": chunked_text_dict,
+                            "page_text_embedding": (
+                                text_embedding_batcher.add(page["text"])
+                                if page["text"]
+                                else None
+                            ),
+                            "chunk_embeddings": {
+                                chunk_number: text_embedding_batcher.add(chunk_value)
+                                for chunk_number, chunk_value in chunked_text_dict.items()
+                            },
+                            "image_descriptions": [
+                                api_pool.submit(describe_image, image_name)
+                                for image_name in page["image_names"]
+                            ],
+                            "image_embeddings": [
+                                api_pool.submit(
+                                    call_model,
+                                    "multimodal_embedding",
+                                    get_image_embedding_from_multimodal_embedding_model,
+                                    image_uri=image_name,
+                                    embedding_size=embedding_size,
+                                )
+                                for image_name in page["image_names"]
+                            ],
+                        }
+                    )
 
-                image_description_text_embedding = (
-                    get_text_embedding_from_text_embedding_model(text=response)
-                )
+        text_embedding_batcher.flush()
+        print(
+            f"Embedding {text_embedding_batcher.num_texts} page and chunk texts "
+            f"in {text_embedding_batcher.num_requests} requests"
+        )
 
-                image_metadata[page_num][image_number] = {
-                    "img_num": image_number,
-                    "img_path": image_name,
-                    "img_desc": response,
-                    # "mm_embedding_from_text_desc_and_img": image_embedding_with_description,
-                    "mm_embedding_from_img_only": image_embedding,
-                    "text_embedding_from_image_description": image_description_text_embedding,
+        # Collect the results in document and page order
+        for pdf_path, pages in document_tasks.items():
+            file_name = pdf_path.split("/")[-1]
+
+            text_metadata: dict[int | str, dict] = {}
+            image_metadata: dict[int | str, dict] = {}
+
+            for page in pages:
+                page_num = page["page_num"]
+                text_metadata[page_num] = {
+                    "text": page["text"],
+                    "page_text_embeddings": (
+                        {"text_embedding": page["page_text_embedding"].result()}
+                        if page["page_text_embedding"]
+                        else {}
+                    ),
+                    "chunked_text_dict": page["chunked_text_dict"],
+                    "chunk_embeddings_dict": {
+                        chunk_number: embedding.result()
+                        for chunk_number, embedding in page["chunk_embeddings"].items()
+                    },
                 }
 
-            # Add sleep to reduce issues with Quota error on API
-            if add_sleep_after_page:
-                time.sleep(sleep_time_after_page)
-                print(
-                    "Sleeping for ",
-                    sleep_time_after_page,
-                    """ sec before processing the next page to avoid quota issues. You can disable it: "add_sleep_after_page = False"  """,
+                image_metadata[page_num] = {}
+                for image_no, image_name in enumerate(page["image_names"]):
+                    image_number = int(image_no + 1)
+                    response, image_description_text_embedding = page[
+                        "image_descriptions"
+                    ][image_no].result()
+
+                    image_metadata[page_num][image_number] = {
+                        "img_num": image_number,
+                        "img_path": image_name,
+                        "img_desc": response,
+                        # "mm_embedding_from_text_desc_and_img": image_embedding_with_description,
+                        "mm_embedding_from_img_only": page["image_embeddings"][
+                            image_no
+                        ].result(),
+                        "text_embedding_from_image_description": image_description_text_embedding,
+                    }
+
+            text_metadata_dfs.append(get_text_metadata_df(file_name, text_metadata))
+            image_metadata_dfs.append(
+                get_image_metadata_df(file_name, image_metadata).drop_duplicates(
+                    subset=["img_desc"]
                 )
+            )
+            print(f"Processed the file: {pdf_path}")
 
-        text_metadata_df = get_text_metadata_df(file_name, text_metadata)
-        image_metadata_df = get_image_metadata_df(file_name, image_metadata)
-
-        text_metadata_df_final = pd.concat(
-            [text_metadata_df_final, text_metadata_df], axis=0
-        )
-        image_metadata_df_final = pd.concat(
-            [
-                image_metadata_df_final,
-                image_metadata_df.drop_duplicates(subset=["img_desc"]),
-            ],
-            axis=0,
-        )
-
-        text_metadata_df_final = text_metadata_df_final.reset_index(drop=True)
-        image_metadata_df_final = image_metadata_df_final.reset_index(drop=True)
+    # Build the final DataFrames once, instead of growing them for every file
+    text_metadata_df_final = (
+        pd.concat(text_metadata_dfs, axis=0).reset_index(drop=True)
+        if text_metadata_dfs
+        else pd.DataFrame()
+    )
+    image_metadata_df_final = (
+        pd.concat(image_metadata_dfs, axis=0).reset_index(drop=True)
+        if image_metadata_dfs
+        else pd.DataFrame()
+    )
 
     return text_metadata_df_final, image_metadata_df_final
 
@@ -582,6 +1054,418 @@ def get_cosine_score(
     return round(np.dot(dataframe[column_name], input_text_embed), 2)
 
 
+# Matrix-based similarity search
+
+# Embedding matrices compiled from metadata DataFrames, keyed by the id of the
+# DataFrame and the embedding column, and dropped with the DataFrame. Each
+# entry keeps the embedding objects it was compiled from, so their identity
+# tells whether the column was reassigned since.
+_embedding_matrix_cache: dict[tuple[int, str], tuple] = {}
+
+
+def build_embedding_matrix(
+    dataframe: pd.DataFrame, column_name: str
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compiles an embedding column of a metadata DataFrame into a contiguous,
+    L2-normalized float32 matrix.
+
+    Args:
+        dataframe: The pandas DataFrame containing the embeddings.
+        column_name: The name of the column containing the embeddings.
+
+    Returns:
+        A tuple containing:
+            - The embedding matrix, one row per embedding.
+            - The positional index in the DataFrame of each matrix row. Rows
+              without an embedding of the common dimension are left out.
+    """
+
+    embeddings = dataframe[column_name].tolist()
+    dims = [
+        len(embedding) if isinstance(embedding, (list, np.ndarray)) else 0
+        for embedding in embeddings
+    ]
+    dim = max(set(dims) - {0}, key=dims.count, default=0)
+    rows = np.array(
+        [row for row, d in enumerate(dims) if d == dim and dim > 0], dtype=np.int64
+    )
+
+    matrix = np.zeros((len(rows), dim), dtype=np.float32)
+    for i, row in enumerate(rows):
+        matrix[i] = embeddings[row]
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms > 0, norms, 1)
+    return matrix, rows
+
+
+def get_embedding_matrix(
+    dataframe: pd.DataFrame, column_name: str
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the embedding matrix of a DataFrame column, compiling it with
+    `build_embedding_matrix` on first use and reusing it for later queries
+    against the same DataFrame. The matrix is compiled again once the column
+    holds other embedding objects (e.g. after re-embedding), embeddings
+    modified in place are not detected.
+
+    Args:
+        dataframe: The pandas DataFrame containing the embeddings.
+        column_name: The name of the column containing the embeddings.
+
+    Returns:
+        The embedding matrix and the positional index of each of its rows.
+    """
+
+    key = (id(dataframe), column_name)
+    cached = _embedding_matrix_cache.get(key)
+    if cached is not None:
+        dataframe_ref, embeddings, matrix, rows = cached
+        current_embeddings = dataframe[column_name].tolist()
+        if (
+            dataframe_ref() is dataframe
+            and len(embeddings) == len(current_embeddings)
+            and all(map(operator.is_, embeddings, current_embeddings))
+        ):
+            return matrix, rows
+
+    matrix, rows = build_embedding_matrix(dataframe, column_name)
+    set_embedding_matrix(dataframe, column_name, matrix, rows)
+    return matrix, rows
+
+
+def set_embedding_matrix(
+    dataframe: pd.DataFrame, column_name: str, matrix: np.ndarray, rows: np.ndarray
+) -> None:
+    """
+    Registers a precompiled embedding matrix of a DataFrame column for `get_embedding_matrix`,
+    for example a memory-mapped matrix of a saved index.
+
+    Args:
+        dataframe: The pandas DataFrame containing the embeddings.
+        column_name: The name of the column containing the embeddings.
+        matrix: The L2-normalized float32 embedding matrix.
+        rows: The positional index in the DataFrame of each matrix row.
+    """
+
+    key = (id(dataframe), column_name)
+    if key not in _embedding_matrix_cache:
+        weakref.finalize(dataframe, _embedding_matrix_cache.pop, key, None)
+    _embedding_matrix_cache[key] = (
+        weakref.ref(dataframe),
+        dataframe[column_name].tolist(),
+        matrix,
+        rows,
+    )
+
+
+def get_cosine_scores(
+    embedding_matrix: np.ndarray, query_embeddings: np.ndarray | list
+) -> np.ndarray:
+    """
+    Calculates the cosine similarity between query embeddings and every row of
+    an embedding matrix with a single matrix product.
+
+    Args:
+        embedding_matrix: An L2-normalized matrix from `get_embedding_matrix`.
+        query_embeddings: A query embedding, or a sequence of query embeddings.
+
+    Returns:
+        A (number of queries, number of rows) array of cosine similarity scores,
+        rounded to two decimal places.
+    """
+
+    queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+    norms = np.linalg.norm(queries, axis=1, keepdims=True)
+    queries = queries / np.where(norms > 0, norms, 1)
+    if not len(embedding_matrix):
+        return np.empty((len(queries), 0))
+    return np.round((queries @ embedding_matrix.T).astype(np.float64), 2)
+
+
+def get_top_n_indices(scores: np.ndarray, top_n: int) -> np.ndarray:
+    """
+    Returns the indices of the top N scores, highest first. Equal scores are
+    ordered by index, like `pd.Series.nlargest`, and NaN scores are skipped.
+
+    Args:
+        scores: A one-dimensional array of scores.
+        top_n: The number of indices to return.
+
+    Returns:
+        An array with the indices of up to top_n of the highest scores.
+    """
+
+    candidates = np.flatnonzero(~np.isnan(scores))
+    if top_n <= 0:
+        return candidates[:0]
+    if top_n < len(candidates):
+        # Keep every score tied with the Nth highest, ties are broken below
+        nth = np.argpartition(scores[candidates], -top_n)[-top_n]
+        candidates = candidates[scores[candidates] >= scores[candidates][nth]]
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:top_n]]
+
+
+# Functions for saving and loading the multimodal index
+
+INDEX_FORMAT_VERSION = 1
+INDEX_MANIFEST_FILE_NAME = "manifest.json"
+INDEX_TABLES = ("text", "image")
+
+
+def get_embedding_columns(dataframe: pd.DataFrame) -> list[str]:
+    """
+    Finds the embedding columns of a metadata DataFrame, the columns holding lists or arrays.
+
+    Args:
+        dataframe: The pandas DataFrame containing the metadata.
+
+    Returns:
+        The names of the embedding columns.
+    """
+
+    if dataframe.empty:
+        return []
+    return [
+        column
+        for column in dataframe.columns
+        if isinstance(dataframe[column].iloc[0], (list, np.ndarray))
+    ]
+
+
+def read_index_manifest(index_dir: str) -> dict:
+    """
+    Reads the manifest of a saved multimodal index, or returns an empty manifest if there is no index in the directory.
+
+    Args:
+        index_dir: The directory of the index.
+
+    Returns:
+        The manifest, listing the parts of each table with their files and number of rows.
+
+    Raises:
+        ValueError: If the index was saved with an unsupported format version.
+    """
+
+    manifest_path = os.path.join(index_dir, INDEX_MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return {
+            "format_version": INDEX_FORMAT_VERSION,
+            "tables": {table: [] for table in INDEX_TABLES},
+        }
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest["format_version"] != INDEX_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported multimodal index format: {manifest['format_version']}"
+        )
+    return manifest
+
+
+def write_index_part(
+    index_dir: str, table: str, part_number: int, dataframe: pd.DataFrame
+) -> dict:
+    """
+    Writes the metadata of a DataFrame to a Parquet file and each of its embedding columns to a float32 `.npy` matrix.
+
+    Args:
+        index_dir: The directory of the index.
+        table: The table the part belongs to, "text" or "image".
+        part_number: The number of the part within the table.
+        dataframe: The pandas DataFrame to write.
+
+    Returns:
+        The manifest entry of the part.
+
+    Raises:
+        ValueError: If the embeddings of a column do not all have the same dimension.
+    """
+
+    name = f"{table}-{part_number:05d}"
+    embedding_columns = get_embedding_columns(dataframe)
+
+    part: dict[str, Any] = {
+        "metadata": f"{name}.parquet",
+        "num_rows": len(dataframe),
+        "embeddings": {},
+    }
+    dataframe.drop(columns=embedding_columns).to_parquet(
+        os.path.join(index_dir, part["metadata"]), index=False
+    )
+
+    for column in embedding_columns:
+        try:
+            matrix = np.asarray(dataframe[column].tolist(), dtype=np.float32)
+        except ValueError as e:
+            raise ValueError(
+                f"Embeddings of column '{column}' must all have the same dimension"
+            ) from e
+        norms = np.linalg.norm(matrix, axis=1)
+        part["embeddings"][column] = {
+            "file": f"{name}.{column}.npy",
+            "dim": matrix.shape[1],
+            "l2_normalized": bool(np.allclose(norms, 1, atol=1e-3)),
+        }
+        np.save(os.path.join(index_dir, part["embeddings"][column]["file"]), matrix)
+
+    return part
+
+
+def append_to_multimodal_index(
+    index_dir: str,
+    text_metadata_df: pd.DataFrame | None = None,
+    image_metadata_df: pd.DataFrame | None = None,
+) -> None:
+    """
+    Appends newly ingested documents to a saved multimodal index, creating the index if needed.
+
+    The new rows are written as new parts, existing files are never rewritten, and the manifest is
+    replaced atomically once the parts are written, so readers always see a complete index. Only
+    one process should write to an index at a time.
+
+    Args:
+        index_dir: The directory of the index.
+        text_metadata_df: The text metadata DataFrame from `get_document_metadata`.
+        image_metadata_df: The image metadata DataFrame from `get_document_metadata`.
+    """
+
+    os.makedirs(index_dir, exist_ok=True)
+    manifest = read_index_manifest(index_dir)
+
+    for table, dataframe in zip(INDEX_TABLES, [text_metadata_df, image_metadata_df]):
+        if dataframe is None or dataframe.empty:
+            continue
+        parts = manifest["tables"][table]
+        parts.append(write_index_part(index_dir, table, len(parts), dataframe))
+
+    manifest_path = os.path.join(index_dir, INDEX_MANIFEST_FILE_NAME)
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+
+def save_multimodal_index(
+    index_dir: str,
+    text_metadata_df: pd.DataFrame,
+    image_metadata_df: pd.DataFrame,
+    overwrite: bool = False,
+) -> None:
+    """
+    Saves the metadata DataFrames of `get_document_metadata` as a multimodal index: metadata in
+    Parquet files, embeddings in float32 `.npy` matrices, and a manifest listing them. Writing
+    Parquet files requires pyarrow.
+
+    Args:
+        index_dir: The directory to save the index to.
+        text_metadata_df: The text metadata DataFrame.
+        image_metadata_df: The image metadata DataFrame.
+        overwrite: Whether to replace an index already saved in the directory.
+
+    Raises:
+        FileExistsError: If the directory already contains an index and `overwrite` is False.
+    """
+
+    manifest_path = os.path.join(index_dir, INDEX_MANIFEST_FILE_NAME)
+    if os.path.exists(manifest_path):
+        if not overwrite:
+            raise FileExistsError(
+                f"A multimodal index already exists in {index_dir}, "
+                "use append_to_multimodal_index or overwrite=True"
+            )
+        manifest = read_index_manifest(index_dir)
+        os.remove(manifest_path)
+        for parts in manifest["tables"].values():
+            for part in parts:
+                os.remove(os.path.join(index_dir, part["metadata"]))
+                for embedding in part["embeddings"].values():
+                    os.remove(os.path.join(index_dir, embedding["file"]))
+
+    append_to_multimodal_index(index_dir, text_metadata_df, image_metadata_df)
+
+
+def load_index_table(index_dir: str, parts: list[dict], mmap: bool) -> pd.DataFrame:
+    """
+    Loads a table of a saved multimodal index. The embedding columns hold rows of the
+    embedding matrices, which are registered for similarity search when they are
+    L2-normalized.
+
+    Args:
+        index_dir: The directory of the index.
+        parts: The manifest entries of the parts of the table.
+        mmap: Whether to memory-map the embedding matrices instead of reading them into memory.
+
+    Returns:
+        The metadata DataFrame of the table.
+    """
+
+    if not parts:
+        return pd.DataFrame()
+
+    dataframe = pd.concat(
+        [pd.read_parquet(os.path.join(index_dir, part["metadata"])) for part in parts],
+        axis=0,
+    ).reset_index(drop=True)
+
+    for column in parts[0]["embeddings"]:
+        part_matrices = [
+            np.load(
+                os.path.join(index_dir, part["embeddings"][column]["file"]),
+                mmap_mode="r" if mmap else None,
+            )
+            for part in parts
+        ]
+        # A single part stays zero-copy, appended parts are joined in memory.
+        # Rows are plain array views, rows of a np.memmap are much slower to create
+        matrix = np.asarray(
+            part_matrices[0]
+            if len(part_matrices) == 1
+            else np.concatenate(part_matrices)
+        )
+        dataframe[column] = list(matrix)
+        if all(part["embeddings"][column]["l2_normalized"] for part in parts):
+            set_embedding_matrix(
+                dataframe, column, matrix, np.arange(len(dataframe), dtype=np.int64)
+            )
+
+    return dataframe
+
+
+def load_multimodal_index(
+    index_dir: str, mmap: bool = True
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Loads a multimodal index saved with `save_multimodal_index`.
+
+    The embedding matrices are memory-mapped read-only, so loading does not read them, and
+    several processes loading the same index share their pages. Indexes with appended parts
+    join the matrices of their parts in memory, save them again to a new directory to merge
+    the parts.
+
+    Args:
+        index_dir: The directory of the index.
+        mmap: Whether to memory-map the embedding matrices instead of reading them into memory.
+
+    Returns:
+        A tuple containing the text metadata DataFrame and the image metadata DataFrame.
+
+    Raises:
+        FileNotFoundError: If there is no index in the directory.
+    """
+
+    if not os.path.exists(os.path.join(index_dir, INDEX_MANIFEST_FILE_NAME)):
+        raise FileNotFoundError(f"No multimodal index found in {index_dir}")
+
+    manifest = read_index_manifest(index_dir)
+    text_metadata_df, image_metadata_df = (
+        load_index_table(index_dir, manifest["tables"][table], mmap)
+        for table in INDEX_TABLES
+    )
+    return text_metadata_df, image_metadata_df
+
+
 def print_text_to_image_citation(
     final_images: dict[int, dict[str, Any]], print_top: bool = True
 ) -> None:
@@ -689,21 +1573,24 @@ def print_text_to_text_citation(
 def get_similar_image_from_query(
     text_metadata_df: pd.DataFrame,
     image_metadata_df: pd.DataFrame,
-    query: str = "",
-    image_query_path: str = "",
+    query: str | list[str] = "",
+    image_query_path: str | list[str] = "",
     column_name: str = "",
     image_emb: bool = True,
     top_n: int = 3,
     embedding_size: int = 128,
-) -> dict[int, dict[str, Any]]:
+) -> dict[int, dict[str, Any]] | list[dict[int, dict[str, Any]]]:
     """
     Finds the top N most similar images from a metadata DataFrame based on a text query or an image query.
 
+    The embeddings of `column_name` are compiled once into a normalized matrix (see `get_embedding_matrix`),
+    and all queries are scored against it with a single matrix product.
+
     Args:
         text_metadata_df: A Pandas DataFrame containing text metadata associated with the images.
         image_metadata_df: A Pandas DataFrame containing image metadata (paths, descriptions, etc.).
-        query: The text query used for finding similar images (if image_emb is False).
-        image_query_path: The path to the image used for finding similar images (if image_emb is True).
+        query: The text query, or a list of text queries, used for finding similar images (if image_emb is False).
+        image_query_path: The path to the image, or a list of paths, used for finding similar images (if image_emb is True).
         column_name: The column name in the image_metadata_df containing the image embeddings or captions.
         image_emb: Whether to use image embeddings (True) or text captions (False) for comparisons.
         top_n: The number of most similar images to return.
@@ -711,109 +1598,122 @@ def get_similar_image_from_query(
 
     Returns:
         A dictionary containing information about the top N most similar images, including cosine scores, image objects, paths, page numbers, text excerpts, and descriptions.
+        A list of such dictionaries, one per query, if a list of queries is given.
     """
     # Check if image embedding is used
     if image_emb:
-        # Calculate cosine similarity between query image and metadata images
-        user_query_image_embedding = get_user_query_image_embeddings(
-            image_query_path, embedding_size
-        )
-        cosine_scores = image_metadata_df.apply(
-            lambda x: get_cosine_score(x, column_name, user_query_image_embedding),
-            axis=1,
-        )
+        # Calculate cosine similarity between query images and metadata images
+        single_query = isinstance(image_query_path, str)
+        query_embeddings = [
+            get_user_query_image_embeddings(path, embedding_size)
+            for path in ([image_query_path] if single_query else image_query_path)
+        ]
     else:
-        # Calculate cosine similarity between query text and metadata image captions
-        user_query_text_embedding = get_user_query_text_embeddings(query)
-        cosine_scores = image_metadata_df.apply(
-            lambda x: get_cosine_score(x, column_name, user_query_text_embedding),
-            axis=1,
+        # Calculate cosine similarity between query texts and metadata image captions
+        single_query = isinstance(query, str)
+        query_embeddings = (
+            [get_user_query_text_embeddings(query)]
+            if single_query
+            else get_text_embeddings_in_batches(query)
         )
 
-    # Remove same image comparison score when user image is matched exactly with metadata image
-    cosine_scores = cosine_scores[cosine_scores < 1.0]
-
-    # Get top N cosine scores and their indices
-    top_n_cosine_scores = cosine_scores.nlargest(top_n).index.tolist()
-    top_n_cosine_values = cosine_scores.nlargest(top_n).values.tolist()
+    embedding_matrix, rows = get_embedding_matrix(image_metadata_df, column_name)
+    cosine_scores = get_cosine_scores(embedding_matrix, query_embeddings)
 
-    # Create a dictionary to store matched images and their information
-    final_images: dict[int, dict[str, Any]] = {}
-
-    for matched_imageno, indexvalue in enumerate(top_n_cosine_scores):
-        # Create a sub-dictionary for each matched image
-        final_images[matched_imageno] = {}
+    # Remove same image comparison score when user image is matched exactly with metadata image
+    cosine_scores[cosine_scores >= 1.0] = np.nan
+
+    matches = [
+        get_matched_images(
+            text_metadata_df,
+            image_metadata_df,
+            rows[top_n_indices],
+            scores[top_n_indices],
+        )
+        for scores in cosine_scores
+        for top_n_indices in [get_top_n_indices(scores, top_n)]
+    ]
+    return matches[0] if single_query else matches
 
-        # Store cosine score
-        final_images[matched_imageno]["cosine_score"] = top_n_cosine_values[
-            matched_imageno
-        ]
 
-        # Load image from file
-        final_images[matched_imageno]["image_object"] = Image.load_from_file(
-            image_metadata_df.iloc[indexvalue]["img_path"]
-        )
+def get_matched_images(
+    text_metadata_df: pd.DataFrame,
+    image_metadata_df: pd.DataFrame,
+    matched_rows: np.ndarray,
+    cosine_scores: np.ndarray,
+) -> dict[int, dict[str, Any]]:
+    """
+    Collects the information about matched images for `get_similar_image_from_query`.
 
-        # Add file name
-        final_images[matched_imageno]["file_name"] = image_metadata_df.iloc[indexvalue][
-            "file_name"
-        ]
+    Args:
+        text_metadata_df: A Pandas DataFrame containing text metadata associated with the images.
+        image_metadata_df: A Pandas DataFrame containing image metadata (paths, descriptions, etc.).
+        matched_rows: The positional indices of the matched images in image_metadata_df, best match first.
+        cosine_scores: The cosine score of each matched image.
 
-        # Store image path
-        final_images[matched_imageno]["img_path"] = image_metadata_df.iloc[indexvalue][
-            "img_path"
-        ]
+    Returns:
+        A dictionary containing information about the matched images, keyed by match number.
+    """
 
-        # Store page number
-        final_images[matched_imageno]["page_num"] = image_metadata_df.iloc[indexvalue][
-            "page_num"
-        ]
+    # Create a dictionary to store matched images and their information
+    final_images: dict[int, dict[str, Any]] = {}
 
-        final_images[matched_imageno]["page_text"] = np.unique(
-            text_metadata_df[
-                (
-                    text_metadata_df["page_num"].isin(
-                        [final_images[matched_imageno]["page_num"]]
-                    )
-                )
-                & (
-                    text_metadata_df["file_name"].isin(
-                        [final_images[matched_imageno]["file_name"]]
+    for matched_imageno, (row, score) in enumerate(zip(matched_rows, cosine_scores)):
+        image_metadata = image_metadata_df.iloc[row]
+
+        final_images[matched_imageno] = {
+            # Store cosine score
+            "cosine_score": float(score),
+            # Load image from file
+            "image_object": Image.load_from_file(image_metadata["img_path"]),
+            # Add file name
+            "file_name": image_metadata["file_name"],
+            # Store image path
+            "img_path": image_metadata["img_path"],
+            # Store page number
+            "page_num": image_metadata["page_num"],
+            "page_text": np.unique(
+                text_metadata_df[
+                    (text_metadata_df["page_num"].isin([image_metadata["page_num"]]))
+                    & (
+                        text_metadata_df["file_name"].isin(
+                            [image_metadata["file_name"]]
+                        )
                     )
-                )
-            ]["text"].values
-        )
-
-        # Store image description
-        final_images[matched_imageno]["image_description"] = image_metadata_df.iloc[
-            indexvalue
-        ]["img_desc"]
+                ]["text"].values
+            ),
+            # Store image description
+            "image_description": image_metadata["img_desc"],
+        }
 
     return final_images
 
 
 def get_similar_text_from_query(
-    query: str,
+    query: str | list[str],
     text_metadata_df: pd.DataFrame,
     column_name: str = "",
     top_n: int = 3,
     chunk_text: bool = True,
     print_citation: bool = False,
-) -> dict[int, dict[str, Any]]:
+) -> dict[int, dict[str, Any]] | list[dict[int, dict[str, Any]]]:
     """
     Finds the top N most similar text passages from a metadata DataFrame based on a text query.
 
+    The embeddings of `column_name` are compiled once into a normalized matrix (see `get_embedding_matrix`),
+    and all queries are scored against it with a single matrix product.
+
     Args:
-        query: The text query used for finding similar passages.
+        query: The text query, or a list of text queries, used for finding similar passages.
         text_metadata_df: A Pandas DataFrame containing the text metadata to search.
         column_name: The column name in the text_metadata_df containing the text embeddings or text itself.
         top_n: The number of most similar text passages to return.
-        embedding_size: The dimensionality of the text embeddings (only used if text embeddings are stored in the column specified by `column_name`).
         chunk_text: Whether to return individual text chunks (True) or the entire page text (False).
         print_citation: Whether to immediately print formatted citations for the matched text passages (True) or just return the dictionary (False).
 
     Returns:
         A dictionary containing information about the top N most similar text passages, including cosine scores, page numbers, chunk numbers (optional), and chunk text or page text (depending on `chunk_text`).
+        A list of such dictionaries, one per query, if a list of queries is given.
 
     Raises:
         KeyError: If the specified `column_name` is not present in the `text_metadata_df`.
@@ -822,59 +1722,74 @@ def get_similar_text_from_query(
     if column_name not in text_metadata_df.columns:
         raise KeyError(f"Column '{column_name}' not found in the 'text_metadata_df'")
 
-    query_vector = get_user_query_text_embeddings(query)
-
-    # Calculate cosine similarity between query text and metadata text
-    cosine_scores = text_metadata_df.apply(
-        lambda row: get_cosine_score(
-            row,
-            column_name,
-            query_vector,
-        ),
-        axis=1,
+    single_query = isinstance(query, str)
+    query_vectors = (
+        [get_user_query_text_embeddings(query)]
+        if single_query
+        else get_text_embeddings_in_batches(query)
     )
 
-    # Get top N cosine scores and their indices
-    top_n_indices = cosine_scores.nlargest(top_n).index.tolist()
-    top_n_scores = cosine_scores.nlargest(top_n).values.tolist()
+    # Calculate cosine similarity between query texts and metadata text
+    embedding_matrix, rows = get_embedding_matrix(text_metadata_df, column_name)
+    cosine_scores = get_cosine_scores(embedding_matrix, query_vectors)
 
-    # Create a dictionary to store matched text and their information
-    final_text: dict[int, dict[str, Any]] = {}
+    matches = []
+    for scores in cosine_scores:
+        top_n_indices = get_top_n_indices(scores, top_n)
+        final_text = get_matched_text(
+            text_metadata_df, rows[top_n_indices], scores[top_n_indices], chunk_text
+        )
 
-    for matched_textno, index in enumerate(top_n_indices):
-        # Create a sub-dictionary for each matched text
-        final_text[matched_textno] = {}
+        # Optionally print citations immediately
+        if print_citation:
+            print_text_to_text_citation(final_text, chunk_text=chunk_text)
 
-        # Store page number
-        final_text[matched_textno]["file_name"] = text_metadata_df.iloc[index][
-            "file_name"
-        ]
+        matches.append(final_text)
 
-        # Store page number
-        final_text[matched_textno]["page_num"] = text_metadata_df.iloc[index][
-            "page_num"
-        ]
+    return matches[0] if single_query else matches
 
-        # Store cosine score
-        final_text[matched_textno]["cosine_score"] = top_n_scores[matched_textno]
 
-        if chunk_text:
-            # Store chunk number
-            final_text[matched_textno]["chunk_number"] = text_metadata_df.iloc[index][
-                "chunk_number"
-            ]
+def get_matched_text(
+    text_metadata_df: pd.DataFrame,
+    matched_rows: np.ndarray,
+    cosine_scores: np.ndarray,
+    chunk_text: bool = True,
+) -> dict[int, dict[str, Any]]:
+    """
+    Collects the information about matched text passages for `get_similar_text_from_query`.
 
-            # Store chunk text
-            final_text[matched_textno]["chunk_text"] = text_metadata_df["chunk_text"][
-                index
-            ]
+    Args:
+        text_metadata_df: A Pandas DataFrame containing the text metadata to search.
+        matched_rows: The positional indices of the matched passages in text_metadata_df, best match first.
+        cosine_scores: The cosine score of each matched passage.
+        chunk_text: Whether to return individual text chunks (True) or the entire page text (False).
+
+    Returns:
+        A dictionary containing information about the matched text passages, keyed by match number.
+    """
+
+    # Create a dictionary to store matched text and their information
+    final_text: dict[int, dict[str, Any]] = {}
+
+    for matched_textno, (row, score) in enumerate(zip(matched_rows, cosine_scores)):
+        text_metadata = text_metadata_df.iloc[row]
+
+        final_text[matched_textno] = {
+            # Store file name
+            "file_name": text_metadata["file_name"],
+            # Store page number
+            "page_num": text_metadata["page_num"],
+            # Store cosine score
+            "cosine_score": float(score),
+        }
+
+        if chunk_text:
+            # Store chunk number and chunk text
+            final_text[matched_textno]["chunk_number"] = text_metadata["chunk_number"]
+            final_text[matched_textno]["chunk_text"] = text_metadata["chunk_text"]
         else:
             # Store page text
-            final_text[matched_textno]["text"] = text_metadata_df["text"][index]
-
-    # Optionally print citations immediately
-    if print_citation:
-        print_text_to_text_citation(final_text, chunk_text=chunk_text)
+            final_text[matched_textno]["text"] = text_metadata["text"]
 
     return final_text
 
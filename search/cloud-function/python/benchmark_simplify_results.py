@@ -0,0 +1,139 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Micro-benchmark of search result simplification in VertexAISearchClient.
+
+Compares mapping every result with `SearchResult.to_dict` and simplifying the
+dictionaries against simplifying the result messages directly, over recorded
+search responses.
+
+Record a response (uses the same environment variables as main.py):
+    python benchmark_simplify_results.py --record "your query" \\
+        --page-size 100 --output response.json
+
+Run the benchmark over recorded responses:
+    python benchmark_simplify_results.py response.json
+
+Without recorded responses, a synthetic page of documents with extractive
+answers, segments and snippets is used.
+"""
+
+import argparse
+import os
+import timeit
+from unittest.mock import patch
+
+from google.cloud.discoveryengine_v1alpha.types import Document, SearchResponse
+from vertex_ai_search_client import VertexAISearchClient, VertexAISearchConfig
+
+
+def get_config() -> VertexAISearchConfig:
+    """Read the client configuration from the environment, like main.py."""
+    return VertexAISearchConfig(
+        project_id=os.getenv("PROJECT_ID", "your-project"),
+        location=os.getenv("LOCATION", "global"),
+        data_store_id=os.getenv("DATA_STORE_ID", "your-data-store"),
+        engine_data_type=os.getenv("ENGINE_DATA_TYPE", "UNSTRUCTURED"),
+        engine_chunk_type=os.getenv(
+            "ENGINE_CHUNK_TYPE", "DOCUMENT_WITH_EXTRACTIVE_SEGMENTS"
+        ),
+        summary_type=os.getenv("SUMMARY_TYPE", "VERTEX_AI_SEARCH"),
+    )
+
+
+def record_response(query: str, page_size: int, output: str) -> None:
+    """Run a search and save the first page of the raw response as JSON."""
+    client = VertexAISearchClient(get_config())
+    pager = client.client.search(client.build_search_request(query, page_size))
+    # The first page is the response already fetched by the search call
+    response = next(iter(pager.pages))
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(SearchResponse.to_json(response))
+    print(f"Recorded {len(response.results)} results to {output}")
+
+
+def load_response(path: str) -> SearchResponse:
+    """Load a response recorded with --record."""
+    with open(path, encoding="utf-8") as f:
+        return SearchResponse.from_json(f.read(), ignore_unknown_fields=True)
+
+
+def synthetic_response(page_size: int) -> SearchResponse:
+    """Build a page of documents with extractive answers, segments and snippets."""
+    results = []
+    for i in range(page_size):
+        document = Document(id=f"doc{i}", name=f"documents/doc{i}")
+        document.derived_struct_data = {
+            "title": f"Document {i}",
+            "link": f"gs://bucket/doc{i}.pdf",
+            "extractive_answers": [
+                {"content": "<b>Answer</b> &amp; text " * 20, "pageNumber": "1"}
+            ],
+            "extractive_segments": [
+                {
+                    "content": "<p>Segment</p> text " * 40,
+                    "pageNumber": str(page),
+                    "relevanceScore": 0.5,
+                }
+                for page in range(3)
+            ],
+            "snippets": [{"snippet_status": "SUCCESS", "snippet": "<b>Snippet</b>"}],
+        }
+        results.append(SearchResponse.SearchResult(document=document))
+    return SearchResponse(results=results)
+
+
+def main() -> None:
+    """Run the benchmark, or record a response with --record."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("responses", nargs="*", help="Recorded response files")
+    parser.add_argument("--record", metavar="QUERY", help="Record a response")
+    parser.add_argument("--output", default="response.json")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.record:
+        record_response(args.record, args.page_size, args.output)
+        return
+
+    with patch("vertex_ai_search_client.discoveryengine.SearchServiceClient"):
+        client = VertexAISearchClient(get_config())
+
+    responses = {path: load_response(path) for path in args.responses} or {
+        "synthetic": synthetic_response(args.page_size)
+    }
+    for name, response in responses.items():
+        results = list(response.results)
+
+        def dict_path() -> None:
+            client.simplify_search_results(
+                {"results": [SearchResponse.SearchResult.to_dict(r) for r in results]}
+            )
+
+        def message_path() -> None:
+            client.simplify_search_result_messages(results)
+
+        dict_ms = min(timeit.repeat(dict_path, number=1, repeat=args.repeat)) * 1000
+        message_ms = (
+            min(timeit.repeat(message_path, number=1, repeat=args.repeat)) * 1000
+        )
+        print(
+            f"{name}: {len(results)} results, to_dict + simplify {dict_ms:.2f} ms, "
+            f"simplify messages {message_ms:.2f} ms ({dict_ms / message_ms:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -15,20 +15,23 @@
 Google Cloud Function for Vertex AI Search
 
 This module provides an HTTP endpoint for performing searches using
-the Vertex AI Search API. It uses the VertexAISearchClient to handle
-the core search functionality.
+the Vertex AI Search API. It uses the AsyncVertexAISearchClient to handle
+the core search functionality, on an event loop shared by all requests so
+identical concurrent searches are coalesced and results are cached.
 
 For deployment instructions, environment variable setup, and usage examples,
 please refer to the README.md file.
 """
 
+import asyncio
 import os
+import threading
 from typing import Any
 
 from flask import Flask, Request, jsonify, request
 import functions_framework
 from google.api_core.exceptions import GoogleAPICallError
-from vertex_ai_search_client import VertexAISearchClient, VertexAISearchConfig
+from vertex_ai_search_client import AsyncVertexAISearchClient, VertexAISearchConfig
 
 # Load environment variables
 project_id = os.getenv("PROJECT_ID", "your-project")
@@ -37,6 +40,9 @@ data_store_id = os.getenv("DATA_STORE_ID", "your-data-store")
 engine_data_type = os.getenv("ENGINE_DATA_TYPE", "UNSTRUCTURED")
 engine_chunk_type = os.getenv("ENGINE_CHUNK_TYPE", "CHUNK")
 summary_type = os.getenv("SUMMARY_TYPE", "VERTEX_AI_SEARCH")
+search_cache_size = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+search_cache_ttl_sec = float(os.getenv("SEARCH_CACHE_TTL_SEC", "300"))
+include_raw_results = os.getenv("INCLUDE_RAW_RESULTS", "true").lower() == "true"
 
 # Create VertexAISearchConfig
 config = VertexAISearchConfig(
@@ -48,8 +54,23 @@ config = VertexAISearchConfig(
     summary_type=summary_type,
 )
 
-# Initialize VertexAISearchClient
-vertex_ai_search_client = VertexAISearchClient(config)
+# Requests are handled on worker threads, searches run on one event loop
+# so they share a gRPC channel, the result cache and in-flight searches
+search_loop = asyncio.new_event_loop()
+threading.Thread(target=search_loop.run_forever, daemon=True).start()
+
+
+async def create_search_client() -> AsyncVertexAISearchClient:
+    """Create the client on the search loop, its gRPC channel binds to it."""
+    return AsyncVertexAISearchClient(
+        config, cache_size=search_cache_size, cache_ttl_sec=search_cache_ttl_sec
+    )
+
+
+# Initialize AsyncVertexAISearchClient
+vertex_ai_search_client = asyncio.run_coroutine_threadsafe(
+    create_search_client(), search_loop
+).result()
 
 
 @functions_framework.http
@@ -58,8 +79,8 @@ def vertex_ai_search(http_request: Request) -> tuple[Any, int, dict[str, str]]:
     Handle HTTP requests for Vertex AI Search.
 
     This function processes incoming HTTP requests, performs the search using
-    the VertexAISearchClient, and returns the results. It handles CORS, validates
-    the request, and manages potential errors.
+    the AsyncVertexAISearchClient, and returns the results. It handles CORS,
+    validates the request, and manages potential errors.
 
     Args:
         http_request (flask.Request): The request object.
@@ -97,15 +118,26 @@ def vertex_ai_search(http_request: Request) -> tuple[Any, int, dict[str, str]]:
     request_args = http_request.args
 
     if request_json and "search_term" in request_json:
-        search_term = request_json["search_term"]
+        params = request_json
     elif request_args and "search_term" in request_args:
-        search_term = request_args["search_term"]
+        params = request_args
     else:
         return create_error_response("No search term provided", 400)
+    search_term = params["search_term"]
+    page_token = params.get("page_token")
 
     # Handle the Vertex AI Search and return JSON
     try:
-        results = vertex_ai_search_client.search(search_term)
+        page_size = int(params.get("page_size", 10))
+        results = asyncio.run_coroutine_threadsafe(
+            vertex_ai_search_client.search(
+                search_term,
+                page_size=page_size,
+                page_token=page_token,
+                include_raw_results=include_raw_results,
+            ),
+            search_loop,
+        ).result()
         return (jsonify(results), 200, headers)
     except GoogleAPICallError as e:
         return create_error_response(
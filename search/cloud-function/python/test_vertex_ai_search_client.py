@@ -22,8 +22,9 @@ mocks to simulate the behavior of the Google Cloud Search API. These tests
 ensure that the client correctly handles various scenarios and data structures.
 """
 
+import asyncio
 import json
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from google.cloud import discoveryengine_v1alpha as discoveryengine
 from google.cloud.discoveryengine_v1alpha.services.search_service.pagers import (
@@ -31,14 +32,19 @@ from google.cloud.discoveryengine_v1alpha.services.search_service.pagers import
 )
 from google.cloud.discoveryengine_v1alpha.types import Document, SearchResponse
 import pytest
-from vertex_ai_search_client import VertexAISearchClient, VertexAISearchConfig
+from vertex_ai_search_client import (
+    AsyncVertexAISearchClient,
+    VertexAISearchClient,
+    VertexAISearchConfig,
+)
 
 
 # Test helper functions
 def create_mock_search_pager_result() -> MagicMock:
     """Create a mock SearchPager result for testing."""
     mock_pager = MagicMock(spec=SearchPager)
-    mock_pager.__iter__.return_value = [create_mock_search_pager_return_value()]
+    mock_pager.__iter__.side_effect = AssertionError("pager iterated across pages")
+    mock_pager.results = [create_mock_search_pager_return_value()]
     mock_pager.total_size = 1
     mock_pager.attribution_token = "test-token"
     mock_pager.next_page_token = "next-page"
@@ -51,6 +57,21 @@ def create_mock_search_pager_result() -> MagicMock:
     return mock_pager
 
 
+def create_search_response_page(
+    num_results: int, next_page_token: str = ""
+) -> SearchResponse:
+    """Create a SearchResponse page with chunk results for testing."""
+    return SearchResponse(
+        results=[
+            SearchResponse.SearchResult(
+                chunk={"name": f"chunk{i}", "id": f"chunk{i}", "content": "Test"}
+            )
+            for i in range(num_results)
+        ],
+        next_page_token=next_page_token,
+    )
+
+
 def create_mock_search_pager_return_value() -> SearchResponse.SearchResult:
     """Create a mock SearchResponse.SearchResult for testing."""
     search_result = SearchResponse.SearchResult()
@@ -309,7 +330,7 @@ def test_parse_document_result(search_client: VertexAISearchClient) -> None:
 
 
 @patch("vertex_ai_search_client.VertexAISearchClient.map_search_pager_to_dict")
-@patch("vertex_ai_search_client.VertexAISearchClient.simplify_search_results")
+@patch("vertex_ai_search_client.VertexAISearchClient.simplify_search_result_messages")
 def test_search(
     mock_simplify: MagicMock,
     mock_map_pager: MagicMock,
@@ -321,17 +342,230 @@ def test_search(
     search_client.client.search.return_value = mock_pager
 
     mock_map_pager.return_value = {"results": [{"document": {"id": "doc1"}}]}
-    mock_simplify.return_value = {"simplified_results": [{"id": "doc1"}]}
+    mock_simplify.return_value = [{"id": "doc1"}]
 
     results = search_client.search("test query")
 
     search_client.client.search.assert_called_once()
-    mock_map_pager.assert_called_once_with(mock_pager)
-    mock_simplify.assert_called_once_with({"results": [{"document": {"id": "doc1"}}]})
-    assert results == {"simplified_results": [{"id": "doc1"}]}
+    assert search_client.client.search.call_args[0][0].page_token == ""
+    mock_map_pager.assert_called_once_with(mock_pager, True)
+    mock_simplify.assert_called_once_with(mock_pager.results)
+    assert results == {
+        "results": [{"document": {"id": "doc1"}}],
+        "simplified_results": [{"id": "doc1"}],
+    }
 
     results_json = json.dumps(results)
-    assert results_json == '{"simplified_results": [{"id": "doc1"}]}'
+    assert results_json == (
+        '{"results": [{"document": {"id": "doc1"}}], '
+        '"simplified_results": [{"id": "doc1"}]}'
+    )
+
+
+def test_search_fetches_one_page(search_client: VertexAISearchClient) -> None:
+    """Test that search requests a single page and returns its next page token."""
+    search_client.client.search.return_value = create_mock_search_pager_result()
+
+    results = search_client.search("test query", page_size=1, page_token="page-2")
+
+    search_client.client.search.assert_called_once()
+    assert search_client.client.search.call_args[0][0].page_token == "page-2"
+    assert len(results["results"]) == 1
+    assert len(results["simplified_results"]) == 1
+    assert results["next_page_token"] == "next-page"
+
+
+def test_search_iter_stops_at_max_results(search_client: VertexAISearchClient) -> None:
+    """Test that search_iter requests pages lazily up to max_results."""
+    search_client.client.search.side_effect = [
+        create_search_response_page(2, next_page_token="page-2"),
+        create_search_response_page(2, next_page_token="page-3"),
+    ]
+
+    results = search_client.search_iter("test query", page_size=2, max_results=3)
+    assert next(results)["metadata"]["chunk_id"] == "chunk0"
+    search_client.client.search.assert_called_once()
+
+    assert len(list(results)) == 2
+    requests = [call[0][0] for call in search_client.client.search.call_args_list]
+    assert [r.page_token for r in requests] == ["", "page-2"]
+    assert [r.page_size for r in requests] == [2, 1]
+
+
+def test_search_iter_stops_at_last_page(search_client: VertexAISearchClient) -> None:
+    """Test that search_iter stops when there is no next page."""
+    search_client.client.search.side_effect = [create_search_response_page(2)]
+
+    assert len(list(search_client.search_iter("test query", max_results=10))) == 2
+    search_client.client.search.assert_called_once()
+
+
+def create_async_search_client(
+    search_config: VertexAISearchConfig, cache_ttl_sec: float = 300
+) -> AsyncVertexAISearchClient:
+    """Create an AsyncVertexAISearchClient whose API calls take 10ms."""
+    with patch(
+        "vertex_ai_search_client.discoveryengine.SearchServiceAsyncClient"
+    ) as mock_client:
+        mock_client.return_value.serving_config_path.return_value = (
+            "projects/test-project/locations/us-central1/dataStores/test-data-store/"
+            "servingConfigs/default_config"
+        )
+        client = AsyncVertexAISearchClient(search_config, cache_ttl_sec=cache_ttl_sec)
+
+    async def search(request: discoveryengine.SearchRequest) -> SearchResponse:
+        await asyncio.sleep(0.01)
+        return create_search_response_page(request.page_size)
+
+    client.client.search = AsyncMock(side_effect=search)
+    return client
+
+
+def test_async_search_coalesces_and_caches(
+    search_config: VertexAISearchConfig,
+) -> None:
+    """Test that identical searches share one API call and are then cached."""
+
+    async def run() -> AsyncVertexAISearchClient:
+        client = create_async_search_client(search_config)
+        burst = await asyncio.gather(*[client.search("test query") for _ in range(5)])
+        assert all(results is burst[0] for results in burst)
+        assert len(burst[0]["simplified_results"]) == 10
+
+        assert await client.search("test query") is burst[0]
+        other_page_size = await client.search("test query", page_size=5)
+        assert len(other_page_size["simplified_results"]) == 5
+        return client
+
+    client = asyncio.run(run())
+    assert client.client.search.call_count == 2
+    assert client.stats() == {
+        "backend_calls": 2,
+        "cache_hits": 1,
+        "coalesced": 4,
+        "cache_size": 2,
+    }
+
+
+def test_async_search_does_not_cache_errors(
+    search_config: VertexAISearchConfig,
+) -> None:
+    """Test that failed searches are raised to every waiter and not cached."""
+
+    async def run() -> AsyncVertexAISearchClient:
+        client = create_async_search_client(search_config, cache_ttl_sec=0)
+        client.client.search.side_effect = ValueError("backend error")
+        burst = await asyncio.gather(
+            client.search("test query"),
+            client.search("test query"),
+            return_exceptions=True,
+        )
+        assert all(isinstance(error, ValueError) for error in burst)
+
+        client.client.search.side_effect = None
+        client.client.search.return_value = create_search_response_page(1)
+        await client.search("test query")
+        await client.search("test query")
+        return client
+
+    client = asyncio.run(run())
+    assert client.stats()["backend_calls"] == 3
+    assert client.stats()["cache_size"] == 0
+
+
+def test_async_search_iter_pages_up_to_max_results(
+    search_config: VertexAISearchConfig,
+) -> None:
+    """Test that the async search_iter requests pages lazily up to max_results."""
+    client = create_async_search_client(search_config)
+    client.client.search.side_effect = [
+        create_search_response_page(2, next_page_token="page-2"),
+        create_search_response_page(2, next_page_token="page-3"),
+    ]
+
+    async def run() -> list[dict]:
+        results = client.search_iter("test query", page_size=2, max_results=3)
+        first = await anext(results)
+        client.client.search.assert_called_once()
+        return [first] + [result async for result in results]
+
+    results = asyncio.run(run())
+    assert [r["metadata"]["chunk_id"] for r in results] == [
+        "chunk0",
+        "chunk1",
+        "chunk0",
+    ]
+    requests = [call[0][0] for call in client.client.search.call_args_list]
+    assert [r.page_token for r in requests] == ["", "page-2"]
+    assert [r.page_size for r in requests] == [2, 1]
+
+
+def test_async_search_iter_stops_at_last_page(
+    search_config: VertexAISearchConfig,
+) -> None:
+    """Test that the async search_iter stops when there is no next page."""
+    client = create_async_search_client(search_config)
+
+    async def run() -> list[dict]:
+        return [r async for r in client.search_iter("test query", max_results=10)]
+
+    assert len(asyncio.run(run())) == 10
+    # A second pass is served from the cache
+    assert len(asyncio.run(run())) == 10
+    client.client.search.assert_called_once()
+
+
+def create_recorded_results() -> list[SearchResponse.SearchResult]:
+    """Create search results covering every kind of simplified result."""
+    structured = Document(id="doc2", struct_data={"name": "Widget", "price": 10})
+    json_document = Document(id="doc3", json_data='{"name": "Gadget"}')
+    chunk = {
+        "id": "chunk1",
+        "content": "<p>Chunk &amp; content</p>",
+        "relevance_score": 0.5,
+        "document_metadata": {
+            "uri": "gs://company-docs/doc.pdf",
+            "title": "Doc",
+            "struct_data": {"team": "HR"},
+        },
+        "page_span": {"page_start": 1, "page_end": 2},
+        "derived_struct_data": {"section": "Intro"},
+    }
+    return [
+        create_mock_search_pager_return_value(),
+        SearchResponse.SearchResult(document=structured),
+        SearchResponse.SearchResult(document=json_document),
+        SearchResponse.SearchResult(chunk=chunk),
+        SearchResponse.SearchResult(chunk={"id": "chunk2", "content": "Test"}),
+    ]
+
+
+@pytest.mark.parametrize("engine_data_type", ["UNSTRUCTURED", "STRUCTURED"])
+def test_simplify_search_result_messages_matches_dict_path(
+    search_config: VertexAISearchConfig, engine_data_type: str
+) -> None:
+    """Test that simplifying messages gives the same results as the dict path."""
+    search_config.engine_data_type = engine_data_type
+    with patch("vertex_ai_search_client.discoveryengine.SearchServiceClient"):
+        client = VertexAISearchClient(search_config)
+    results = create_recorded_results()
+
+    expected = client.simplify_search_results(
+        {"results": [SearchResponse.SearchResult.to_dict(r) for r in results]}
+    )["simplified_results"]
+    assert client.simplify_search_result_messages(results) == expected
+    assert expected[3]["page_content"] == "Chunk & content"
+
+
+def test_search_without_raw_results(search_client: VertexAISearchClient) -> None:
+    """Test that search can leave the raw results out of the response."""
+    search_client.client.search.return_value = create_mock_search_pager_result()
+
+    results = search_client.search("test query", include_raw_results=False)
+
+    assert "results" not in results
+    assert len(results["simplified_results"]) == 1
+    assert results["summary"]["summary_text"] == "Test summary"
 
 
 if __name__ == "__main__":
@@ -30,11 +30,29 @@ Example usage:
     client = VertexAISearchClient(config)
     results = client.search("your search query")
     print(results)
+
+    # Continue with the next page
+    more = client.search("your search query", page_token=results["next_page_token"])
+
+    # Or stream results across pages, up to a bound
+    for result in client.search_iter("your search query", max_results=50):
+        print(result["page_content"])
+
+For concurrent callers, AsyncVertexAISearchClient coalesces identical
+in-flight searches into a single API call and caches simplified results:
+    client = AsyncVertexAISearchClient(config, cache_ttl_sec=300)
+    results = await client.search("your search query")
 """
+import asyncio
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Hashable, Iterable, Iterator
 from dataclasses import dataclass
 import html
+from itertools import islice
 import json
+import logging
 import re
+import time
 from typing import Any, Literal
 
 from google.api_core.client_options import ClientOptions
@@ -43,6 +61,11 @@ from google.cloud.discoveryengine_v1alpha.services.search_service.pagers import
     SearchPager,
 )
 from google.cloud.discoveryengine_v1alpha.types import SearchResponse
+from google.protobuf import struct_pb2
+
+logger = logging.getLogger(__name__)
+
+HTML_TAG_PATTERN = re.compile("<.*?>")
 
 # Define types using string literals, similar to enums.
 EngineDataTypeStr = Literal["UNSTRUCTURED", "STRUCTURED", "WEBSITE", "BLENDED"]
@@ -82,7 +105,7 @@ class VertexAISearchConfig:
         """Validate and convert string to enum type."""
         if value in enum_type.__args__:
             return value
-        print(f"Warning: Invalid value '{value}'. Using default: '{default}'")
+        logger.warning(f"Invalid value '{value}'. Using default: '{default}'")
         return default
 
     def to_dict(self) -> dict[str, str]:
@@ -144,26 +167,73 @@ class VertexAISearchClient:
             serving_config="default_config",
         )
 
-    def search(self, query: str, page_size: int = 10) -> dict[str, Any]:
+    def search(
+        self,
+        query: str,
+        page_size: int = 10,
+        page_token: str | None = None,
+        include_raw_results: bool = True,
+    ) -> dict[str, Any]:
         """
         Perform a search query using Vertex AI Search.
 
+        Only a single page of results is fetched. Pass the returned
+        `next_page_token` as `page_token` to fetch the next page.
+
         Args:
             query (str): The search query.
             page_size (int): Number of results to return per page.
+            page_token (str | None): Token of the page to fetch, from a
+                previous response. Fetches the first page if not set.
+            include_raw_results (bool): Whether to include the raw `results`
+                next to the `simplified_results`.
 
         Returns:
             dict: Parsed and simplified search results.
         """
-        request = self.build_search_request(query, page_size)
-        print(f"<request> {request} </request>")
+        request = self.build_search_request(query, page_size, page_token)
         search_pager = self.client.search(request)
-        response = self.map_search_pager_to_dict(search_pager)
-        print(f"<response> {response} </response>")
-        return self.simplify_search_results(response)
+        response = self.parse_search_response(search_pager, include_raw_results)
+        logger.debug(
+            f"Search for '{query}' returned "
+            f"{len(response['simplified_results'])} results"
+        )
+        return response
+
+    def search_iter(
+        self, query: str, page_size: int = 10, max_results: int = 100
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Stream simplified search results across pages.
+
+        Pages are requested lazily as the results are consumed, and no more
+        than `max_results` results are requested or yielded.
+
+        Args:
+            query (str): The search query.
+            page_size (int): Number of results to request per page.
+            max_results (int): Maximum number of results to yield.
+
+        Yields:
+            Dict[str, Any]: The simplified results, in ranking order.
+        """
+        remaining = max_results
+        page_token = None
+        while remaining > 0:
+            request = self.build_search_request(
+                query, min(page_size, remaining), page_token
+            )
+            response = self.client.search(request)
+            yield from self.simplify_search_result_messages(
+                islice(response.results, remaining)
+            )
+            remaining -= len(response.results)
+            page_token = response.next_page_token
+            if not page_token or not response.results:
+                return
 
     def build_search_request(
-        self, query: str, page_size: int
+        self, query: str, page_size: int, page_token: str | None = None
     ) -> discoveryengine.SearchRequest:
         """
         Build a SearchRequest object based on the client configuration and query.
@@ -171,6 +241,7 @@ class VertexAISearchClient:
         Args:
             query (str): The search query.
             page_size (int): Number of results to return per page.
+            page_token (str | None): Token of the page to fetch.
 
         Returns:
             discoveryengine.SearchRequest: The configured search request object.
@@ -205,6 +276,7 @@ class VertexAISearchClient:
             serving_config=self.serving_config,
             query=query,
             page_size=page_size,
+            page_token=page_token or "",
             content_search_spec=discoveryengine.SearchRequest.ContentSearchSpec(
                 snippet_spec=snippet_spec,
                 extractive_content_spec=extractive_content_spec,
@@ -218,22 +290,49 @@ class VertexAISearchClient:
             ),
         )
 
-    def map_search_pager_to_dict(self, pager: SearchPager) -> dict[str, Any]:
+    def parse_search_response(
+        self, pager: SearchPager, include_raw_results: bool = True
+    ) -> dict[str, Any]:
+        """
+        Map the current page of a SearchPager to a dictionary structure with
+        simplified results.
+
+        Results are simplified straight from their protobuf messages, without
+        first converting them to dictionaries.
+
+        Args:
+            pager (SearchPager): The pager returned by the search method.
+            include_raw_results (bool): Whether to include the raw `results`.
+
+        Returns:
+            Dict[str, Any]: The search response metadata and simplified results.
+        """
+        response = self.map_search_pager_to_dict(pager, include_raw_results)
+        response["simplified_results"] = self.simplify_search_result_messages(
+            pager.results
+        )
+        return response
+
+    def map_search_pager_to_dict(
+        self, pager: SearchPager, include_raw_results: bool = True
+    ) -> dict[str, Any]:
         """
-        Maps a SearchPager to a dictionary structure, iterativly requesting results.
+        Maps the current page of a SearchPager to a dictionary structure.
+
+        Only the results of the page already fetched are mapped, iterating
+        the pager would request every following page.
 
         https://cloud.google.com/python/docs/reference/discoveryengine/latest/google.cloud.discoveryengine_v1alpha.services.search_service.pagers.SearchPager
 
         Args:
             pager (SearchPager): The pager returned by the search method.
+            include_raw_results (bool): Whether to map the results, or only
+                the response metadata.
 
         Returns:
             Dict[str, Any]: A dictionary containing the search results and metadata.
         """
         output: dict[str, Any] = {
-            "results": [
-                SearchResponse.SearchResult.to_dict(result) for result in pager
-            ],
             "total_size": pager.total_size,
             "attribution_token": pager.attribution_token,
             "next_page_token": pager.next_page_token,
@@ -242,6 +341,11 @@ class VertexAISearchClient:
             "applied_controls": [],
         }
 
+        if include_raw_results:
+            output["results"] = [
+                SearchResponse.SearchResult.to_dict(result) for result in pager.results
+            ]
+
         if pager.summary:
             output["summary"] = SearchResponse.Summary.to_dict(pager.summary)
 
@@ -279,16 +383,61 @@ class VertexAISearchClient:
         """
         if "results" not in response:
             return response
+        simplified_results = [
+            self._simplify_result(result) for result in response["results"]
+        ]
+        response["simplified_results"] = [
+            result for result in simplified_results if result is not None
+        ]
+        return response
+
+    def _simplify_result(self, result: dict[str, Any]) -> dict[str, Any] | None:
+        """
+        Simplify a single search result, if it holds a document or a chunk.
+
+        Args:
+            result (Dict[str, Any]): A search result of the raw response.
+
+        Returns:
+            Dict[str, Any] | None: The parsed page_content and metadata.
+        """
+        if "document" in result:
+            return self._parse_document_result(result["document"])
+        if "chunk" in result:
+            return self._parse_chunk_result(result["chunk"])
+        return None
+
+    def simplify_search_result_messages(
+        self, results: Iterable[SearchResponse.SearchResult]
+    ) -> list[dict[str, Any]]:
+        """
+        Simplify search results straight from their protobuf messages.
+
+        Only the fields used by the simplified results are read from the
+        messages, which is much faster than mapping the full results with
+        `SearchResult.to_dict` and then simplifying them.
+
+        Args:
+            results (Iterable[SearchResponse.SearchResult]): The search results.
+
+        Returns:
+            List[Dict[str, Any]]: The parsed page_content and metadata of the
+            results which hold a document or a chunk.
+        """
         simplified_results = []
-        for result in response["results"]:
-            if "document" in result:
+        for result in results:
+            result_pb = SearchResponse.SearchResult.pb(result)
+            if result_pb.HasField("document"):
                 simplified_results.append(
-                    self._parse_document_result(result["document"])
+                    self._parse_document_result(
+                        _document_pb_to_dict(result_pb.document)
+                    )
                 )
-            elif "chunk" in result:
-                simplified_results.append(self._parse_chunk_result(result["chunk"]))
-        response["simplified_results"] = simplified_results
-        return response
+            elif result_pb.HasField("chunk"):
+                simplified_results.append(
+                    self._parse_chunk_result(_chunk_pb_to_dict(result_pb.chunk))
+                )
+        return simplified_results
 
     def _parse_document_result(self, document: dict[str, Any]) -> dict[str, Any]:
         """
@@ -313,7 +462,7 @@ class VertexAISearchClient:
             try:
                 json_data = json.loads(json_data)
             except json.JSONDecodeError:
-                print(f"Warning: Failed to parse json_data: {json_data}")
+                logger.warning(f"Failed to parse json_data: {json_data}")
                 json_data = {}
 
         metadata.update(json_data)
@@ -416,5 +565,305 @@ class VertexAISearchClient:
         Returns:
             str: The cleaned text.
         """
-        text = re.sub("<.*?>", "", text)
-        return html.unescape(text).strip()
+        if "<" in text:
+            text = HTML_TAG_PATTERN.sub("", text)
+        if "&" in text:
+            text = html.unescape(text)
+        return text.strip()
+
+
+def _value_to_python(value: struct_pb2.Value) -> Any:
+    """Convert a protobuf Value to the equivalent Python value."""
+    kind = value.WhichOneof("kind")
+    if kind == "string_value":
+        return value.string_value
+    if kind == "struct_value":
+        return _struct_to_dict(value.struct_value)
+    if kind == "list_value":
+        return [_value_to_python(item) for item in value.list_value.values]
+    if kind == "number_value":
+        return value.number_value
+    if kind == "bool_value":
+        return value.bool_value
+    return None
+
+
+def _struct_to_dict(struct: struct_pb2.Struct) -> dict[str, Any]:
+    """Convert a protobuf Struct to a dictionary."""
+    return {key: _value_to_python(value) for key, value in struct.fields.items()}
+
+
+def _document_pb_to_dict(document: Any) -> dict[str, Any]:
+    """
+    Map the fields of a Document message read by `_parse_document_result`
+    to a dictionary, with the same keys as `SearchResult.to_dict`.
+    """
+    output = {"derived_struct_data": _struct_to_dict(document.derived_struct_data)}
+    data = document.WhichOneof("data")
+    if data == "struct_data":
+        output["struct_data"] = _struct_to_dict(document.struct_data)
+    elif data == "json_data":
+        output["json_data"] = document.json_data
+    return output
+
+
+def _chunk_pb_to_dict(chunk: Any) -> dict[str, Any]:
+    """
+    Map the fields of a Chunk message read by `_parse_chunk_result`
+    to a dictionary, with the same keys as `SearchResult.to_dict`.
+    """
+    output: dict[str, Any] = {"id": chunk.id, "content": chunk.content}
+    if chunk.HasField("relevance_score"):
+        output["relevance_score"] = chunk.relevance_score
+    if chunk.HasField("page_span"):
+        output["page_span"] = {
+            "page_start": chunk.page_span.page_start,
+            "page_end": chunk.page_span.page_end,
+        }
+    if chunk.HasField("document_metadata"):
+        metadata = chunk.document_metadata
+        output["document_metadata"] = {"uri": metadata.uri, "title": metadata.title}
+        if metadata.HasField("struct_data"):
+            output["document_metadata"]["struct_data"] = _struct_to_dict(
+                metadata.struct_data
+            )
+    if chunk.HasField("derived_struct_data"):
+        output["derived_struct_data"] = _struct_to_dict(chunk.derived_struct_data)
+    return output
+
+
+class TTLCache:
+    """
+    A least recently used cache whose entries expire after `ttl_sec` seconds.
+
+    Not thread-safe, it is meant to be used from a single event loop.
+    """
+
+    def __init__(self, max_size: int, ttl_sec: float):
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the cached value of key, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache value under key, evicting the least recently used entries."""
+        if self.max_size <= 0 or self.ttl_sec <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_sec, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class AsyncVertexAISearchClient(VertexAISearchClient):
+    """
+    An asyncio client for Vertex AI Search.
+
+    Searches go through a single SearchServiceAsyncClient, so all callers
+    share its pooled gRPC channel. Identical searches which are already in
+    flight are coalesced into one API call, and simplified results are
+    cached for `cache_ttl_sec` seconds. Cached results are shared between
+    callers and must not be modified.
+
+    The client must be created and used on the same event loop, which its
+    gRPC channel is bound to.
+    """
+
+    def __init__(
+        self,
+        config: VertexAISearchConfig,
+        cache_size: int = 1024,
+        cache_ttl_sec: float = 300,
+    ):
+        """
+        Initialize the AsyncVertexAISearchClient.
+
+        Args:
+            config (VertexAISearchConfig): The configuration for the Vertex AI Search client.
+            cache_size (int): Maximum number of cached search results.
+            cache_ttl_sec (float): Seconds a cached search result is served for.
+                Set to 0 to disable caching.
+        """
+        super().__init__(config)
+        self.cache = TTLCache(max_size=cache_size, ttl_sec=cache_ttl_sec)
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self.backend_calls = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+
+    def _create_client(self) -> discoveryengine.SearchServiceAsyncClient:
+        """
+        Create and configure the SearchServiceAsyncClient.
+
+        Returns:
+            discoveryengine.SearchServiceAsyncClient: The configured client.
+        """
+        client_options = None
+        if self.config.location != "global":
+            api_endpoint = f"{self.config.location}-discoveryengine.googleapis.com"
+            client_options = ClientOptions(api_endpoint=api_endpoint)
+        return discoveryengine.SearchServiceAsyncClient(client_options=client_options)
+
+    def cache_key(
+        self,
+        query: str,
+        page_size: int,
+        page_token: str | None,
+        include_raw_results: bool = True,
+    ) -> tuple[Hashable, ...]:
+        """
+        Return the key identifying a search and its simplified results.
+
+        Args:
+            query (str): The search query.
+            page_size (int): Number of results to return per page.
+            page_token (str | None): Token of the page to fetch.
+            include_raw_results (bool): Whether the raw results are included.
+
+        Returns:
+            Tuple: The cache key.
+        """
+        return (
+            query,
+            page_size,
+            page_token or "",
+            self.serving_config,
+            self.config.engine_chunk_type,
+            self.config.summary_type,
+            include_raw_results,
+        )
+
+    async def search(  # type: ignore[override]
+        self,
+        query: str,
+        page_size: int = 10,
+        page_token: str | None = None,
+        include_raw_results: bool = True,
+    ) -> dict[str, Any]:
+        """
+        Perform a search query using Vertex AI Search.
+
+        Results are served from the cache when possible. Otherwise the search
+        joins an identical search already in flight, or starts a new one.
+
+        Args:
+            query (str): The search query.
+            page_size (int): Number of results to return per page.
+            page_token (str | None): Token of the page to fetch, from a
+                previous response. Fetches the first page if not set.
+            include_raw_results (bool): Whether to include the raw `results`
+                next to the `simplified_results`.
+
+        Returns:
+            dict: Parsed and simplified search results.
+        """
+        key = self.cache_key(query, page_size, page_token, include_raw_results)
+        results = self.cache.get(key)
+        if results is not None:
+            self.cache_hits += 1
+            return results
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = asyncio.ensure_future(
+                self._fetch(key, query, page_size, page_token, include_raw_results)
+            )
+            self._in_flight[key] = future
+        # Shielded so a cancelled caller does not cancel the other waiters
+        return await asyncio.shield(future)
+
+    async def search_iter(  # type: ignore[override]
+        self, query: str, page_size: int = 10, max_results: int = 100
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Stream simplified search results across pages.
+
+        Pages are requested lazily as the results are consumed, through
+        `search`, so they are cached and coalesced like single searches. No
+        more than `max_results` results are requested or yielded.
+
+        Args:
+            query (str): The search query.
+            page_size (int): Number of results to request per page.
+            max_results (int): Maximum number of results to yield.
+
+        Yields:
+            Dict[str, Any]: The simplified results, in ranking order.
+        """
+        remaining = max_results
+        page_token = None
+        while remaining > 0:
+            response = await self.search(
+                query,
+                min(page_size, remaining),
+                page_token,
+                include_raw_results=False,
+            )
+            results = response["simplified_results"][:remaining]
+            for result in results:
+                yield result
+            remaining -= len(results)
+            page_token = response["next_page_token"]
+            if not page_token or not results:
+                return
+
+    async def _fetch(
+        self,
+        key: tuple[Hashable, ...],
+        query: str,
+        page_size: int,
+        page_token: str | None,
+        include_raw_results: bool,
+    ) -> dict[str, Any]:
+        """
+        Call the API, then cache the simplified results.
+
+        Args:
+            key (Tuple): The cache key of the search.
+            query (str): The search query.
+            page_size (int): Number of results to return per page.
+            page_token (str | None): Token of the page to fetch.
+            include_raw_results (bool): Whether to include the raw `results`.
+
+        Returns:
+            dict: Parsed and simplified search results.
+        """
+        try:
+            self.backend_calls += 1
+            request = self.build_search_request(query, page_size, page_token)
+            search_pager = await self.client.search(request)
+            results = self.parse_search_response(search_pager, include_raw_results)
+            self.cache.put(key, results)
+            return results
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return counters of API calls, cache hits and coalesced searches.
+
+        Returns:
+            Dict[str, int]: The counters and the number of cached results.
+        """
+        return {
+            "backend_calls": self.backend_calls,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "cache_size": len(self.cache),
+        }
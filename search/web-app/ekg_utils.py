@@ -14,13 +14,21 @@
 
 """Enterprise Knowledge Graph Utilities"""
 from collections.abc import Sequence
+from functools import cache
 import json
 
 from google.cloud import enterpriseknowledgegraph as ekg
+from json_utils import LazyJson
 
 JSON_INDENT = 2
 
 
+# The client is shared by all requests, so they reuse its gRPC channel
+@cache
+def get_ekg_client() -> ekg.EnterpriseKnowledgeGraphServiceClient:
+    return ekg.EnterpriseKnowledgeGraphServiceClient()
+
+
 # pylint: disable=too-many-arguments
 def search_public_kg(
     project_id: str,
@@ -33,7 +41,7 @@ def search_public_kg(
     """
     Make API Request to Public Knowledge Graph.
     """
-    client = ekg.EnterpriseKnowledgeGraphServiceClient()
+    client = get_ekg_client()
 
     # Fully qualified location string, e.g. projects/{project_id}/locations/{location}
     parent = client.common_location_path(project=project_id, location=location)
@@ -46,12 +54,19 @@ def search_public_kg(
 
     request_url = f"https://enterpriseknowledgegraph.googleapis.com/v1/{parent}/publicKnowledgeGraphEntities:Search?query={search_query}"  # noqa: E501
 
-    request_json = ekg.SearchPublicKgRequest.to_json(
-        request, including_default_value_fields=False, indent=JSON_INDENT
+    # Only rendered if the JSON panel is opened
+    request_json = LazyJson(
+        ekg.SearchPublicKgRequest.to_json,
+        request,
+        including_default_value_fields=False,
+        indent=JSON_INDENT,
     )
 
-    response_json = ekg.SearchPublicKgResponse.to_json(
-        response, including_default_value_fields=False, indent=JSON_INDENT
+    response_json = LazyJson(
+        ekg.SearchPublicKgResponse.to_json,
+        response,
+        including_default_value_fields=False,
+        indent=JSON_INDENT,
     )
 
     entities = get_entities(response)
@@ -69,7 +84,11 @@ def get_entities(response: ekg.SearchPublicKgResponse) -> list:
     entities = []
     for element in item_list_element:
         result = element["result"]
-        result["resultJson"] = json.dumps(result, sort_keys=True, indent=JSON_INDENT)
+        # Only rendered if the entity's JSON is opened, from a copy taken
+        # before the JSON is added to the entity
+        result["resultJson"] = LazyJson(
+            json.dumps, dict(result), sort_keys=True, indent=JSON_INDENT
+        )
         entities.append(result)
 
     return entities
@@ -0,0 +1,35 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""JSON Rendering Utilities"""
+from collections.abc import Callable
+from typing import Any
+
+
+class LazyJson:
+    """
+    JSON rendering of an API request or response, which is only serialized
+    the first time it is converted to a string (e.g. by a template).
+    """
+
+    def __init__(self, to_json: Callable[..., str], message: Any, **kwargs: Any):
+        self._to_json = to_json
+        self._message = message
+        self._kwargs = kwargs
+        self._json: str | None = None
+
+    def __str__(self) -> str:
+        if self._json is None:
+            self._json = self._to_json(self._message, **self._kwargs)
+        return self._json
@@ -15,6 +15,8 @@
 """Flask Web Server"""
 
 import base64
+from concurrent.futures import ThreadPoolExecutor
+import logging
 import os
 import re
 from urllib.parse import urlparse
@@ -31,7 +33,7 @@ from consts import (
 )
 from ekg_utils import search_public_kg
 from flask import Flask, render_template, request
-from google.api_core.exceptions import ResourceExhausted
+from google.api_core.exceptions import GoogleAPICallError, ResourceExhausted
 import requests
 from vais_utils import list_documents, recommend_personalize, search_enterprise_search
 from werkzeug.exceptions import HTTPException
@@ -84,6 +86,24 @@ RECOMMENDATIONS_DOCUMENTS = list_documents(
 
 VALID_IMAGE_MIMETYPES = {"image/jpeg", "image/png", "image/bmp"}
 
+# Runs the Knowledge Graph lookup of /search_vais next to the search
+KG_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+
+def get_debug_panel(request_url: str, raw_request, raw_response) -> dict:
+    """
+    Template arguments of the JSON tab. The request and response JSON are
+    only rendered when the form was posted with debug=1
+    """
+    if not request.form.get("debug"):
+        return {"debug": False}
+    return {
+        "debug": True,
+        "request_url": request_url,
+        "raw_request": raw_request,
+        "raw_response": raw_response,
+    }
+
 
 @app.route("/", methods=["GET"])
 @app.route("/finance", methods=["GET"])
@@ -147,6 +167,20 @@ def search_vais() -> str:
 
     summary_model = request.form.get("summary_model")
     summary_preamble = request.form.get("summary_preamble")
+    include_kg = bool(request.form.get("include_kg"))
+
+    # Fan out, the Knowledge Graph lookup runs while the search is in flight
+    kg_future = (
+        KG_EXECUTOR.submit(
+            search_public_kg,
+            project_id=PROJECT_ID,
+            location=LOCATION,
+            search_query=search_query,
+            limit=3,
+        )
+        if include_kg
+        else None
+    )
 
     results, summary, request_url, raw_request, raw_response = search_enterprise_search(
         project_id=PROJECT_ID,
@@ -157,6 +191,14 @@ def search_vais() -> str:
         summary_preamble=summary_preamble,
     )
 
+    entities = []
+    if kg_future:
+        try:
+            entities = kg_future.result()[0]
+        except GoogleAPICallError as e:
+            # The entities are supplementary, show the search results anyway
+            logging.warning("Knowledge Graph lookup failed: %s", e)
+
     return render_template(
         "search.html",
         title=NAV_LINKS[1]["name"],
@@ -166,9 +208,9 @@ def search_vais() -> str:
         message_success=search_query,
         results=results,
         summary=summary,
-        request_url=request_url,
-        raw_request=raw_request,
-        raw_response=raw_response,
+        entities=entities,
+        include_kg=include_kg,
+        **get_debug_panel(request_url, raw_request, raw_response),
     )
 
 
@@ -246,9 +288,7 @@ def imagesearch_vais() -> str:
         nav_links=NAV_LINKS,
         message_success="Success",
         results=results,
-        request_url=request_url,
-        raw_request=raw_request,
-        raw_response=raw_response,
+        **get_debug_panel(request_url, raw_request, raw_response),
     )
 
 
@@ -308,9 +348,7 @@ def recommend_vais() -> str:
         message_success=document_id,
         results=results,
         attribution_token=attribution_token,
-        request_url=request_url,
-        raw_request=raw_request,
-        raw_response=raw_response,
+        **get_debug_panel(request_url, raw_request, raw_response),
     )
 
 
@@ -365,9 +403,7 @@ def search_ekg() -> str:
         form_options=FORM_OPTIONS,
         message_success=search_query,
         entities=entities,
-        request_url=request_url,
-        raw_request=raw_request,
-        raw_response=raw_response,
+        **get_debug_panel(request_url, raw_request, raw_response),
     )
 
 
@@ -13,19 +13,38 @@
 # limitations under the License.
 
 """Vertex AI Search Utilities"""
+from functools import cache
 from os.path import basename
 
 from google.cloud import discoveryengine_v1alpha as discoveryengine
+from json_utils import LazyJson
 
 JSON_INDENT = 2
 
 
+# Clients are created once per process and shared by all requests,
+# so requests reuse their gRPC channels instead of setting up new ones
+@cache
+def get_document_client() -> discoveryengine.DocumentServiceClient:
+    return discoveryengine.DocumentServiceClient()
+
+
+@cache
+def get_search_client() -> discoveryengine.SearchServiceClient:
+    return discoveryengine.SearchServiceClient()
+
+
+@cache
+def get_recommendation_client() -> discoveryengine.RecommendationServiceClient:
+    return discoveryengine.RecommendationServiceClient()
+
+
 def list_documents(
     project_id: str,
     location: str,
     datastore_id: str,
 ) -> list[dict[str, str]]:
-    client = discoveryengine.DocumentServiceClient()
+    client = get_document_client()
 
     parent = client.branch_path(
         project=project_id,
@@ -54,12 +73,11 @@ def search_enterprise_search(
     params: dict | None = None,
     summary_model: str | None = None,
     summary_preamble: str | None = None,
-) -> tuple[list[dict[str, str | list]], str, str, str, str]:
+) -> tuple[list[dict[str, str | list]], str, str, LazyJson, LazyJson]:
     if bool(search_query) == bool(image_bytes):
         raise ValueError("Cannot provide both search_query and image_bytes")
 
-    # Create a client
-    client = discoveryengine.SearchServiceClient()
+    client = get_search_client()
 
     serving_config = f"projects/{project_id}/locations/{location}/collections/default_collection/engines/{engine_id}/servingConfigs/default_config"
 
@@ -125,13 +143,16 @@ def search_enterprise_search(
         f"https://discoveryengine.googleapis.com/v1alpha/{serving_config}:search"
     )
 
-    request_json = discoveryengine.SearchRequest.to_json(
+    # Only rendered if the JSON panel is opened
+    request_json = LazyJson(
+        discoveryengine.SearchRequest.to_json,
         request,
         including_default_value_fields=False,
         use_integers_for_enums=False,
         indent=JSON_INDENT,
     )
-    response_json = discoveryengine.SearchResponse.to_json(
+    response_json = LazyJson(
+        discoveryengine.SearchResponse.to_json,
         response,
         including_default_value_fields=True,
         use_integers_for_enums=False,
@@ -194,8 +215,11 @@ def get_enterprise_search_results(
                 )
             ],
             "thumbnailImage": get_thumbnail_image(result.document.derived_struct_data),
-            "resultJson": discoveryengine.SearchResponse.SearchResult.to_json(
-                result, including_default_value_fields=True, indent=JSON_INDENT
+            "resultJson": LazyJson(
+                discoveryengine.SearchResponse.SearchResult.to_json,
+                result,
+                including_default_value_fields=True,
+                indent=JSON_INDENT,
             ),
         }
         for result in response.results
@@ -211,8 +235,7 @@ def recommend_personalize(
     user_pseudo_id: str | None = "xxxxxxxxxxx",
     attribution_token: str | None = None,
 ) -> tuple:
-    # Create a client
-    client = discoveryengine.RecommendationServiceClient()
+    client = get_recommendation_client()
 
     # The full resource name of the search engine serving config
     # e.g. projects/{project_id}/locations/{location}
@@ -242,11 +265,18 @@ def recommend_personalize(
         f"https://discoveryengine.googleapis.com/v1beta/{serving_config}:recommend"
     )
 
-    request_json = discoveryengine.RecommendRequest.to_json(
-        request, including_default_value_fields=False, indent=JSON_INDENT
+    # Only rendered if the JSON panel is opened
+    request_json = LazyJson(
+        discoveryengine.RecommendRequest.to_json,
+        request,
+        including_default_value_fields=False,
+        indent=JSON_INDENT,
     )
-    response_json = discoveryengine.RecommendResponse.to_json(
-        response, including_default_value_fields=True, indent=JSON_INDENT
+    response_json = LazyJson(
+        discoveryengine.RecommendResponse.to_json,
+        response,
+        including_default_value_fields=True,
+        indent=JSON_INDENT,
     )
 
     results = get_personalize_results(response)
@@ -270,8 +300,11 @@ def get_personalize_results(
             "htmlFormattedUrl": result.document.content.uri,
             "link": get_storage_link(result.document.content.uri),
             "mimeType": result.document.content.mime_type,
-            "resultJson": discoveryengine.RecommendResponse.RecommendationResult.to_json(
-                result, including_default_value_fields=True, indent=JSON_INDENT
+            "resultJson": LazyJson(
+                discoveryengine.RecommendResponse.RecommendationResult.to_json,
+                result,
+                including_default_value_fields=True,
+                indent=JSON_INDENT,
             ),
         }
         for result in response.results